@@ -0,0 +1,150 @@
+import io
+import mmap
+import os
+import re
+import tarfile
+import threading
+import zipfile
+
+# Only formats with random access to members; a compressed tar would have to be decompressed from the start for every image
+ARCHIVE_EXTENSIONS = ('.zip', '.tar')
+
+# An image inside an archive is addressed as os.path.join(archive_path, member_name)
+ARCHIVE_MEMBER_PATH = re.compile(r"^(.*?\.(?:zip|tar))[\\/](.+)$", re.IGNORECASE)
+
+
+def is_archive(path):
+    return path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def split_archive_path(path):
+    """Return (archive path, member name) for an image inside an archive, or None for a plain file"""
+    match = ARCHIVE_MEMBER_PATH.match(path)
+    if match is None or not os.path.isfile(match.group(1)):
+        return None
+    return match.group(1), match.group(2).replace('\\', '/')
+
+
+class MemberView(io.RawIOBase):
+    """Read-only, seekable file over a slice of a memory-mapped archive"""
+
+    def __init__(self, buffer, offset, size):
+        self.buffer = buffer
+        self.start = offset
+        self.end = offset + size
+        self.position = offset
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        count = max(0, min(len(b), self.end - self.position))
+        b[:count] = self.buffer[self.position:self.position + count]
+        self.position += count
+        return count
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = self.start + offset
+        elif whence == io.SEEK_CUR:
+            position = self.position + offset
+        else:
+            position = self.end + offset
+        self.position = min(max(position, self.start), self.end)
+        return self.position - self.start
+
+    def tell(self):
+        return self.position - self.start
+
+
+class ArchiveReader:
+    """Member index of one zip or tar file, with on-demand reads and no extraction.
+
+    Tar members are stored uncompressed, so they are served straight from a
+    memory map. Zip members go through zipfile's seekable member reader, which
+    only inflates as much as is read.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime_ns = os.stat(path).st_mtime_ns
+        self.file = open(path, 'rb')
+        try:
+            if path.lower().endswith('.zip'):
+                self.zip_file = zipfile.ZipFile(self.file)
+                self.members = {info.filename: info for info in self.zip_file.infolist() if not info.is_dir()}
+            else:
+                self.zip_file = None
+                with tarfile.open(fileobj=self.file, mode='r:') as tar_file:
+                    self.members = {info.name: (info.offset_data, info.size) for info in tar_file.getmembers() if info.isfile()}
+                self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path) else b''
+        except (zipfile.BadZipFile, tarfile.TarError) as e:
+            self.file.close()
+            # Callers treat an unreadable archive like an unreadable folder
+            raise OSError(f"Not a readable archive: {e}") from e
+
+    def names(self):
+        return list(self.members)
+
+    def open(self, member_name):
+        if member_name not in self.members:
+            raise FileNotFoundError(f"'{member_name}' is not in {self.path}")
+        if self.zip_file is not None:
+            return self.zip_file.open(member_name)
+        offset, size = self.members[member_name]
+        return io.BufferedReader(MemberView(self.buffer, offset, size))
+
+    def close(self):
+        if self.zip_file is not None:
+            self.zip_file.close()
+        elif len(self.buffer):
+            self.buffer.close()
+        self.file.close()
+
+
+readers = {}
+readers_lock = threading.Lock()
+
+
+def get_reader(archive_path):
+    """Shared reader for an archive, reopened when the archive has been replaced"""
+    mtime_ns = os.stat(archive_path).st_mtime_ns
+    with readers_lock:
+        reader = readers.get(archive_path)
+        if reader is None or reader.mtime_ns != mtime_ns:
+            if reader is not None:
+                # Its file handle would otherwise stay open, and on Windows keep the old archive locked
+                reader.close()
+            reader = ArchiveReader(archive_path)
+            readers[archive_path] = reader
+        return reader
+
+
+def close_reader(archive_path):
+    """Close the shared reader of an archive, if it has one, so the file isn't held open any more"""
+    with readers_lock:
+        reader = readers.pop(archive_path, None)
+    if reader is not None:
+        reader.close()
+
+
+def list_archive(archive_path):
+    return get_reader(archive_path).names()
+
+
+def open_source(image_path):
+    """Open an image for reading, whether it is a plain file or inside an archive"""
+    archive_member = split_archive_path(image_path)
+    if archive_member is None:
+        return open(image_path, 'rb')
+    archive_path, member_name = archive_member
+    return get_reader(archive_path).open(member_name)
+
+
+def stat_source(image_path):
+    """os.stat of the file an image is read from; edits to a member always change its archive"""
+    archive_member = split_archive_path(image_path)
+    return os.stat(image_path if archive_member is None else archive_member[0])
@@ -0,0 +1,126 @@
+"""Compare the reduced-resolution decode path against a full-size decode.
+
+Generates synthetic PNG and JPEG images at several sizes, then loads each one
+with both strategies in a fresh process so peak memory can be measured.
+
+    python benchmarks/bench_decode.py
+    python benchmarks/bench_decode.py --sizes 3840x2160,7680x4320 --target 2560x1440 --repeat 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PIL import Image
+from image_pipeline import fit_size, load_display_image
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak memory is reported as n/a there
+    resource = None
+
+
+def load_full_size(image_path, target_size):
+    """The original path: convert to RGB at full size, then LANCZOS straight to the display size"""
+    with Image.open(image_path) as pil_img:
+        if pil_img.mode != 'RGB':
+            pil_img = pil_img.convert('RGB')
+        return pil_img.resize(fit_size(pil_img.size, target_size), Image.LANCZOS)
+
+
+STRATEGIES = {
+    'full': load_full_size,
+    'reduced': load_display_image,
+}
+
+
+def peak_rss_mb():
+    # ru_maxrss survives exec on Linux, so it would include the parent that generated the images
+    if os.path.exists('/proc/self/status'):
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def make_test_image(path, size, fmt):
+    """Noisy image with gradients, so PNG compression behaves like real renders"""
+    bands = [
+        Image.effect_noise(size, 48),
+        Image.linear_gradient('L').resize(size),
+        Image.radial_gradient('L').resize(size),
+    ]
+    img = Image.merge('RGB', bands)
+    if fmt == 'jpg':
+        img.save(path, quality=92)
+    else:
+        img.save(path, compress_level=6)
+
+
+def run_child(strategy, image_path, target_size, repeat):
+    """Time one strategy in this process and print the result as JSON"""
+    load = STRATEGIES[strategy]
+    baseline = peak_rss_mb()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load(image_path, target_size)
+        timings.append((time.perf_counter() - start) * 1000)
+    peak = peak_rss_mb()
+    print(json.dumps({
+        'mean_ms': sum(timings) / len(timings),
+        'min_ms': min(timings),
+        'peak_mb': None if peak is None else peak - baseline,
+    }))
+
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='2048x2048,3840x2160,7680x4320', help="comma separated source sizes")
+    parser.add_argument('--formats', default='png,jpg', help="comma separated source formats")
+    parser.add_argument('--target', default='1920x1080', help="display area to fit the images into")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--child', nargs=2, metavar=('STRATEGY', 'IMAGE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    target_size = parse_size(args.target)
+    if args.child:
+        run_child(args.child[0], args.child[1], target_size, args.repeat)
+        return
+
+    print(f"Target size {target_size[0]}x{target_size[1]}, {args.repeat} runs each")
+    print(f"{'source':<16}{'format':<8}{'strategy':<10}{'mean ms':>10}{'min ms':>10}{'peak MB':>10}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for size in map(parse_size, args.sizes.split(',')):
+            for fmt in args.formats.split(','):
+                image_path = os.path.join(temp_dir, f"bench_{size[0]}x{size[1]}.{fmt}")
+                make_test_image(image_path, size, fmt)
+                for strategy in STRATEGIES:
+                    output = subprocess.run(
+                        [sys.executable, __file__, '--child', strategy, image_path,
+                         '--target', args.target, '--repeat', str(args.repeat)],
+                        capture_output=True, text=True, check=True
+                    ).stdout
+                    result = json.loads(output)
+                    peak = 'n/a' if result['peak_mb'] is None else f"{result['peak_mb']:.1f}"
+                    print(f"{size[0]}x{size[1]:<11}{fmt:<8}{strategy:<10}{result['mean_ms']:>10.1f}{result['min_ms']:>10.1f}{peak:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""Measure interactive latency of the comparison screen under a virtual X server.
+
+Builds synthetic image folders, drives ImageBatchCompare with generated mouse
+and window events, and records how long each interaction takes to reach the
+screen:
+
+    click       release on a side -> next pair visible (vote -> show_next_screen -> display_current_screen)
+    refine      release on a side -> the visible image is the final LANCZOS rendition
+    flip        mouse crosses the midline -> other image visible (on_mouse_move)
+    resize      window resized -> redrawn at the new size (on_window_configure -> refresh_display)
+
+Percentiles are reported per image size and folder count. Results can be
+stored as a baseline, and later runs fail (exit code 1) when a percentile gets
+slower than the baseline by more than the allowed tolerance.
+
+Needs Xvfb on the PATH, unless --current-display is given.
+
+    python benchmarks/bench_latency.py --save-baseline
+    python benchmarks/bench_latency.py
+    python benchmarks/bench_latency.py --sizes 2048x2048 --folders 2,8 --clicks 40
+"""
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from bench_decode import make_test_image, parse_size
+
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "latency_baseline.json")
+PERCENTILES = (50, 90, 99)
+
+# Give up on an interaction that hasn't reached the screen after this long
+TIMEOUT_S = 30
+
+
+def start_virtual_display(screen_size):
+    """Start Xvfb on a free display number and point DISPLAY at it"""
+    if shutil.which("Xvfb") is None:
+        sys.exit("Xvfb was not found. Install it, or run with --current-display.")
+    for display_number in range(99, 199):
+        if os.path.exists(f"/tmp/.X11-unix/X{display_number}") or os.path.exists(f"/tmp/.X{display_number}-lock"):
+            continue
+        process = subprocess.Popen(
+            ["Xvfb", f":{display_number}", "-screen", "0", f"{screen_size[0]}x{screen_size[1]}x24", "-nolisten", "tcp"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.perf_counter() + 5
+        while time.perf_counter() < deadline:
+            if os.path.exists(f"/tmp/.X11-unix/X{display_number}"):
+                os.environ["DISPLAY"] = f":{display_number}"
+                return process
+            if process.poll() is not None:
+                break
+            time.sleep(0.05)
+        process.kill()
+    sys.exit("Could not start Xvfb.")
+
+
+def load_application_module():
+    """Import image-batch-compare.py, whose file name isn't a valid module name"""
+    spec = importlib.util.spec_from_file_location("image_batch_compare", os.path.join(REPO_DIR, "image-batch-compare.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_folders(base_dir, image_size, folder_count, image_count):
+    folders = []
+    for folder_index in range(folder_count):
+        folder = os.path.join(base_dir, f"folder_{folder_index}")
+        os.makedirs(folder)
+        for image_index in range(image_count):
+            make_test_image(os.path.join(folder, f"seed_{image_index:04d}.png"), image_size, 'png')
+        folders.append(folder)
+    return folders
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class LatencyDriver:
+    """Runs one ImageBatchCompare session and times interactions with it"""
+
+    def __init__(self, module, folders):
+        self.module = module
+        self.app = module.ImageBatchCompare()
+        self.root = self.app.root
+        self.canvas = self.app.canvas
+        self.app.folders = list(folders)
+        # A finished session would block on the results dialog
+        self.app.show_results = self.app.stop_comparison
+        # So would the offers to stop early or to reuse an earlier session's results
+        self.app.early_stop = 'off'
+        self.app.reuse_results = 'off'
+
+    def pump_until(self, condition):
+        """Process Tk events until condition() holds, returning the elapsed time in ms"""
+        start = time.perf_counter()
+        while not condition():
+            self.root.update()
+            if time.perf_counter() - start > TIMEOUT_S:
+                raise TimeoutError("interaction never reached the screen")
+        self.root.update_idletasks()
+        return (time.perf_counter() - start) * 1000
+
+    def start(self):
+        self.root.update()
+        self.app.start_comparison()
+        self.pump_until(lambda: self.app.image_frame.winfo_viewable() and self.app.screen_jobs)
+        self.pump_until(self.visible_image_final)
+
+    def visible_index(self):
+        return 0 if self.app.visible_side == 'left' else 1
+
+    def visible_image_shown(self):
+        return self.app.screen_image_quality[self.visible_index()] in ('preview', 'final')
+
+    def visible_image_final(self):
+        return self.app.screen_image_quality[self.visible_index()] == 'final'
+
+    def move_to(self, x):
+        y = self.canvas.winfo_height() // 2
+        self.canvas.event_generate('<Motion>', x=x, y=y, warp=True)
+
+    def side_x(self, side):
+        width = self.canvas.winfo_width()
+        return width // 4 if side == 'left' else width * 3 // 4
+
+    def click(self, side):
+        """Vote for a side; returns (ms until the next pair is visible, ms until it is final)"""
+        self.pump_until(lambda: not self.app.click_disabled)
+        x = self.side_x(side)
+        y = self.canvas.winfo_height() // 2
+        self.move_to(x)
+        self.root.update()
+        token = self.app.screen_token
+        start = time.perf_counter()
+        self.canvas.event_generate('<ButtonPress-1>', x=x, y=y)
+        self.canvas.event_generate('<ButtonRelease-1>', x=x, y=y)
+        self.pump_until(lambda: self.app.screen_token != token and self.visible_image_shown())
+        shown = (time.perf_counter() - start) * 1000
+        self.pump_until(self.visible_image_final)
+        return shown, (time.perf_counter() - start) * 1000
+
+    def flip(self):
+        """Cross the midline; returns ms until the other image is visible"""
+        other_side = 'right' if self.app.visible_side == 'left' else 'left'
+        # Motion is throttled to one update per frame, so let the previous one settle first
+        self.pump_until(lambda: self.app.motion_timer is None)
+        start = time.perf_counter()
+        self.move_to(self.side_x(other_side))
+        self.pump_until(lambda: self.app.visible_side == other_side)
+        return (time.perf_counter() - start) * 1000
+
+    def resize(self, size):
+        """Resize the window; returns ms until the visible image is final at the new size"""
+        token = self.app.screen_token
+        start = time.perf_counter()
+        self.root.geometry(f"{size[0]}x{size[1]}")
+        self.pump_until(lambda: self.app.screen_token != token and self.visible_image_final())
+        return (time.perf_counter() - start) * 1000
+
+    def close(self):
+        self.app.prefetcher.shutdown()
+        self.root.destroy()
+
+
+def run_case(module, image_size, folder_count, args):
+    """Measure one image size / folder count combination; returns {metric: [ms, ...]}"""
+    samples = {'click': [], 'refine': [], 'flip': [], 'resize': []}
+    # Each subgroup takes folder_count - 1 clicks; make sure the session doesn't run out
+    image_count = max(2, args.clicks // max(1, folder_count - 1) + 2)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        folders = make_folders(os.path.join(temp_dir, "images"), image_size, folder_count, image_count)
+        # Settings and caches go to the temporary directory, never the user's own
+        work_dir = os.path.join(temp_dir, "work")
+        os.makedirs(work_dir)
+        previous_dir = os.getcwd()
+        os.chdir(work_dir)
+        try:
+            driver = LatencyDriver(module, folders)
+            try:
+                driver.start()
+                for i in range(args.clicks):
+                    for _ in range(args.flips):
+                        samples['flip'].append(driver.flip())
+                    shown, final = driver.click('left' if i % 2 == 0 else 'right')
+                    samples['click'].append(shown)
+                    samples['refine'].append(final)
+                window_sizes = [(1280, 720), (1600, 900)]
+                for i in range(args.resizes):
+                    samples['resize'].append(driver.resize(window_sizes[i % 2]))
+            finally:
+                driver.close()
+        finally:
+            os.chdir(previous_dir)
+    return samples
+
+
+def summarize(samples):
+    return {metric: {f"p{pct}": percentile(values, pct) for pct in PERCENTILES}
+            for metric, values in samples.items() if values}
+
+
+def compare_to_baseline(results, baseline, tolerance, slack_ms):
+    """Return a list of human readable regressions"""
+    regressions = []
+    for case, metrics in results.items():
+        for metric, percentiles in metrics.items():
+            for name, value in percentiles.items():
+                reference = baseline.get(case, {}).get(metric, {}).get(name)
+                if reference is None:
+                    continue
+                limit = reference * (1 + tolerance) + slack_ms
+                if value > limit:
+                    regressions.append(f"{case} {metric} {name}: {value:.1f} ms (baseline {reference:.1f} ms, limit {limit:.1f} ms)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1024x1024,2048x2048', help="comma separated source image sizes")
+    parser.add_argument('--folders', default='2,6', help="comma separated folder counts")
+    parser.add_argument('--clicks', type=int, default=20, help="votes per case")
+    parser.add_argument('--flips', type=int, default=3, help="side flips before each vote")
+    parser.add_argument('--resizes', type=int, default=6, help="window resizes per case")
+    parser.add_argument('--screen', default='1920x1080', help="virtual screen size")
+    parser.add_argument('--current-display', action='store_true', help="use $DISPLAY instead of starting Xvfb")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline file to compare against or save to")
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown as a fraction of the baseline")
+    parser.add_argument('--slack-ms', type=float, default=5.0, help="allowed slowdown in ms on top of --tolerance")
+    args = parser.parse_args()
+
+    xvfb = None if args.current_display else start_virtual_display(parse_size(args.screen))
+    try:
+        module = load_application_module()
+        results = {}
+        print(f"{'case':<24}{'metric':<10}" + "".join(f"{f'p{pct} ms':>10}" for pct in PERCENTILES))
+        for image_size in map(parse_size, args.sizes.split(',')):
+            for folder_count in map(int, args.folders.split(',')):
+                case = f"{image_size[0]}x{image_size[1]}/{folder_count} folders"
+                results[case] = summarize(run_case(module, image_size, folder_count, args))
+                for metric, percentiles in results[case].items():
+                    print(f"{case:<24}{metric:<10}" + "".join(f"{value:>10.1f}" for value in percentiles.values()))
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against; run with --save-baseline first.")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline, args.tolerance, args.slack_ms)
+    if regressions:
+        print("\nLatency regressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Time each PIL-to-Tk photo transfer method at common full-screen canvas sizes.
+
+Needs a display, since Tk photo images can only be created with a running Tk.
+
+    python benchmarks/bench_photo_transfer.py
+    python benchmarks/bench_photo_transfer.py --sizes 1920x1080,3840x2160 --repeat 20
+"""
+import argparse
+import os
+import sys
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PIL import Image
+from photo_transfer import TRANSFER_METHODS, PhotoTransfer
+
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1920x1080,2560x1440,3840x2160', help="comma separated canvas sizes")
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    root.withdraw()
+
+    print(f"Tk {root.tk.call('info', 'patchlevel')}, {args.repeat} runs each")
+    print(f"Auto-selected method: {PhotoTransfer(root).calibrate()}")
+    print(f"{'size':<12}{'method':<10}{'mean ms':>10}{'min ms':>10}{'speedup':>10}")
+    for size in map(parse_size, args.sizes.split(',')):
+        test_image = Image.effect_noise(size, 64).convert('RGB')
+        baseline = None
+        for name, transfer in TRANSFER_METHODS.items():
+            timings = []
+            try:
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    photo = transfer(test_image, root)
+                    # Make Tk finish with the image before stopping the clock
+                    root.update_idletasks()
+                    timings.append((time.perf_counter() - start) * 1000)
+                    del photo
+            except Exception as e:
+                print(f"{size[0]}x{size[1]:<7}{name:<10}unavailable: {e}")
+                continue
+            mean = sum(timings) / len(timings)
+            if baseline is None:
+                baseline = mean
+            print(f"{size[0]}x{size[1]:<7}{name:<10}{mean:>10.1f}{min(timings):>10.1f}{baseline / mean:>9.2f}x")
+
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
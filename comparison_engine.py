@@ -0,0 +1,903 @@
+import datetime
+import glob
+import json
+import math
+import os
+import random
+from statistics import NormalDist
+from pairwise_ratings import ELO_SCALE, INTERVAL_LEVEL, RatingFit
+from session_planner import SampledAlignment, folder_fingerprints, unchanged_folders
+from subgroup_alignment import make_alignment
+
+# Bumped when the layout of saved sessions changes
+SESSION_FORMAT = 1
+
+# Rating model of the adaptive scheduler: every folder starts at mean 0 and variance 1,
+# and a single comparison carries RATING_BETA_SQ of outcome noise
+RATING_BETA_SQ = 0.25
+# Lower bound on the factor a variance is multiplied by in one update, so it never collapses to zero
+MIN_VARIANCE_FACTOR = 1e-4
+
+# Default stopping rule: end once the winner is known with 95% confidence
+DEFAULT_STOP_TOP_K = 1
+DEFAULT_STOP_CONFIDENCE = 0.95
+
+# Images on one screen of a grid session
+DEFAULT_GRID_SIZE = 4
+
+
+def win_probability(mu_a, var_a, mu_b, var_b):
+    """Chance that a beats b under the rating model, and the scale c it was computed at"""
+    c = math.sqrt(2 * RATING_BETA_SQ + var_a + var_b)
+    return 1 / (1 + math.exp((mu_b - mu_a) / c)), c
+
+
+def update_ratings(mu, var, winner, loser):
+    """Bradley-Terry update of two folders' rating means and variances after one comparison, after Weng & Lin (2011)"""
+    p, c = win_probability(mu[winner], var[winner], mu[loser], var[loser])
+    information = p * (1 - p)
+    for folder, surprise in ((winner, 1 - p), (loser, p - 1)):
+        mu[folder] += var[folder] / c * surprise
+        var[folder] *= max(1 - var[folder] / (c * c) * information, MIN_VARIANCE_FACTOR)
+
+
+def order_error(wins, losses):
+    """Bound on the chance that a folder with this head-to-head record is not the better one.
+
+    The reciprocal of a likelihood ratio for "the folder wins more than half
+    of its comparisons" against an even match, mixed over a uniform win rate
+    between one half and one. Under an even match or worse that ratio is a
+    supermartingale, so by Ville's inequality it ever reaches 1/alpha with
+    chance at most alpha, however many comparisons are made. An 8-0 record
+    gives 0.018, 30-10 gives 0.016.
+    """
+    games = wins + losses
+    # A record no better than even has a likelihood ratio of at most 1
+    if 2 * wins <= games:
+        return 1.0
+    # The integral of p^wins (1-p)^losses over [1/2, 1] is a binomial tail of a beta distribution:
+    # B(wins + 1, losses + 1) P(Binomial(games + 1, 1/2) <= wins). That probability is at least a half here,
+    # so it is taken as 1 minus the upper tail, summed in floating point from its largest term down.
+    trials = games + 1
+    log_term = math.lgamma(trials + 1) - math.lgamma(wins + 2) - math.lgamma(trials - wins) - trials * math.log(2)
+    term = math.exp(log_term)
+    upper_tail = 0.0
+    for successes in range(wins + 1, trials + 1):
+        upper_tail += term
+        if term < upper_tail * 1e-17:
+            break
+        term *= (trials - successes) / (successes + 1)
+    log_beta = math.lgamma(wins + 1) + math.lgamma(losses + 1) - math.lgamma(trials + 1)
+    log_error = -games * math.log(2) - log_beta - math.log1p(-upper_tail) - math.log(2)
+    return min(1.0, math.exp(log_error))
+
+
+class ComparisonSession:
+    """The state of one comparison run, independent of any user interface.
+
+    Every subgroup is played as a winner-stays tournament: the first two
+    images are compared, and each winner then meets the next image until the
+    subgroup is exhausted, which earns the last winner's folder one vote.
+    A front end shows current_pair and reports choices with vote() or
+    skip_subgroup(); both return False once no subgroup is left to show.
+
+    Subgroups are shuffled with a seeded generator, in order of their index,
+    and every choice is kept in vote_log, so a saved session can be replayed.
+
+    Every comparison, not just the last one of a subgroup, also updates a
+    rating per folder and the head-to-head record of its two folders. The
+    ratings give the order, and is_settled() uses the records to tell when
+    the top stop_top_k folders of it are known with stop_confidence, so the
+    session can end before the budget is spent.
+    """
+
+    scheduler = 'tournament'
+    # What the votes dict counts, for results
+    vote_unit = 'votes'
+
+    def __init__(self, folders, alignment, seed=None, subgroup_limit=None,
+                 stop_top_k=DEFAULT_STOP_TOP_K, stop_confidence=DEFAULT_STOP_CONFIDENCE):
+        self.folders = list(folders)
+        self.alignment = alignment
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.random = random.Random(self.seed)
+        # Live sessions only go as far as the subgroups that are complete so far
+        self.subgroup_limit = subgroup_limit
+        self.votes = {folder: 0 for folder in self.folders}
+        self.current_subgroup_index = 0
+        self.current_subgroup = []
+        self.current_pair = []
+        self.current_pair_index = 0
+        self.subgroup_winner = None
+        self.comparisons_within_subgroup = 0
+        self.current_comparison = 0
+        self.last_chosen_side = None
+        # Subgroups are shuffled ahead of time so their first pair can be prefetched
+        self.planned_subgroups = {}
+        self.vote_log = []
+        self.total_comparisons = self.calculate_total_comparisons()
+        
+        self.folder_ids = {folder: i for i, folder in enumerate(self.folders)}
+        self.mu = [0.0] * len(self.folders)
+        self.var = [1.0] * len(self.folders)
+        self.comparison_counts = [0] * len(self.folders)
+        # wins[i][j] is how often folder i was chosen over folder j, in any comparison
+        self.wins = [[0] * len(self.folders) for _ in self.folders]
+        self.stop_top_k = stop_top_k
+        self.stop_confidence = stop_confidence
+        # {folder: fingerprint} from when the session's images were read, see session_planner.folder_fingerprints.
+        # Saved so a later session can reuse these results; left out while it is None.
+        self.fingerprints = None
+
+    def subgroup_count(self):
+        if self.subgroup_limit is not None:
+            return min(self.subgroup_limit, self.alignment.subgroup_count())
+        return self.alignment.subgroup_count()
+
+    def set_alignment(self, alignment, subgroup_limit=None):
+        """Switch to an updated alignment whose existing subgroups keep their index"""
+        self.alignment = alignment
+        self.subgroup_limit = subgroup_limit
+        self.total_comparisons = self.calculate_total_comparisons()
+
+    def subgroup_budget(self, subgroup_size):
+        """Comparisons a subgroup of this many images takes"""
+        return max(subgroup_size - 1, 0)  # Each group will have (n-1) comparisons
+
+    def calculate_total_comparisons(self):
+        total = 0
+        for num_images_in_group in self.alignment.subgroup_sizes[:self.subgroup_count()]:
+            total += self.subgroup_budget(num_images_in_group)
+        return total
+
+    def build_subgroup(self, subgroup_index):
+        """Collect and shuffle the images that make up a subgroup"""
+        subgroup = []
+        for folder in self.folders:
+            image_path = self.alignment.image_path(folder, subgroup_index)
+            if image_path is not None:
+                subgroup.append((folder, image_path))
+        self.random.shuffle(subgroup)
+        return subgroup
+
+    def get_planned_subgroup(self, subgroup_index):
+        if subgroup_index not in self.planned_subgroups:
+            self.planned_subgroups[subgroup_index] = self.build_subgroup(subgroup_index)
+        return self.planned_subgroups[subgroup_index]
+
+    def peek_next_subgroup(self):
+        """Return the next subgroup that will actually be shown, without loading it"""
+        for subgroup_index in range(self.current_subgroup_index + 1, self.subgroup_count()):
+            subgroup = self.get_planned_subgroup(subgroup_index)
+            if len(subgroup) > 1:
+                return subgroup
+        return []
+
+    def get_upcoming_images(self):
+        """Images that may be shown on the next screens: the next challenger and the next subgroup's first pair"""
+        upcoming = []
+        next_challenger_index = self.current_pair_index + 2
+        if next_challenger_index < len(self.current_subgroup):
+            upcoming.append(self.current_subgroup[next_challenger_index])
+        upcoming.extend(self.peek_next_subgroup()[:2])
+        return upcoming
+
+    def load_next_subgroup(self):
+        """Move to the first subgroup from current_subgroup_index that has a pair to show. Returns False if there is none."""
+        while self.current_subgroup_index < self.subgroup_count():
+            # The subgroup may already have been shuffled so that it could be prefetched
+            self.get_planned_subgroup(self.current_subgroup_index)
+            self.current_subgroup = self.planned_subgroups.pop(self.current_subgroup_index)
+            self.subgroup_winner = None
+            self.current_pair_index = 0
+            self.comparisons_within_subgroup = 0
+            if len(self.current_subgroup) > 1:
+                self.load_next_screen()
+                return True
+            self.current_subgroup_index += 1
+        self.current_subgroup = []
+        self.current_pair = []
+        return False
+
+    def load_next_screen(self):
+        if self.subgroup_winner is None:
+            # First comparison in the subgroup
+            self.current_pair = self.current_subgroup[:2]
+        else:
+            # Compare the winner with the next image
+            next_image = self.current_subgroup[self.current_pair_index + 1]
+            self.current_pair = [self.subgroup_winner, next_image]
+            # Place the winner on the opposite side of the last chosen side
+            if self.last_chosen_side == 'left':
+                self.current_pair = self.current_pair[::-1]
+
+    def vote(self, chosen_index):
+        """Choose current_pair[chosen_index] (0 is the left image). Returns False when no subgroup is left."""
+        chosen = self.current_pair[chosen_index]
+        self.last_chosen_side = 'left' if chosen_index == 0 else 'right'
+        self.subgroup_winner = chosen
+        self.current_comparison += 1
+        self.current_pair_index += 1
+        self.comparisons_within_subgroup += 1
+
+        completes_subgroup = self.comparisons_within_subgroup >= len(self.current_subgroup) - 1
+        self.vote_log.append({
+            'subgroup': self.current_subgroup_index,
+            'pair': [image_path for _, image_path in self.current_pair],
+            'winner': chosen[1],
+            'winner_folder': chosen[0],
+            'completes_subgroup': completes_subgroup,
+        })
+
+        self.record_outcome(chosen[0], self.current_pair[1 - chosen_index][0])
+
+        if completes_subgroup:
+            # The last winner of the subgroup earns its folder a vote
+            self.votes[chosen[0]] += 1
+            self.current_subgroup_index += 1
+            return self.load_next_subgroup()
+        self.load_next_screen()
+        return True
+
+    def skip_subgroup(self):
+        """Leave the rest of the current subgroup unrated. Returns False when no subgroup is left."""
+        total_in_subgroup = self.subgroup_budget(len(self.current_subgroup))
+        self.current_comparison += total_in_subgroup - self.comparisons_within_subgroup
+        self.vote_log.append({'subgroup': self.current_subgroup_index, 'skipped': True})
+        self.current_subgroup_index += 1
+        return self.load_next_subgroup()
+
+    def record_outcome(self, winner_folder, loser_folder):
+        winner, loser = self.folder_ids[winner_folder], self.folder_ids[loser_folder]
+        update_ratings(self.mu, self.var, winner, loser)
+        self.wins[winner][loser] += 1
+        self.comparison_counts[winner] += 1
+        self.comparison_counts[loser] += 1
+
+    def ranking(self):
+        """Folder indices from the highest to the lowest rating"""
+        return sorted(range(len(self.folders)), key=lambda i: self.mu[i], reverse=True)
+
+    def ranking_confidence(self, top_k=None):
+        """Lower bound on the probability that the current order of the top_k folders is right.
+
+        Checks each neighbouring pair in the top k and the k-th folder against
+        every folder below it on their head-to-head record, and combines the
+        chances of any of them being wrong with a union bound. Each chance
+        is order_error of that record, which stays valid however often it is
+        checked, so stopping at the first vote that reaches stop_confidence
+        keeps the error rate below 1 - stop_confidence.
+        """
+        error = sum(self.check_errors(self.mu, self.wins, top_k).values())
+        return max(0.0, 1 - error)
+
+    def check_errors(self, mu, wins, top_k=None):
+        """{(above, below): error} for the pairs ranking_confidence checks, in the order of mu"""
+        top_k = min(top_k or self.stop_top_k, len(self.folders) - 1)
+        if top_k < 1:
+            return {}
+        order = sorted(range(len(self.folders)), key=lambda i: mu[i], reverse=True)
+        checks = [(order[i], order[i + 1]) for i in range(top_k - 1)]
+        checks += [(order[top_k - 1], other) for other in order[top_k:]]
+        # Either folder of a pair can come out ahead, so the two directions share each check's error
+        return {(above, below): 2 * order_error(wins[above][below], wins[below][above]) for above, below in checks}
+
+    def is_settled(self):
+        """True once every folder has been compared and the top order is known with stop_confidence"""
+        if not all(self.comparison_counts):
+            return False
+        return self.ranking_confidence() >= self.stop_confidence
+
+    def sorted_votes(self):
+        """(folder, votes) pairs, most votes first"""
+        return sorted(self.votes.items(), key=lambda x: x[1], reverse=True)
+
+    def fit_ratings(self):
+        """Bradley-Terry ratings with bootstrap intervals from every comparison so far"""
+        return RatingFit(self.folders, self.wins, seed=self.seed)
+
+    def to_dict(self):
+        record = {
+            'format': SESSION_FORMAT,
+            'scheduler': self.scheduler,
+            'seed': self.seed,
+            'folders': self.folders,
+            'alignment_key_pattern': self.alignment.key_pattern,
+            'stop_top_k': self.stop_top_k,
+            'stop_confidence': self.stop_confidence,
+            'ranking_confidence': self.ranking_confidence(),
+            'total_comparisons': self.total_comparisons,
+            'votes': self.votes,
+            'win_matrix': self.wins,
+            'vote_log': self.vote_log,
+        }
+        if self.fingerprints is not None:
+            # Lets a later session tell which folders are unchanged and reuse their results
+            record['fingerprints'] = self.fingerprints
+        if isinstance(self.alignment, SampledAlignment):
+            record['subgroup_sample'] = self.alignment.indices
+        return record
+
+
+class AdaptiveSession(ComparisonSession):
+    """Picks each pair for the most expected information instead of playing subgroups in order.
+
+    Uses the ratings every session keeps (see ComparisonSession). The next pair is the
+    pair of folders whose comparison is expected to shrink those variances
+    the most: close in rating (an uncertain outcome) and still uncertain
+    themselves. It is shown on the next subgroup that has images from both
+    and hasn't paired them yet, so two images always share a seed. Each
+    comparison counts as one vote for its winner. The session uses the same
+    comparison budget as the tournament, and ends sooner if no pair is left.
+
+    Until the top stop_top_k folders are settled, only the pairs
+    ranking_confidence checks are candidates, least certain first. The
+    stopping rule goes by head-to-head records, and the pairs that would
+    otherwise be the most informative rarely include the leader's games
+    against folders it clearly beats.
+    """
+
+    scheduler = 'adaptive'
+
+    def __init__(self, folders, alignment, seed=None, subgroup_limit=None, **stop_rule):
+        super().__init__(folders, alignment, seed, subgroup_limit, **stop_rule)
+        folder_count = len(self.folders)
+        # Shuffled so ties between equally informative pairs don't always favour the first folders
+        self.folder_pairs = [(a, b) for a in range(folder_count) for b in range(a + 1, folder_count)]
+        self.random.shuffle(self.folder_pairs)
+        # The first subgroup each folder pair may still use; subgroups before it are used or lack one of them
+        self.pair_cursor = {pair: 0 for pair in self.folder_pairs}
+
+    def next_pair_subgroup(self, pair):
+        """The next subgroup with images from both folders of pair, or None"""
+        subgroup_count = self.subgroup_count()
+        subgroup_index = self.pair_cursor[pair]
+        folder_a, folder_b = self.folders[pair[0]], self.folders[pair[1]]
+        while subgroup_index < subgroup_count and (self.alignment.image_path(folder_a, subgroup_index) is None
+                                                   or self.alignment.image_path(folder_b, subgroup_index) is None):
+            subgroup_index += 1
+        self.pair_cursor[pair] = subgroup_index
+        return subgroup_index if subgroup_index < subgroup_count else None
+
+    def choose_pair(self, mu, var, wins):
+        """Return (pair, subgroup index) to show next, or None. See the class docstring for the choice."""
+        subgroup_count = self.subgroup_count()
+        check_errors = {tuple(sorted(check)): error for check, error in self.check_errors(mu, wins).items()}
+        if sum(check_errors.values()) < 1 - self.stop_confidence:
+            check_errors = {}
+        while True:
+            best_pair = None
+            best_score = None
+            for pair in self.folder_pairs:
+                if self.pair_cursor[pair] >= subgroup_count or (check_errors and pair not in check_errors):
+                    continue
+                a, b = pair
+                p, c = win_probability(mu[a], var[a], mu[b], var[b])
+                # Expected shrinkage of both variances, the same terms update_ratings applies
+                gain = p * (1 - p) * (var[a] * var[a] + var[b] * var[b]) / (c * c)
+                score = (check_errors.get(pair, 0.0), gain)
+                if best_score is None or score > best_score:
+                    best_pair, best_score = pair, score
+            if best_pair is None:
+                if check_errors:
+                    # The checked pairs have run out of subgroups; the rest still inform the ratings
+                    check_errors = {}
+                    continue
+                return None
+            subgroup_index = self.next_pair_subgroup(best_pair)
+            if subgroup_index is not None:
+                return best_pair, subgroup_index
+
+    def load_next_subgroup(self):
+        """Move to the most informative pair that is left. Returns False once the budget is spent or no pair is left."""
+        self.current_subgroup = []
+        self.current_pair = []
+        if self.current_comparison >= self.total_comparisons:
+            return False
+        choice = self.choose_pair(self.mu, self.var, self.wins)
+        if choice is None:
+            return False
+        pair, subgroup_index = choice
+        self.pair_cursor[pair] = subgroup_index + 1
+        self.current_subgroup_index = subgroup_index
+        self.current_subgroup = [(self.folders[i], self.alignment.image_path(self.folders[i], subgroup_index)) for i in pair]
+        self.random.shuffle(self.current_subgroup)
+        self.current_pair = list(self.current_subgroup)
+        return True
+
+    def peek_next_subgroup(self):
+        return []
+
+    def get_upcoming_images(self):
+        """The pairs that would come next after either outcome of the current one"""
+        upcoming = []
+        pair_ids = [self.folder_ids[folder] for folder, _ in self.current_pair]
+        if len(pair_ids) < 2:
+            return upcoming
+        for winner, loser in (pair_ids, pair_ids[::-1]):
+            mu, var = list(self.mu), list(self.var)
+            update_ratings(mu, var, winner, loser)
+            wins = [list(row) for row in self.wins]
+            wins[winner][loser] += 1
+            choice = self.choose_pair(mu, var, wins)
+            if choice is not None:
+                pair, subgroup_index = choice
+                upcoming.extend((self.folders[i], self.alignment.image_path(self.folders[i], subgroup_index)) for i in pair)
+        return upcoming
+
+    def vote(self, chosen_index):
+        chosen = self.current_pair[chosen_index]
+        other = self.current_pair[1 - chosen_index]
+        self.last_chosen_side = 'left' if chosen_index == 0 else 'right'
+        self.current_comparison += 1
+        self.vote_log.append({
+            'subgroup': self.current_subgroup_index,
+            'pair': [image_path for _, image_path in self.current_pair],
+            'winner': chosen[1],
+            'winner_folder': chosen[0],
+            'completes_subgroup': False,
+        })
+        self.votes[chosen[0]] += 1
+        self.record_outcome(chosen[0], other[0])
+        return self.load_next_subgroup()
+
+    def skip_subgroup(self):
+        """Leave the current pair unrated"""
+        self.current_comparison += 1
+        self.vote_log.append({'subgroup': self.current_subgroup_index, 'skipped': True})
+        return self.load_next_subgroup()
+
+
+def insertion_comparisons(size):
+    """Most comparisons binary insertion needs to order size images; close to log2(size!)"""
+    return sum(math.ceil(math.log2(placed + 1)) for placed in range(1, size))
+
+
+class RankingSession(ComparisonSession):
+    """Orders every image of a subgroup instead of only finding its winner.
+
+    Images are placed one at a time by binary insertion: each is compared with
+    the middle of the range of places it can still take, which halves that
+    range with every choice. A subgroup of n images takes at most
+    insertion_comparisons(n) choices, for example 11 instead of 5 for six
+    images, but second and later places are known too. Each finished order
+    gives its folders Borda points, n-1 for first place down to 0 for last,
+    and those points are the session's votes.
+    """
+
+    scheduler = 'ranking'
+    vote_unit = 'points'
+
+    def __init__(self, folders, alignment, seed=None, subgroup_limit=None, **stop_rule):
+        super().__init__(folders, alignment, seed, subgroup_limit, **stop_rule)
+        # A generator of its own, so the sides don't depend on when subgroups are planned for prefetching
+        self.side_random = random.Random(f"{self.seed}-sides")
+        self.ranked = []
+        self.low = self.high = 0
+
+    def subgroup_budget(self, subgroup_size):
+        return insertion_comparisons(subgroup_size)
+
+    def load_next_screen(self):
+        """Compare the image being placed (current_pair_index) with the middle of its remaining range"""
+        if self.comparisons_within_subgroup == 0:
+            self.ranked = self.current_subgroup[:1]
+            self.current_pair_index = 1
+            self.low, self.high = 0, 1
+        middle = (self.low + self.high) // 2
+        self.current_pair = [self.current_subgroup[self.current_pair_index], self.ranked[middle]]
+        self.side_random.shuffle(self.current_pair)
+
+    def get_upcoming_images(self):
+        """The next image to place and the next subgroup's first pair; the placed ones have been shown already"""
+        upcoming = self.current_subgroup[self.current_pair_index + 1:self.current_pair_index + 2]
+        upcoming.extend(self.peek_next_subgroup()[:2])
+        return upcoming
+
+    def vote(self, chosen_index):
+        chosen = self.current_pair[chosen_index]
+        other = self.current_pair[1 - chosen_index]
+        self.last_chosen_side = 'left' if chosen_index == 0 else 'right'
+        self.current_comparison += 1
+        self.comparisons_within_subgroup += 1
+
+        # Preferred images go towards the front of the order
+        middle = (self.low + self.high) // 2
+        placing = self.current_subgroup[self.current_pair_index]
+        if chosen == placing:
+            self.high = middle
+        else:
+            self.low = middle + 1
+        if self.low == self.high:
+            self.ranked.insert(self.low, placing)
+            self.current_pair_index += 1
+            self.low, self.high = 0, len(self.ranked)
+
+        completes_subgroup = self.current_pair_index >= len(self.current_subgroup)
+        entry = {
+            'subgroup': self.current_subgroup_index,
+            'pair': [image_path for _, image_path in self.current_pair],
+            'winner': chosen[1],
+            'winner_folder': chosen[0],
+            'completes_subgroup': completes_subgroup,
+        }
+        if completes_subgroup:
+            entry['ranking'] = [folder for folder, _ in self.ranked]
+        self.vote_log.append(entry)
+
+        self.record_outcome(chosen[0], other[0])
+
+        if completes_subgroup:
+            for place, (folder, _) in enumerate(self.ranked):
+                self.votes[folder] += len(self.ranked) - 1 - place
+            # Insertion often needs fewer choices than the budget; progress counts the subgroup as done
+            self.current_comparison += self.subgroup_budget(len(self.current_subgroup)) - self.comparisons_within_subgroup
+            self.current_subgroup_index += 1
+            return self.load_next_subgroup()
+        self.load_next_screen()
+        return True
+
+
+class GridSession(ComparisonSession):
+    """Winner-stays tournament that shows up to grid_size images of a subgroup per screen.
+
+    The first screen holds the first grid_size images; after that the winner
+    stays and meets the next grid_size - 1 challengers, in a random tile so
+    it can't be recognised by its place. current_pair holds every image of
+    the screen. A choice is either the best image (vote) or an order of
+    several (rank); the images placed above another count as having won
+    against it, and those not placed at all lost to every placed one.
+    """
+
+    scheduler = 'grid'
+
+    def __init__(self, folders, alignment, seed=None, subgroup_limit=None, grid_size=DEFAULT_GRID_SIZE, **stop_rule):
+        # The budget depends on the grid size, so it has to be known before the base class counts it
+        self.grid_size = max(2, grid_size)
+        super().__init__(folders, alignment, seed, subgroup_limit, **stop_rule)
+        # A generator of its own, so the tiles don't depend on when subgroups are planned for prefetching
+        self.tile_random = random.Random(f"{self.seed}-tiles")
+
+    def subgroup_budget(self, subgroup_size):
+        # The first screen takes grid_size images, every later one grid_size - 1 new ones
+        return math.ceil(max(subgroup_size - 1, 0) / (self.grid_size - 1))
+
+    def load_next_screen(self):
+        """Fill current_pair with the winner so far and the next challengers; current_pair_index is the next unseen image"""
+        if self.subgroup_winner is None:
+            self.current_pair = self.current_subgroup[:self.grid_size]
+        else:
+            challengers = self.current_subgroup[self.current_pair_index:self.current_pair_index + self.grid_size - 1]
+            self.current_pair = [self.subgroup_winner] + challengers
+        self.current_pair_index += len(self.current_pair) - (self.subgroup_winner is not None)
+        self.tile_random.shuffle(self.current_pair)
+
+    def get_upcoming_images(self):
+        """The next screen's challengers and the first screen of the next subgroup"""
+        upcoming = self.current_subgroup[self.current_pair_index:self.current_pair_index + self.grid_size - 1]
+        upcoming.extend(self.peek_next_subgroup()[:self.grid_size])
+        return upcoming
+
+    def vote(self, chosen_index):
+        return self.rank([chosen_index])
+
+    def rank(self, order):
+        """Choose current_pair[order[0]] as the best, order[1] as second and so on. Returns False when no subgroup is left."""
+        ranked = [self.current_pair[i] for i in order]
+        unranked = [image for image in self.current_pair if image not in ranked]
+        chosen = ranked[0]
+        self.subgroup_winner = chosen
+        self.current_comparison += 1
+        self.comparisons_within_subgroup += 1
+
+        completes_subgroup = self.current_pair_index >= len(self.current_subgroup)
+        self.vote_log.append({
+            'subgroup': self.current_subgroup_index,
+            'pair': [image_path for _, image_path in self.current_pair],
+            'order': [image_path for _, image_path in ranked],
+            'winner': chosen[1],
+            'winner_folder': chosen[0],
+            'completes_subgroup': completes_subgroup,
+        })
+
+        for place, (winner_folder, _) in enumerate(ranked):
+            for loser_folder, _ in ranked[place + 1:] + unranked:
+                self.record_outcome(winner_folder, loser_folder)
+
+        if completes_subgroup:
+            self.votes[chosen[0]] += 1
+            self.current_subgroup_index += 1
+            return self.load_next_subgroup()
+        self.load_next_screen()
+        return True
+
+    def to_dict(self):
+        record = super().to_dict()
+        record['grid_size'] = self.grid_size
+        return record
+
+
+class IncrementalSession(ComparisonSession):
+    """Adds new or changed folders to the result of an earlier session instead of comparing everything again.
+
+    prior_wins is the earlier win matrix over this session's folders (zero
+    for newcomers), and leaders maps the image that won each subgroup
+    before to its folder. In every subgroup the newcomers play winner-stays
+    against that image, so the outcome is the one a full tournament would
+    have reached with the newcomers played last. Subgroups without a
+    recorded winner use the image of the highest rated earlier folder.
+    Subgroups without a newcomer aren't shown, and their winners keep the
+    vote they had.
+    """
+
+    scheduler = 'incremental'
+
+    def __init__(self, folders, alignment, seed=None, subgroup_limit=None, newcomers=(), leaders=None,
+                 prior_wins=None, **stop_rule):
+        # The budget only counts newcomer games, so these have to be known before the base class counts it
+        self.newcomers = [folder for folder in folders if folder in newcomers]
+        self.leaders = dict(leaders or {})
+        super().__init__(folders, alignment, seed, subgroup_limit, **stop_rule)
+
+        # The earlier comparisons count for the ratings and the stopping rule as if they were made now
+        self.prior_wins = prior_wins or [[0] * len(self.folders) for _ in self.folders]
+        for winner, row in enumerate(self.prior_wins):
+            for loser, count in enumerate(row):
+                self.wins[winner][loser] += count
+                self.comparison_counts[winner] += count
+                self.comparison_counts[loser] += count
+        self.start_ratings()
+        # Fixed now, so subgroups planned early for prefetching get the same fallback leader as in a replay
+        self.prior_rank = {folder: place for place, folder in enumerate(self.folders[i] for i in self.ranking())}
+
+        # The subgroups that had a winner before, and the vote each of them brings
+        self.subgroup_leaders = {}
+        for subgroup_index in range(self.subgroup_count()):
+            for folder in self.folders:
+                image_path = self.alignment.image_path(folder, subgroup_index)
+                if image_path is not None and self.leaders.get(image_path) == folder:
+                    self.subgroup_leaders[subgroup_index] = (folder, image_path)
+                    self.votes[folder] += 1
+                    break
+        self.prior_votes = dict(self.votes)
+
+    def start_ratings(self):
+        """Start the ratings of the earlier folders from a Bradley-Terry fit of prior_wins.
+
+        Replaying the earlier games one by one through update_ratings would
+        make the ratings depend on the order they are replayed in. The means
+        are the fitted log-strengths, at the scale win_probability compares
+        them on, and the variances come from their bootstrap intervals.
+        Newcomers keep the starting rating.
+        """
+        if not any(self.comparison_counts):
+            return
+        fit = RatingFit(self.folders, self.prior_wins, seed=self.seed)
+        scale = math.sqrt(2 * RATING_BETA_SQ) / ELO_SCALE
+        z = NormalDist().inv_cdf((1 + INTERVAL_LEVEL) / 2)
+        for i, count in enumerate(self.comparison_counts):
+            if count:
+                self.mu[i] = float(fit.ratings[i] * scale)
+                self.var[i] = min(1.0, float((fit.upper[i] - fit.lower[i]) / (2 * z) * scale) ** 2)
+
+    def subgroup_budget(self, subgroup_size):
+        return max(subgroup_size - 1, 0)
+
+    def calculate_total_comparisons(self):
+        total = 0
+        for subgroup_index in range(self.subgroup_count()):
+            present = [folder for folder in self.folders if self.alignment.image_path(folder, subgroup_index) is not None]
+            newcomer_count = sum(1 for folder in present if folder in self.newcomers)
+            if newcomer_count:
+                total += newcomer_count - (len(present) == newcomer_count)
+        return total
+
+    def build_subgroup(self, subgroup_index):
+        """The leader of the subgroup followed by its newcomers, with the leader on a random side of the first pair"""
+        images = [(folder, self.alignment.image_path(folder, subgroup_index)) for folder in self.folders]
+        images = [image for image in images if image[1] is not None]
+        challengers = [image for image in images if image[0] in self.newcomers]
+        if not challengers:
+            return []
+        leader = self.subgroup_leaders.get(subgroup_index)
+        if leader is None:
+            earlier = [image for image in images if image[0] not in self.newcomers]
+            leader = min(earlier, key=lambda image: self.prior_rank[image[0]]) if earlier else None
+        self.random.shuffle(challengers)
+        subgroup = ([leader] if leader is not None else []) + challengers
+        if self.random.random() < 0.5:
+            subgroup[:2] = subgroup[1::-1]
+        return subgroup
+
+    def vote(self, chosen_index):
+        previous_leader = self.subgroup_leaders.get(self.current_subgroup_index)
+        completes_subgroup = self.comparisons_within_subgroup + 1 >= len(self.current_subgroup) - 1
+        has_pair = super().vote(chosen_index)
+        if completes_subgroup and previous_leader is not None:
+            # The subgroup's vote moves to whoever won it now, which may be the same folder again
+            self.votes[previous_leader[0]] -= 1
+            self.vote_log[-1]['previous_leader'] = previous_leader[1]
+        return has_pair
+
+    def to_dict(self):
+        record = super().to_dict()
+        record['newcomers'] = self.newcomers
+        record['leaders'] = self.leaders
+        record['prior_wins'] = self.prior_wins
+        record['prior_votes'] = self.prior_votes
+        return record
+
+
+SCHEDULERS = {
+    'tournament': ComparisonSession,
+    'adaptive': AdaptiveSession,
+    'ranking': RankingSession,
+    'grid': GridSession,
+    'incremental': IncrementalSession,
+}
+
+
+def make_session(folders, alignment, scheduler='tournament', seed=None, subgroup_limit=None,
+                 stop_top_k=DEFAULT_STOP_TOP_K, stop_confidence=DEFAULT_STOP_CONFIDENCE, **options):
+    """Create the session for a scheduler; options are passed on to it, e.g. grid_size for 'grid'"""
+    if scheduler not in SCHEDULERS:
+        raise ValueError(f"Unknown pair scheduler '{scheduler}', expected one of {', '.join(SCHEDULERS)}")
+    return SCHEDULERS[scheduler](folders, alignment, seed=seed, subgroup_limit=subgroup_limit,
+                                 stop_top_k=stop_top_k, stop_confidence=stop_confidence, **options)
+
+
+def load_session_record(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        record = json.load(f)
+    if record.get('format') != SESSION_FORMAT:
+        raise ValueError(f"{path} is not a session saved by this version")
+    return record
+
+
+def find_previous_session(results_dir, folders, fingerprints):
+    """The newest session saved in results_dir, if it has two or more of folders unchanged and lacks some of the others.
+
+    Returns (path, record), or (None, None) when there is nothing to reuse.
+    """
+    paths = sorted(glob.glob(os.path.join(glob.escape(results_dir), "comparison_session_*.json")), reverse=True)
+    for path in paths:
+        try:
+            record = load_session_record(path)
+        except (OSError, ValueError):
+            continue
+        kept = unchanged_folders(record, folders, fingerprints)
+        if len(kept) >= 2:
+            # The newest session of these folders decides; if it already has them all, there is nothing to add
+            return (path, record) if len(kept) < len(folders) else (None, None)
+    return None, None
+
+
+def replay_session(record, folder_index):
+    """Rebuild a session from a saved record by playing its votes again on the current folder contents.
+
+    Raises ValueError if a recorded choice no longer matches the pair the
+    session produces, which means the folders have changed since.
+    """
+    folders = record['folders']
+    errors = folder_index.refresh_all(folders)
+    if errors:
+        raise ValueError("Could not read " + ", ".join(f"{folder} ({e})" for folder, e in errors))
+    alignment = make_alignment(folder_index, folders, record.get('alignment_key_pattern'))
+    if 'subgroup_sample' in record:
+        alignment = SampledAlignment(alignment, record['subgroup_sample'])
+    options = {key: record[key] for key in ('grid_size', 'newcomers', 'leaders', 'prior_wins') if key in record}
+    session = make_session(folders, alignment, record.get('scheduler', 'tournament'), seed=record['seed'],
+                           stop_top_k=record.get('stop_top_k', DEFAULT_STOP_TOP_K),
+                           stop_confidence=record.get('stop_confidence', DEFAULT_STOP_CONFIDENCE), **options)
+    session.fingerprints = folder_fingerprints(folder_index, folders)
+    has_pair = session.load_next_subgroup()
+    for number, entry in enumerate(record['vote_log'], 1):
+        if not has_pair or entry['subgroup'] != session.current_subgroup_index:
+            raise ValueError(f"Vote {number} was made in subgroup {entry['subgroup'] + 1}, but the replay is at subgroup {session.current_subgroup_index + 1}")
+        if entry.get('skipped'):
+            has_pair = session.skip_subgroup()
+            continue
+        pair = [image_path for _, image_path in session.current_pair]
+        if pair != entry['pair']:
+            raise ValueError(f"Vote {number} was between {entry['pair']}, but the replay shows {pair}")
+        if 'order' in entry:
+            has_pair = session.rank([pair.index(image_path) for image_path in entry['order']])
+        else:
+            has_pair = session.vote(pair.index(entry['winner']))
+    return session
+
+
+def tally_votes(record):
+    """Count the votes in a saved record without touching any images"""
+    # Tournaments vote once per subgroup, the adaptive scheduler once per comparison,
+    # and rankings give Borda points for every place
+    every_win_counts = record.get('scheduler') == 'adaptive'
+    votes = dict(record.get('prior_votes') or {folder: 0 for folder in record['folders']})
+    for entry in record['vote_log']:
+        if 'previous_leader' in entry:
+            # Incremental sessions move a subgroup's earlier vote to its new winner
+            votes[record['leaders'][entry['previous_leader']]] -= 1
+        if 'ranking' in entry:
+            for place, folder in enumerate(entry['ranking']):
+                votes[folder] += len(entry['ranking']) - 1 - place
+        elif entry.get('completes_subgroup') or (every_win_counts and 'winner_folder' in entry):
+            votes[entry['winner_folder']] += 1
+    return votes
+
+
+def fit_record_ratings(record):
+    """Ratings from a saved record's win matrix, or None for records saved before it was kept"""
+    if 'win_matrix' not in record:
+        return None
+    return RatingFit(record['folders'], record['win_matrix'], seed=record['seed'])
+
+
+def format_rating(rating, lower, upper):
+    return f"{rating:+.0f} (95% interval {lower:+.0f} to {upper:+.0f})"
+
+
+def format_results(session, folder_index, timestamp, ratings):
+    """The text of a results file"""
+    result_content = f"Image Batch Compare Results - {timestamp}\n"
+    result_content += "=" * 50 + "\n\n"
+
+    # Add the comparison details
+    result_content += f"Total comparisons: {session.total_comparisons}\n"
+    if session.current_comparison < session.total_comparisons:
+        result_content += f"Comparisons made: {session.current_comparison} (ended early)\n"
+    result_content += f"Folders compared: {len(session.folders)}\n"
+    if isinstance(session.alignment, SampledAlignment):
+        result_content += (f"Subgroups sampled: {session.alignment.subgroup_count()} of {session.alignment.eligible_count()}"
+                           f" (folder shares of subgroup wins within ±{session.alignment.margin_of_error():.1%}, 95%)\n")
+    if session.scheduler == 'incremental':
+        reused = len(session.folders) - len(session.newcomers)
+        result_content += (f"Reused earlier results of {reused} unchanged folders, compared: "
+                           f"{', '.join(os.path.basename(folder) for folder in session.newcomers)}\n")
+    top_k = min(session.stop_top_k, len(session.folders) - 1)
+    result_content += f"Confidence in the order of the top {top_k}: {session.ranking_confidence():.1%}\n\n"
+
+    # Add the voting results first (moved to the top)
+    result_content += f"Results by folder (sorted by {session.vote_unit}):\n"
+    result_content += "-" * 30 + "\n"
+    for i, (folder, votes) in enumerate(session.sorted_votes(), 1):
+        folder_name = os.path.basename(folder)
+        result_content += f"{i}. {folder_name}: {votes} {session.vote_unit}\n"
+    result_content += "\n"
+
+    # Ratings use every comparison, not just the last one of each subgroup
+    result_content += f"Ratings from all {ratings.comparisons} comparisons (Bradley-Terry, Elo scale):\n"
+    result_content += "-" * 30 + "\n"
+    for i, (folder, rating, lower, upper) in enumerate(ratings.ranked(), 1):
+        result_content += f"{i}. {os.path.basename(folder)}: {format_rating(rating, lower, upper)}\n"
+    result_content += "\n"
+
+    # Add detailed folder information after the results
+    result_content += "Folders included in comparison:\n"
+    result_content += "-" * 30 + "\n"
+    for i, folder in enumerate(session.folders, 1):
+        folder_name = os.path.basename(folder)
+        result_content += f"{i}. {folder_name}\n"
+        result_content += f"   Full path: {folder}\n"
+        result_content += f"   Image count: {folder_index.image_count(folder)}\n\n"
+
+    # Add timestamp at the end
+    result_content += "-" * 50 + "\n"
+    result_content += f"Comparison completed at: {timestamp}\n"
+    return result_content
+
+
+def save_results(session, folder_index, results_dir, ratings=None):
+    """Write the results and the replayable session to timestamped files in results_dir. Returns the results path."""
+    if ratings is None:
+        ratings = session.fit_ratings()
+    # Create the Results directory only when needed
+    if not os.path.exists(results_dir):
+        os.makedirs(results_dir)
+
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    result_file_path = os.path.join(results_dir, f"comparison_results_{timestamp}.txt")
+    with open(result_file_path, "w") as f:
+        f.write(format_results(session, folder_index, timestamp, ratings))
+    with open(os.path.join(results_dir, f"comparison_session_{timestamp}.json"), "w", encoding='utf-8') as f:
+        json.dump(session.to_dict(), f, indent=1)
+    return result_file_path
@@ -0,0 +1,213 @@
+import hashlib
+import mmap
+import os
+import re
+import threading
+from PIL import Image
+from archive_source import stat_source
+
+# Default size limit for the persistent display cache
+DEFAULT_DISK_CACHE_MB = 2048
+DEFAULT_DISK_CACHE_DIR = "ibc-cache"
+
+CACHE_EXTENSION = ".ppm"
+PPM_HEADER = re.compile(rb"P6\s+(\d+)\s+(\d+)\s+255\s")
+
+
+def read_ppm_header(f):
+    """Parse a binary PPM (P6) header, returning (width, height, pixel offset) or None"""
+    match = PPM_HEADER.match(f.read(64))
+    if match is None:
+        return None
+    # Exactly one whitespace byte separates the header from the pixel data
+    return int(match.group(1)), int(match.group(2)), match.end()
+
+
+class DiskImageCache:
+    """Persistent cache of display-sized RGB renditions, stored as raw binary PPM files.
+
+    Entries are keyed by the source path, size and mtime plus the target size,
+    so a later session only needs a stat of the original file. The pixels are
+    read through a memory map, without any PNG/JPEG decode, and the files
+    themselves are valid PPM images that Tk can load as-is.
+    """
+
+    def __init__(self, directory=DEFAULT_DISK_CACHE_DIR, max_bytes=DEFAULT_DISK_CACHE_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries = {}  # file name -> (size in bytes, last used time)
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.scan()
+
+    def scan(self):
+        """Rebuild the in-memory index from the files in the cache directory"""
+        with self.lock:
+            self.entries = {}
+            self.current_bytes = 0
+            if not os.path.isdir(self.directory):
+                return
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.endswith(CACHE_EXTENSION):
+                        stat = entry.stat()
+                        self.entries[entry.name] = (stat.st_size, stat.st_mtime)
+                        self.current_bytes += stat.st_size
+
+    @staticmethod
+    def make_key(image_path, target_size):
+        stat = stat_source(image_path)
+        source = f"{os.path.abspath(image_path)}|{stat.st_size}|{stat.st_mtime_ns}|{target_size[0]}x{target_size[1]}"
+        return hashlib.sha1(source.encode("utf-8")).hexdigest() + CACHE_EXTENSION
+
+    def get_cache_path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        """Return the cached image for key, or None"""
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+        cache_path = self.get_cache_path(key)
+        try:
+            with open(cache_path, "rb") as f:
+                header = read_ppm_header(f)
+                if header is None:
+                    raise ValueError("bad header")
+                width, height, offset = header
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    pixels = memoryview(mapped)[offset:offset + width * height * 3]
+                    try:
+                        # RGB pixels are unpacked into Pillow's own storage, so the map can be
+                        # closed (and the file evicted) while the image is still on screen
+                        image = Image.frombuffer("RGB", (width, height), pixels, "raw", "RGB", 0, 1)
+                    finally:
+                        pixels.release()
+            os.utime(cache_path)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Dropping unreadable cache entry {key}: {e}")
+            self.remove(key)
+            with self.lock:
+                self.misses += 1
+            return None
+
+        with self.lock:
+            size, _ = self.entries.get(key, (0, 0))
+            self.entries[key] = (size, os.path.getmtime(cache_path))
+            self.hits += 1
+        return image
+
+    def put(self, key, image):
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        header = f"P6\n{image.width} {image.height}\n255\n".encode("ascii")
+        size = len(header) + image.width * image.height * 3
+        if size > self.max_bytes:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        cache_path = self.get_cache_path(key)
+        temp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(header)
+                f.write(image.tobytes())
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            print(f"Warning: Could not write cache entry {key}: {e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+
+        with self.lock:
+            old_size, _ = self.entries.get(key, (0, 0))
+            self.entries[key] = (size, os.path.getmtime(cache_path))
+            self.current_bytes += size - old_size
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used files until the cache fits its size limit (lock must be held)"""
+        if self.current_bytes <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(self.entries.items(), key=lambda item: item[1][1]):
+            if self.current_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(self.get_cache_path(key))
+            except OSError as e:
+                # On Windows a file that is still open can't be deleted; try again next time
+                print(f"Warning: Could not evict cache entry {key}: {e}")
+                continue
+            del self.entries[key]
+            self.current_bytes -= size
+
+    def remove(self, key):
+        try:
+            os.remove(self.get_cache_path(key))
+        except OSError:
+            pass
+        with self.lock:
+            size, _ = self.entries.pop(key, (0, 0))
+            self.current_bytes -= size
+
+    def set_max_bytes(self, max_bytes):
+        with self.lock:
+            self.max_bytes = max_bytes
+            self.evict()
+
+    def verify(self):
+        """Check every cache file and delete the ones that are truncated or corrupt.
+
+        Returns a (checked, removed) tuple.
+        """
+        checked = 0
+        removed = 0
+        if not os.path.isdir(self.directory):
+            return checked, removed
+        with os.scandir(self.directory) as it:
+            names = [entry.name for entry in it if entry.is_file()]
+        for name in names:
+            cache_path = self.get_cache_path(name)
+            if not name.endswith(CACHE_EXTENSION):
+                # Leftovers from interrupted writes
+                if name.endswith(".tmp"):
+                    try:
+                        os.remove(cache_path)
+                        removed += 1
+                    except OSError:
+                        pass
+                continue
+            checked += 1
+            try:
+                with open(cache_path, "rb") as f:
+                    header = read_ppm_header(f)
+                valid = header is not None and os.path.getsize(cache_path) == header[2] + header[0] * header[1] * 3
+            except OSError:
+                valid = False
+            if not valid:
+                self.remove(name)
+                removed += 1
+        self.scan()
+        return checked, removed
+
+    def clear(self):
+        with self.lock:
+            keys = list(self.entries)
+        for key in keys:
+            self.remove(key)
+        self.scan()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self.entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -0,0 +1,63 @@
+import os
+import re
+from archive_source import is_archive
+from folder_index import BATCH_EXTENSION, is_batch_manifest, is_image_file, write_batch_manifest
+
+# Manifests for dropped files live here, next to ibc-settings.json
+DEFAULT_BATCH_DIR = "ibc-batches"
+
+BATCH_PREFIX = "image_batch_"
+
+# A Tcl list as delivered by tkinterdnd2: paths with spaces are wrapped in braces
+DROP_ITEM = re.compile(r"\{([^}]*)\}|(\S+)")
+
+
+def parse_drop_data(raw_data):
+    """Split the data of a drop event into paths"""
+    return [(braced or bare).strip().strip('"') for braced, bare in DROP_ITEM.findall(raw_data)]
+
+
+def resolve_dropped_paths(paths):
+    """Sort dropped paths into (image groups, image files).
+
+    Folders and archives are image groups. Some platforms send a directory
+    followed by names relative to it, so those are joined back together.
+    """
+    directories = []
+    image_files = []
+    current_dir = None
+    for path in paths:
+        if os.path.isdir(path):
+            current_dir = path
+            directories.append(path)
+        elif current_dir and os.path.isfile(os.path.join(current_dir, path)):
+            if is_image_file(path):
+                image_files.append(os.path.join(current_dir, path))
+        elif os.path.isfile(path) and is_image_file(path):
+            image_files.append(path)
+        elif os.path.isfile(path) and is_archive(path):
+            directories.append(path)
+    return directories, image_files
+
+
+def create_batch_manifest(image_files, batch_dir=DEFAULT_BATCH_DIR):
+    """Write a manifest referencing image_files under the next free image_batch_N name and return its path"""
+    os.makedirs(batch_dir, exist_ok=True)
+    batch_number = 1
+    while True:
+        manifest_path = os.path.abspath(os.path.join(batch_dir, f"{BATCH_PREFIX}{batch_number}{BATCH_EXTENSION}"))
+        try:
+            # Exclusive create, so two drops at once can't pick the same number
+            with open(manifest_path, 'x'):
+                pass
+            break
+        except FileExistsError:
+            batch_number += 1
+    write_batch_manifest(manifest_path, image_files)
+    return manifest_path
+
+
+def is_drop_batch(path, batch_dir=DEFAULT_BATCH_DIR):
+    """True for manifests created from dropped files, which are removed along with their entry"""
+    return (is_batch_manifest(path) and os.path.dirname(path) == os.path.abspath(batch_dir)
+            and os.path.basename(path).startswith(BATCH_PREFIX))
@@ -0,0 +1,120 @@
+import hashlib
+import os
+import threading
+from archive_source import close_reader, is_archive, list_archive
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp')
+
+# Dropped files become a manifest listing their original paths instead of a folder of copies
+BATCH_EXTENSION = '.ibcbatch'
+
+
+def is_image_file(name):
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def is_batch_manifest(path):
+    return path.lower().endswith(BATCH_EXTENSION)
+
+
+def read_batch_manifest(path):
+    """Return the absolute image paths listed in a batch manifest, one per line"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f if line.strip()]
+
+
+def write_batch_manifest(path, image_paths):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        for image_path in image_paths:
+            f.write(os.path.abspath(image_path) + '\n')
+    os.replace(temp_path, path)
+
+
+class FolderIndex:
+    """Sorted image listings per folder, built with a single scandir pass.
+
+    refresh() only walks a folder again when its mtime has changed since the
+    last scan (adding, removing or renaming files updates it). Lookups by
+    subgroup index never touch the filesystem.
+
+    A batch manifest can stand in for a folder. Its entries are absolute
+    paths sorted by file name, so they line up with folders of the same
+    images, and os.path.join(manifest, entry) resolves to the entry itself.
+
+    So can a zip or tar archive, whose entries are member names sorted the
+    same way and read through archive_source without extraction.
+    """
+
+    def __init__(self):
+        self.entries = {}  # folder -> (mtime_ns, sorted image names)
+        self.lock = threading.Lock()
+
+    def scan(self, folder):
+        if is_batch_manifest(folder):
+            image_paths = [path for path in read_batch_manifest(folder) if is_image_file(path)]
+            return sorted(image_paths, key=lambda path: (os.path.basename(path), path))
+        if is_archive(folder):
+            member_names = [name for name in list_archive(folder) if is_image_file(name)]
+            return sorted(member_names, key=lambda name: (name.rsplit('/', 1)[-1], name))
+        with os.scandir(folder) as it:
+            return sorted(entry.name for entry in it if is_image_file(entry.name) and entry.is_file())
+
+    def refresh(self, folder):
+        """Make sure the listing of folder is current. Returns the sorted image names."""
+        mtime_ns = os.stat(folder).st_mtime_ns
+        with self.lock:
+            entry = self.entries.get(folder)
+        if entry is not None and entry[0] == mtime_ns:
+            return entry[1]
+        images = self.scan(folder)
+        with self.lock:
+            self.entries[folder] = (mtime_ns, images)
+        return images
+
+    def refresh_all(self, folders):
+        """Refresh every folder, returning a list of (folder, error) for the ones that couldn't be read"""
+        errors = []
+        for folder in folders:
+            try:
+                self.refresh(folder)
+            except OSError as e:
+                errors.append((folder, e))
+        return errors
+
+    def images(self, folder):
+        entry = self.entries.get(folder)
+        return entry[1] if entry is not None else []
+
+    def image_count(self, folder):
+        return len(self.images(folder))
+
+    def image_name(self, folder, index):
+        images = self.images(folder)
+        return images[index] if index < len(images) else None
+
+    def image_path(self, folder, index):
+        image_name = self.image_name(folder, index)
+        return os.path.join(folder, image_name) if image_name is not None else None
+
+    def fingerprint(self, folder):
+        """Hash of the indexed image names with their sizes and mtimes, which changes when any image does.
+
+        Archive members share the archive's size and mtime.
+        """
+        digest = hashlib.sha1()
+        archive_stat = os.stat(folder) if is_archive(folder) else None
+        for image_name in self.images(folder):
+            stat = archive_stat or os.stat(os.path.join(folder, image_name))
+            digest.update(f"{image_name}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def max_image_count(self, folders):
+        return max((self.image_count(folder) for folder in folders), default=0)
+
+    def forget(self, folder):
+        """Drop the listing of folder, and close its archive if it is one"""
+        with self.lock:
+            self.entries.pop(folder, None)
+        if is_archive(folder):
+            close_reader(folder)
@@ -0,0 +1,140 @@
+"""Image Batch Compare without a window: check folders, replay saved sessions and compute results.
+
+Every finished comparison in the application also saves a
+Results/comparison_session_<timestamp>.json next to its results file; those are
+what replay and results read.
+
+    python image-batch-compare-cli.py scan FOLDER FOLDER ... [--key-pattern REGEX] [--sample N] [--minutes M] [--reuse RESULTS_DIR] [--preflight]
+    python image-batch-compare-cli.py replay Results/comparison_session_<timestamp>.json [--save]
+    python image-batch-compare-cli.py results Results/comparison_session_<timestamp>.json
+"""
+import argparse
+import os
+import re
+import sys
+
+from comparison_engine import (SCHEDULERS, ComparisonSession, IncrementalSession, find_previous_session, fit_record_ratings,
+                               format_rating, load_session_record, replay_session, save_results, tally_votes)
+from folder_index import FolderIndex
+from session_planner import folder_fingerprints, plan_incremental, plan_sample
+from subgroup_alignment import make_alignment
+
+
+def print_votes(sorted_votes, unit='votes'):
+    for i, (folder, votes) in enumerate(sorted_votes, 1):
+        print(f"{i}. {os.path.basename(folder)}: {votes} {unit}")
+
+
+def print_ratings(ratings):
+    print(f"Ratings from all {ratings.comparisons} comparisons (Bradley-Terry, Elo scale):")
+    for i, (folder, rating, lower, upper) in enumerate(ratings.ranked(), 1):
+        print(f"{i}. {os.path.basename(folder)}: {format_rating(rating, lower, upper)}")
+
+
+def scan(args):
+    folder_index = FolderIndex()
+    errors = folder_index.refresh_all(args.folders)
+    for folder, e in errors:
+        print(f"Could not read {folder}: {e}")
+    if errors:
+        return 1
+
+    try:
+        alignment = make_alignment(folder_index, args.folders, args.key_pattern)
+    except re.error as e:
+        print(f"Invalid key pattern: {e}")
+        return 1
+    for folder in args.folders:
+        print(f"{os.path.basename(folder)}: {folder_index.image_count(folder)} images, {alignment.unmatched[folder]} without a match")
+    print(f"{alignment.subgroup_count()} subgroups, {ComparisonSession(args.folders, alignment).total_comparisons} comparisons")
+
+    if args.reuse:
+        fingerprints = folder_fingerprints(folder_index, args.folders)
+        path, record = find_previous_session(args.reuse, args.folders, fingerprints)
+        if record is None:
+            print(f"No session in {args.reuse} ranks some of these folders unchanged")
+        else:
+            alignment, options, kept = plan_incremental(record, alignment, fingerprints)
+            session = IncrementalSession(args.folders, alignment, **options)
+            print(f"{os.path.basename(path)} ranks {len(kept)} of the folders unchanged; "
+                  f"adding {', '.join(os.path.basename(folder) for folder in options['newcomers'])} takes {session.total_comparisons} comparisons")
+    elif args.sample is not None or args.minutes is not None:
+        try:
+            plan = plan_sample(alignment, args.sample, args.minutes, args.bucket_pattern, seed=args.seed)
+        except re.error as e:
+            print(f"Invalid bucket pattern: {e}")
+            return 1
+        alignment = plan.alignment
+        print(plan.describe())
+        print(f"Sample: {ComparisonSession(args.folders, alignment).total_comparisons} comparisons")
+
+    if args.preflight:
+        from preflight import run_preflight
+        report = run_preflight(args.folders, folder_index, alignment)
+        print()
+        print(report.format_text())
+        return 1 if report.has_problems else 0
+    return 0
+
+
+def replay(args):
+    record = load_session_record(args.session)
+    try:
+        session = replay_session(record, FolderIndex())
+    except ValueError as e:
+        print(f"Replay failed: {e}")
+        return 1
+    print(f"Replayed {len(record['vote_log'])} recorded choices, {session.current_comparison}/{session.total_comparisons} comparisons")
+    print(f"Confidence in the order of the top {session.stop_top_k}: {session.ranking_confidence():.1%}")
+    print_votes(session.sorted_votes(), session.vote_unit)
+    print()
+    ratings = session.fit_ratings()
+    print_ratings(ratings)
+    if args.save:
+        print(f"Results have been saved to {save_results(session, session.alignment.folder_index, args.results_dir, ratings)}")
+    return 0
+
+
+def results(args):
+    record = load_session_record(args.session)
+    votes = tally_votes(record)
+    unit = SCHEDULERS[record.get('scheduler', 'tournament')].vote_unit
+    print_votes(sorted(votes.items(), key=lambda x: x[1], reverse=True), unit)
+    ratings = fit_record_ratings(record)
+    if ratings is not None:
+        print()
+        print_ratings(ratings)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scan_parser = commands.add_parser('scan', help="list the subgroups that a set of folders would make")
+    scan_parser.add_argument('folders', nargs='+')
+    scan_parser.add_argument('--key-pattern', help="pair images by this regex instead of by position (see alignment_key_pattern)")
+    scan_parser.add_argument('--sample', type=int, help="plan a session on a random sample of this many subgroups")
+    scan_parser.add_argument('--minutes', type=float, help="plan a session on as many subgroups as fit in this many minutes")
+    scan_parser.add_argument('--bucket-pattern', help="spread the sample evenly over the keys this regex matches in file names")
+    scan_parser.add_argument('--seed', type=int, help="seed for the sample")
+    scan_parser.add_argument('--reuse', metavar='RESULTS_DIR', help="plan a session that only adds new and changed folders to the newest saved one")
+    scan_parser.add_argument('--preflight', action='store_true', help="also read every image header (only the sampled ones with --sample) and report problems")
+    scan_parser.set_defaults(run=scan)
+
+    replay_parser = commands.add_parser('replay', help="play a saved session's votes again on the current folders")
+    replay_parser.add_argument('session')
+    replay_parser.add_argument('--save', action='store_true', help="write a results file for the replayed session")
+    replay_parser.add_argument('--results-dir', default="Results")
+    replay_parser.set_defaults(run=replay)
+
+    results_parser = commands.add_parser('results', help="count the votes in a saved session without reading any images")
+    results_parser.add_argument('session')
+    results_parser.set_defaults(run=results)
+
+    args = parser.parse_args()
+    sys.exit(args.run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,42 @@
+import time
+
+# Measured from as early as possible, for the time-to-first-window check
+STARTUP_TIME = time.perf_counter()
+
 import os
 import math
-import random
+import queue
+import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from PIL import Image, ImageTk
 import sys
 import json
-from tkinterdnd2 import *
-import time
-import shutil
-import subprocess
-import datetime
+import re
+from archive_source import is_archive
+from folder_index import FolderIndex
+from subgroup_alignment import make_alignment
+
+# PIL, tkinterdnd2, subprocess and datetime are imported where they are first used,
+# so the main window can appear before they are loaded
 
 # Version constant
 VERSION = "1.01"
 
+# How often to check whether background decodes for the current screen have finished (ms)
+REFINE_POLL_MS = 10
+
+# Mouse motion is applied at most once per display frame (ms)
+MOTION_FRAME_MS = 16
+
+# How often to pick up results of the background folder check (ms)
+FOLDER_CHECK_POLL_MS = 50
+
+# The main window should be on screen within this long after launch (ms)
+STARTUP_TARGET_MS = 500
+
+# How often live mode looks for newly finished images (ms)
+LIVE_POLL_MS = 1000
+
 # Add support for PyInstaller
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
@@ -32,36 +54,23 @@ if getattr(sys, 'frozen', False):
         os.environ['TCL_LIBRARY'] = resource_path('tcl')
         os.environ['TK_LIBRARY'] = resource_path('tk')
 
-# Now import tkinterdnd2
-try:
-    from tkinterdnd2 import *
-except ImportError:
-    print("Error: Could not import tkinterdnd2")
-    # Fallback to regular tkinter without drag and drop
-    TkinterDnD = tk
-    print("Warning: Drag and drop functionality will not be available")
-
 class ImageBatchCompare:
     def __init__(self):
-        # Initialize root window based on whether tkinterdnd2 is available
-        try:
-            self.root = TkinterDnD.Tk()
-        except:
-            self.root = tk.Tk()
-            print("Warning: Using fallback Tk implementation without drag and drop support")
+        # Drag and drop support is loaded into this root once the window is up
+        self.root = tk.Tk()
         
         self.root.title("Image Batch Compare")
         self.root.geometry("1440x720")
         
-        # Set the window icon
+        # Set the window icon (Tk reads PNG itself, so PIL isn't needed yet)
         try:
             icon_path = resource_path("icon.png")
             if hasattr(sys, '_MEIPASS'):  # Check if running as executable
                 # Load icon directly from the executable's temporary directory
-                icon_image = ImageTk.PhotoImage(file=icon_path)
+                icon_image = tk.PhotoImage(file=icon_path)
             else:
                 # Load icon normally when running as script
-                icon_image = ImageTk.PhotoImage(file="icon.png")
+                icon_image = tk.PhotoImage(file="icon.png")
             self.root.iconphoto(True, icon_image)
         except Exception as e:
             print(f"Warning: Could not load application icon: {e}")
@@ -80,22 +89,84 @@ class ImageBatchCompare:
         self.base_font_size = self.calculate_base_font_size(screen_width, screen_height)
         
         self.folders = []
-        self.folder_images = {}
+        # Sorted image names per folder; folders are only rescanned when their mtime changes
+        self.folder_index = FolderIndex()
         self.current_images = []
-        self.votes = {}
         self.resize_timer = None
-        self.total_comparisons = 0
-        self.current_comparison = 0
-        self.comparisons_within_subgroup = 0
+        self.last_window_size = None
         
-        self.current_subgroup_index = 0
-        self.current_subgroup = []
-        self.subgroup_winner = None
+        # Tournament state lives in a comparison_engine.ComparisonSession while a comparison runs
+        self.session = None
         self.current_screen_images = []
         self.screen_winner = None
         self.current_index = 0
         self.winner_position = None
         
+        # Background loads for the images on screen; the token invalidates refinements of older screens
+        self.screen_token = 0
+        self.screen_jobs = []
+        self.screen_image_quality = []
+        
+        # Render state of the comparison canvas, so mouse motion only touches Tk on transitions
+        self.overlay_layout_key = None
+        self.label_metrics = {}
+        self.label_side = None
+        self.divider_visible = None
+        self.motion_timer = None
+        self.pending_mouse = None
+        self.rendered_mouse = None
+        
+        # Cache settings from ibc-settings.json; None means the image pipeline's default
+        self.display_cache_mb = None
+        self.disk_cache_mb = None
+        self.display_cache_dir = None
+        
+        # Optional regex that pairs images by a key in their file names instead of by position
+        self.alignment_key_pattern = None
+        # 'tournament' plays every subgroup winner-stays; 'adaptive' picks the most informative pairs;
+        # 'ranking' puts every subgroup in full order
+        self.pair_scheduler = 'tournament'
+        self.alignment = None
+        
+        # Once the order of the top early_stop_top_k folders is known with early_stop_confidence,
+        # 'ask' offers to end the session, 'auto' ends it and 'off' always runs every comparison
+        self.early_stop = 'ask'
+        self.early_stop_top_k = 1
+        self.early_stop_confidence = 0.95
+        self.early_stop_declined = False
+        
+        # 'pair' flips between two full-screen images; 'grid' shows up to grid_size images of a subgroup at once
+        self.screen_mode = 'pair'
+        self.grid_size = 4
+        # Tile rectangles of the current grid screen, and the order typed so far with the number keys
+        self.grid_tiles = []
+        self.grid_order = []
+        self.hovered_tile = None
+        
+        # Very large sets can be rated on a sample of sample_subgroups subgroups, or as many as fit in
+        # sample_minutes; sample_bucket_pattern spreads the sample over the keys it matches in file names
+        self.sample_subgroups = None
+        self.sample_minutes = None
+        self.sample_bucket_pattern = None
+        
+        # When the newest saved session already ranks some of the folders unchanged, 'ask' offers to compare
+        # only the new and changed ones against it, 'auto' does so without asking and 'off' always starts over
+        self.reuse_results = 'ask'
+        self.incremental_options = None
+        # The folders' fingerprints when the session started, see check_previous_session
+        self.session_fingerprints = None
+        
+        # Live mode starts on the subgroups that are complete and adds the rest as they are written
+        self.live_mode_enabled = False
+        self.live_ingest = None
+        self.waiting_for_images = False
+        
+        # The image pipeline (and PIL with it) is only set up when it is first needed
+        self.display_cache = None
+        self.disk_cache = None
+        self.prefetcher = None
+        self.photo_transfer = None
+        
         self.config_file = "ibc-settings.json"
         self.last_directory = None
         self.load_config()
@@ -105,7 +176,6 @@ class ImageBatchCompare:
         
         self.root.bind("<BackSpace>", self.skip_current_selection)
 
-        self.current_image = None
         self.left_image = None
         self.right_image = None
 
@@ -117,8 +187,6 @@ class ImageBatchCompare:
         self.click_disabled = False
         self.click_disable_timer = None
 
-        self.last_chosen_side = None  # Add this line
-
         self.setup_ui()
 
         self.canvas.bind("<Motion>", self.on_mouse_move)
@@ -130,6 +198,104 @@ class ImageBatchCompare:
         self.reset_comparison_state()
 
         self.root.bind("<Configure>", self.on_window_configure)
+        
+        # Saved folders are checked and counted in the background once the window is showing
+        self.root.after_idle(self.on_first_idle)
+
+    def on_first_idle(self):
+        startup_ms = (time.perf_counter() - STARTUP_TIME) * 1000
+        print(f"Main window ready after {startup_ms:.0f} ms (target {STARTUP_TARGET_MS} ms)")
+        if startup_ms > STARTUP_TARGET_MS:
+            print("Warning: Startup was slower than the target")
+        
+        self.validate_folders_in_background(self.folders)
+        self.enable_drag_and_drop()
+
+    def enable_drag_and_drop(self):
+        try:
+            from tkinterdnd2 import DND_FILES, TkinterDnD
+            # Older tkinterdnd2 versions only have the private name
+            require = getattr(TkinterDnD, 'require', None) or TkinterDnD._require
+            require(self.root)
+            # The root itself isn't a tkdnd widget unless it was created by TkinterDnD.Tk,
+            # but the main frame covers the whole window
+            self.main_frame.drop_target_register(DND_FILES)
+            self.main_frame.dnd_bind('<<Drop>>', self.handle_drop)
+        except Exception as e:
+            print(f"Warning: Drag and drop functionality will not be available: {e}")
+
+    def ensure_image_pipeline(self):
+        """Create the caches, prefetcher and photo transfer on first use"""
+        if self.prefetcher is not None:
+            return
+        from image_pipeline import DEFAULT_CACHE_MB, DisplayImageCache, ImagePrefetcher
+        from disk_cache import DEFAULT_DISK_CACHE_DIR, DEFAULT_DISK_CACHE_MB, DiskImageCache
+        from photo_transfer import PhotoTransfer
+        
+        if self.display_cache_mb is None:
+            self.display_cache_mb = DEFAULT_CACHE_MB
+        if self.disk_cache_mb is None:
+            self.disk_cache_mb = DEFAULT_DISK_CACHE_MB
+        if self.display_cache_dir is None:
+            self.display_cache_dir = DEFAULT_DISK_CACHE_DIR
+        
+        # Decoded images are kept in memory so the reigning winner isn't reloaded every screen,
+        # and on disk so later sessions over the same folders don't decode the originals again
+        self.display_cache = DisplayImageCache(self.display_cache_mb * 1024 * 1024)
+        if self.disk_cache_mb > 0:
+            self.disk_cache = DiskImageCache(self.display_cache_dir, self.disk_cache_mb * 1024 * 1024)
+        self.prefetcher = ImagePrefetcher(cache=self.display_cache, disk_cache=self.disk_cache)
+        self.photo_transfer = PhotoTransfer(self.root)
+
+    def validate_folders_in_background(self, folders):
+        """Check that folders exist and count their images on a worker thread, updating the tree as results arrive.
+
+        Saved folders may be on network drives that are slow or unreachable,
+        which must not hold up the window.
+        """
+        if not folders:
+            return
+        folders = list(folders)
+        results = queue.Queue()
+        
+        def check_folders():
+            for folder in folders:
+                try:
+                    image_count = len(self.folder_index.refresh(folder))
+                    results.put((folder, image_count, None))
+                except OSError as e:
+                    results.put((folder, None, e))
+            # Marks the end of this batch
+            results.put(None)
+        
+        threading.Thread(target=check_folders, daemon=True).start()
+        self.root.after(FOLDER_CHECK_POLL_MS, self.poll_folder_validation, results)
+
+    def poll_folder_validation(self, results):
+        while True:
+            try:
+                result = results.get_nowait()
+            except queue.Empty:
+                break
+            if result is None:
+                return
+            folder, image_count, error = result
+            item = self.find_tree_item(folder)
+            if error is not None:
+                print(f"Warning: Folder '{folder}' not found. Skipping. ({error})")
+                if folder in self.folders:
+                    self.folders.remove(folder)
+                if item is not None:
+                    self.folder_tree.delete(item)
+            elif item is not None:
+                self.folder_tree.set(item, "count", image_count)
+        self.root.after(FOLDER_CHECK_POLL_MS, self.poll_folder_validation, results)
+
+    def find_tree_item(self, folder):
+        for item in self.folder_tree.get_children():
+            if self.folder_tree.set(item, "path") == folder:
+                return item
+        return None
 
     def calculate_base_font_size(self, screen_width, screen_height):
         # Base font size calculation based on screen resolution
@@ -141,10 +307,6 @@ class ImageBatchCompare:
         return int(self.base_font_size * size_factor)
 
     def setup_ui(self):
-        # Enable drop functionality for the main window
-        self.root.drop_target_register(DND_FILES)
-        self.root.dnd_bind('<<Drop>>', self.handle_drop)
-
         self.root.grid_columnconfigure(0, weight=1)
         self.root.grid_rowconfigure(0, weight=1)
 
@@ -156,7 +318,7 @@ class ImageBatchCompare:
 
         self.control_frame = ttk.Frame(self.main_frame)
         self.control_frame.grid(row=0, column=0, sticky="ew", padx=20, pady=10)
-        self.control_frame.columnconfigure(3, weight=1)
+        self.control_frame.columnconfigure(4, weight=1)
 
         button_style = ttk.Style()
         button_style.configure('Small.TButton', padding=(self.get_font_size(0.5), self.get_font_size(0.5)), font=('Helvetica', self.get_font_size(0.8)))
@@ -164,8 +326,19 @@ class ImageBatchCompare:
         ttk.Button(self.control_frame, text="Add Folder", command=self.add_folder, style='Small.TButton').grid(row=0, column=0, padx=5, pady=5)
         ttk.Button(self.control_frame, text="Remove Folder", command=self.remove_folder, style='Small.TButton').grid(row=0, column=1, padx=5, pady=5)
         ttk.Button(self.control_frame, text="Add Subfolders", command=self.add_subfolders, style='Small.TButton').grid(row=0, column=2, padx=5, pady=5)
+        ttk.Button(self.control_frame, text="Add Archive", command=self.add_archive, style='Small.TButton').grid(row=0, column=3, padx=5, pady=5)
+        button_style.configure('Small.TMenubutton', padding=(self.get_font_size(0.5), self.get_font_size(0.5)), font=('Helvetica', self.get_font_size(0.8)))
+        cache_button = ttk.Menubutton(self.control_frame, text="Cache", style='Small.TMenubutton')
+        cache_menu = tk.Menu(cache_button, tearoff=False, font=('Helvetica', self.get_font_size(0.6)))
+        cache_menu.add_command(label="Verify Cache", command=self.verify_disk_cache)
+        cache_menu.add_command(label="Clear Cache", command=self.clear_disk_cache)
+        cache_button["menu"] = cache_menu
+        cache_button.grid(row=0, column=5, padx=5, pady=5)
+        button_style.configure('Small.TCheckbutton', font=('Helvetica', self.get_font_size(0.8)))
+        self.live_mode = tk.BooleanVar(value=self.live_mode_enabled)
+        ttk.Checkbutton(self.control_frame, text="Live", variable=self.live_mode, command=self.save_config, style='Small.TCheckbutton').grid(row=0, column=6, padx=5, pady=5)
         self.start_button = ttk.Button(self.control_frame, text="Start Comparison", command=self.start_comparison, style='Small.TButton')
-        self.start_button.grid(row=0, column=4, padx=5, pady=5)
+        self.start_button.grid(row=0, column=7, padx=5, pady=5)
 
         self.tree_frame = ttk.Frame(self.main_frame)
         self.tree_frame.grid(row=1, column=0, sticky="nsew", padx=20, pady=10)
@@ -191,12 +364,14 @@ class ImageBatchCompare:
         self.tree_container.grid_columnconfigure(0, weight=1)
         self.tree_container.grid_rowconfigure(0, weight=1)
 
-        self.folder_tree = ttk.Treeview(self.tree_container, columns=("button", "path"), show="headings", style="Treeview")
+        self.folder_tree = ttk.Treeview(self.tree_container, columns=("button", "path", "count"), show="headings", style="Treeview")
         self.folder_tree.heading("button", text="")  # Empty header for button column
         self.folder_tree.heading("path", text="List of image groups to compare")
+        self.folder_tree.heading("count", text="Images")
         self.folder_tree.column("#0", width=0, stretch=False)  # Hide the default first column
         self.folder_tree.column("button", anchor="center", width=40, minwidth=40, stretch=False)  # Fixed width for icon
         self.folder_tree.column("path", anchor="w", stretch=True)  # Allow path column to stretch
+        self.folder_tree.column("count", anchor="e", width=self.get_font_size(4), stretch=False)  # Filled in by the background folder check
         self.folder_tree.grid(row=0, column=0, sticky="nsew")
 
         scrollbar = ttk.Scrollbar(self.tree_frame, orient="vertical", command=self.folder_tree.yview)
@@ -219,6 +394,7 @@ class ImageBatchCompare:
 
         self.canvas = tk.Canvas(self.image_frame)
         self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.create_image_items()
 
         self.root.bind("<Configure>", self.on_window_configure)
         self.root.bind("<Escape>", lambda e: self.stop_comparison())
@@ -231,7 +407,7 @@ class ImageBatchCompare:
         
         # Populate the Treeview with folders from config
         for folder in self.folders:
-            self.folder_tree.insert("", "end", values=("📂", folder), tags=('folder_icon',))
+            self.folder_tree.insert("", "end", values=("📂", folder, "…"), tags=('folder_icon',))
 
         # Add right-click binding to the folder tree
         self.folder_tree.bind("<Button-3>", self.on_right_click)
@@ -252,31 +428,47 @@ class ImageBatchCompare:
                 self.folders = []
                 # Use new key name, but fall back to old one for backwards compatibility
                 folder_list = config.get('comparison_folders', config.get('folders', []))
+                # Folders aren't checked here; validate_folders_in_background does that once the window is up
                 for folder in folder_list:
-                    if os.path.exists(folder):
+                    if folder not in self.folders:
                         self.folders.append(folder)
-                        self.votes[folder] = 0
-                        images = [f for f in os.listdir(folder) if f.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp'))]
-                        self.folder_images[folder] = sorted(images)
-                    else:
-                        print(f"Warning: Folder '{folder}' not found. Skipping.")
                 
-                # Use new key name, but fall back to old one for backwards compatibility
-                last_dir = config.get('last_browsed_directory', config.get('last_directory'))
-                if last_dir:
-                    # If the last directory doesn't exist, find the closest existing parent
-                    self.last_directory = self.find_existing_parent_directory(last_dir)
-                else:
-                    self.last_directory = None
+                # Use new key name, but fall back to old one for backwards compatibility.
+                # If it no longer exists, the closest existing parent is found when browsing.
+                self.last_directory = config.get('last_browsed_directory', config.get('last_directory'))
+                
+                self.display_cache_mb = config.get('display_cache_mb')
+                self.disk_cache_mb = config.get('disk_cache_mb')
+                self.display_cache_dir = config.get('display_cache_dir')
+                self.live_mode_enabled = config.get('live_mode', False)
+                self.alignment_key_pattern = config.get('alignment_key_pattern')
+                self.pair_scheduler = config.get('pair_scheduler', 'tournament')
+                self.early_stop = config.get('early_stop', 'ask')
+                self.early_stop_top_k = config.get('early_stop_top_k', 1)
+                self.early_stop_confidence = config.get('early_stop_confidence', 0.95)
+                self.screen_mode = config.get('screen_mode', 'pair')
+                self.grid_size = config.get('grid_size', 4)
+                self.sample_subgroups = config.get('sample_subgroups')
+                self.sample_minutes = config.get('sample_minutes')
+                self.sample_bucket_pattern = config.get('sample_bucket_pattern')
+                self.reuse_results = config.get('reuse_results', 'ask')
             
             if not self.folders:
                 print("No valid folders found in the configuration.")
 
     def save_config(self):
+        # Missing folders are dropped by the background check, so there is no need to stat them all again
         config = {
-            'comparison_folders': [folder for folder in self.folders if os.path.exists(folder)],
-            'last_browsed_directory': self.last_directory
+            'comparison_folders': list(self.folders),
+            'last_browsed_directory': self.last_directory,
+            'live_mode': self.live_mode.get()
         }
+        # Only write cache settings that have been set, so the defaults can change between versions
+        for key in ('display_cache_mb', 'disk_cache_mb', 'display_cache_dir', 'alignment_key_pattern', 'pair_scheduler',
+                    'early_stop', 'early_stop_top_k', 'early_stop_confidence', 'screen_mode', 'grid_size',
+                    'sample_subgroups', 'sample_minutes', 'sample_bucket_pattern', 'reuse_results'):
+            if getattr(self, key) is not None:
+                config[key] = getattr(self, key)
         with open(self.config_file, 'w') as f:
             json.dump(config, f)
 
@@ -298,8 +490,21 @@ class ImageBatchCompare:
             self.last_directory = folder  # Store the selected folder, not its parent
             if folder not in self.folders:
                 self.folders.append(folder)
-                self.votes[folder] = 0
-                item_id = self.folder_tree.insert("", "end", values=("📂", folder), tags=('folder_icon',))
+                self.folder_tree.insert("", "end", values=("📂", folder, "…"), tags=('folder_icon',))
+                self.validate_folders_in_background([folder])
+            self.save_config()
+
+    def add_archive(self):
+        """Add zip or tar files as image groups; their images are read in place"""
+        initial_dir = self.find_existing_parent_directory(self.last_directory)
+        archives = filedialog.askopenfilenames(initialdir=initial_dir, filetypes=[("Archives", "*.zip *.tar"), ("All files", "*.*")])
+        if archives:
+            self.last_directory = os.path.dirname(archives[0])
+            new_archives = [archive for archive in archives if archive not in self.folders]
+            for archive in new_archives:
+                self.folders.append(archive)
+                self.folder_tree.insert("", "end", values=("📂", archive, "…"))
+            self.validate_folders_in_background(new_archives)
             self.save_config()
 
     def remove_folder(self):
@@ -309,17 +514,9 @@ class ImageBatchCompare:
             for item in selected_items:
                 folder = self.folder_tree.item(item)['values'][1]  # Get path from second column
                 if folder in self.folders:
-                    # Check if this is a temp directory and delete it
-                    if os.path.dirname(folder) == os.environ.get('TEMP', '/tmp') and 'image_batch_' in os.path.basename(folder):
-                        try:
-                            print(f"Removing temp directory: {folder}")
-                            shutil.rmtree(folder)
-                        except Exception as e:
-                            print(f"Error removing temp directory: {e}")
-                    
+                    self.remove_drop_batch(folder)
                     self.folders.remove(folder)
-                    self.votes.pop(folder, None)
-                    self.folder_images.pop(folder, None)
+                    self.folder_index.forget(folder)
                     self.folder_tree.delete(item)
             self.save_config()
 
@@ -328,13 +525,14 @@ class ImageBatchCompare:
         root_folder = filedialog.askdirectory(initialdir=initial_dir)
         if root_folder:
             self.last_directory = root_folder  # Store the selected folder, not its parent
+            # Archives next to the subfolders count as groups too
             subfolders = [os.path.join(root_folder, d) for d in os.listdir(root_folder) 
-                          if os.path.isdir(os.path.join(root_folder, d))]
-            for folder in subfolders:
-                if folder not in self.folders:
-                    self.folders.append(folder)
-                    self.votes[folder] = 0
-                    self.folder_tree.insert("", "end", values=("📂", folder))
+                          if os.path.isdir(os.path.join(root_folder, d)) or is_archive(d)]
+            new_folders = [folder for folder in subfolders if folder not in self.folders]
+            for folder in new_folders:
+                self.folders.append(folder)
+                self.folder_tree.insert("", "end", values=("📂", folder, "…"))
+            self.validate_folders_in_background(new_folders)
             self.save_config()
 
     def start_comparison(self):
@@ -342,23 +540,189 @@ class ImageBatchCompare:
             messagebox.showwarning("Warning", "Please add at least two folders for comparison.")
             return
         
-        # Load images for all folders to check counts
-        for folder in self.folders:
-            images = [f for f in os.listdir(folder) if f.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp'))]
-            self.folder_images[folder] = sorted(images)
+        # Make sure the image lists are current; unchanged folders aren't listed again
+        errors = self.folder_index.refresh_all(self.folders)
+        if errors:
+            error_msg = "Could not read these folders:\n\n"
+            for folder, e in errors:
+                error_msg += f"{folder}: {e}\n"
+            messagebox.showerror("Error", error_msg)
+            return
+        
+        try:
+            self.alignment = make_alignment(self.folder_index, self.folders, self.alignment_key_pattern)
+        except re.error as e:
+            messagebox.showerror("Error", f"Invalid alignment_key_pattern in {self.config_file}: {e}")
+            return
+        
+        from comparison_engine import SCHEDULERS
+        # Incremental sessions are only started from a saved session, see reuse_previous_session
+        choices = [name for name in SCHEDULERS if name != 'incremental']
+        if self.pair_scheduler not in choices:
+            messagebox.showerror("Error", f"Unknown pair_scheduler '{self.pair_scheduler}' in {self.config_file}. Use one of: {', '.join(choices)}")
+            return
+        if self.screen_mode not in ('pair', 'grid'):
+            messagebox.showerror("Error", f"Unknown screen_mode '{self.screen_mode}' in {self.config_file}. Use 'pair' or 'grid'")
+            return
+        if self.screen_mode == 'grid' and self.pair_scheduler not in ('tournament', 'grid'):
+            messagebox.showerror("Error", f"Grid screens play winner-stays rounds, so they can't be combined with pair_scheduler '{self.pair_scheduler}'")
+            return
+        
+        # In live mode the folders are still filling up, so unequal counts are expected
+        # and partially written files would show up as unreadable in the preflight
+        self.incremental_options = None
+        self.session_fingerprints = None
+        if self.live_mode.get():
+            if self.sample_subgroups is not None or self.sample_minutes is not None:
+                print("Warning: Live mode plays subgroups as they are written, so sample_subgroups and sample_minutes are ignored")
+            self.maximize_and_start()
+            return
+        
+        if self.alignment_key_pattern:
+            # Files are paired by key, so folders may differ; images without a partner are left out
+            if self.alignment.subgroup_count() == 0:
+                messagebox.showerror("Error", f"No file names share a key matching '{self.alignment_key_pattern}' across two or more folders.")
+                return
+            for folder in self.folders:
+                if self.alignment.unmatched[folder] or self.alignment.duplicates[folder]:
+                    print(f"{os.path.basename(folder)}: {self.alignment.unmatched[folder]} images without a match, "
+                          f"{self.alignment.duplicates[folder]} with a duplicate key")
+            self.check_previous_session()
+            return
         
         # Check if all folders have the same number of images
-        image_counts = [len(self.folder_images[folder]) for folder in self.folders]
+        image_counts = [self.folder_index.image_count(folder) for folder in self.folders]
         if len(set(image_counts)) > 1:
             # Create a detailed error message showing the count for each folder
             error_msg = "Folders must contain the same number of images:\n\n"
             for folder in self.folders:
-                count = len(self.folder_images[folder])
+                count = self.folder_index.image_count(folder)
                 folder_name = os.path.basename(folder)
                 error_msg += f"{folder_name}: {count} images\n"
             messagebox.showerror("Error", error_msg)
             return
         
+        self.check_previous_session()
+
+    def check_previous_session(self):
+        """Fingerprint the folders and look for a saved session to reuse on a worker thread, then go on to the preflight.
+
+        Fingerprints stat every image and the search reads saved sessions, which is too slow for the UI thread on large folders.
+        """
+        from comparison_engine import find_previous_session
+        from session_planner import folder_fingerprints
+        
+        folders = list(self.folders)
+        results_dir = self.results_dir
+        search = self.reuse_results in ('ask', 'auto')
+        results = queue.Queue()
+        
+        def check_folders():
+            try:
+                fingerprints = folder_fingerprints(self.folder_index, folders)
+                previous = find_previous_session(results_dir, folders, fingerprints) if search else (None, None)
+                results.put((fingerprints, previous, None))
+            except Exception as e:
+                results.put((None, (None, None), e))
+        
+        self.start_button.config(text="Checking folders…", state='disabled')
+        threading.Thread(target=check_folders, daemon=True).start()
+        self.root.after(FOLDER_CHECK_POLL_MS, self.poll_previous_session, results)
+
+    def poll_previous_session(self, results):
+        try:
+            fingerprints, (path, record), error = results.get_nowait()
+        except queue.Empty:
+            self.root.after(FOLDER_CHECK_POLL_MS, self.poll_previous_session, results)
+            return
+        self.start_button.config(text="Start Comparison", state='normal')
+        
+        if error is not None:
+            # Only reusing results depends on this, so the session can go ahead without it
+            print(f"Warning: Could not check for a previous session: {error}")
+        # Saved with the results, so they describe the folders as they were compared
+        self.session_fingerprints = fingerprints
+        if self.reuse_previous_session(path, record) or self.apply_subgroup_sample():
+            self.run_preflight()
+
+    def reuse_previous_session(self, path, record):
+        """Set up a session of only the new and changed folders if the saved session at path ranks the rest. Returns True if it does."""
+        if record is None:
+            return False
+        from session_planner import plan_incremental
+        alignment, options, kept = plan_incremental(record, self.alignment, self.session_fingerprints)
+        newcomers = ", ".join(os.path.basename(folder) for folder in options['newcomers'])
+        print(f"{os.path.basename(path)} already ranks {len(kept)} of the folders; new or changed: {newcomers}")
+        if self.reuse_results == 'ask':
+            message = (f"{len(kept)} of these folders are unchanged since {os.path.basename(path)}.\n\n"
+                       f"Only compare {newcomers} against its results?\n\n"
+                       "Choose No to compare all folders again.")
+            if not messagebox.askyesno("Reuse Results", message):
+                return False
+        self.alignment = alignment
+        self.incremental_options = options
+        return True
+
+    def apply_subgroup_sample(self):
+        """Narrow the alignment to the sampled subgroups, if a sample is set. Returns False if it can't be planned."""
+        if self.sample_subgroups is None and self.sample_minutes is None:
+            return True
+        from session_planner import plan_sample
+        try:
+            plan = plan_sample(self.alignment, self.sample_subgroups, self.sample_minutes, self.sample_bucket_pattern)
+        except re.error as e:
+            messagebox.showerror("Error", f"Invalid sample_bucket_pattern in {self.config_file}: {e}")
+            return False
+        if plan.sample_size == 0:
+            messagebox.showerror("Error", "The sample settings leave no subgroups to compare.")
+            return False
+        # The preflight, the session and the prefetcher all go through the sampled alignment
+        self.alignment = plan.alignment
+        print(plan.describe())
+        return True
+
+    def run_preflight(self):
+        """Read the header of every image on worker threads, then report problems before the session starts"""
+        from preflight import run_preflight
+        
+        folders = list(self.folders)
+        alignment = self.alignment
+        results = queue.Queue()
+        
+        def check_headers():
+            start = time.perf_counter()
+            try:
+                results.put((run_preflight(folders, self.folder_index, alignment), None, time.perf_counter() - start))
+            except Exception as e:
+                results.put((None, e, time.perf_counter() - start))
+        
+        self.start_button.config(text="Checking images…", state='disabled')
+        threading.Thread(target=check_headers, daemon=True).start()
+        self.root.after(FOLDER_CHECK_POLL_MS, self.poll_preflight, results)
+
+    def poll_preflight(self, results):
+        try:
+            report, error, elapsed = results.get_nowait()
+        except queue.Empty:
+            self.root.after(FOLDER_CHECK_POLL_MS, self.poll_preflight, results)
+            return
+        self.start_button.config(text="Start Comparison", state='normal')
+        
+        if error is not None:
+            # The headers are only advisory; a failed check shouldn't block the session
+            print(f"Warning: Preflight check failed: {error}")
+        else:
+            print(f"Preflight read {sum(s['count'] for s in report.folder_summaries.values())} image headers in {elapsed:.2f}s")
+            report_text = report.format_text()
+            print(report_text)
+            if report.has_problems:
+                message = f"Some images may not compare well:\n\n{report_text}\n\nStart the comparison anyway?"
+                if not messagebox.askyesno("Preflight", message):
+                    return
+        
+        self.maximize_and_start()
+
+    def maximize_and_start(self):
         # Attempt to maximize the window in a cross-platform way
         try:
             # For Windows
@@ -377,31 +741,125 @@ class ImageBatchCompare:
         self.root.after(100, self._start_comparison_after_maximize)
 
     def _start_comparison_after_maximize(self):
-        # Load images for all folders here
-        for folder in self.folders:
-            images = [f for f in os.listdir(folder) if f.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp'))]
-            self.folder_images[folder] = sorted(images)
+        self.ensure_image_pipeline()
         
+        # The folder index was refreshed by start_comparison, so nothing needs listing here
         self.main_frame.grid_remove()
         self.image_frame.grid()
         self.reset_comparison_state()
-        self.total_comparisons = self.calculate_total_comparisons()
+        from comparison_engine import make_session
+        session_options = {'stop_top_k': self.early_stop_top_k, 'stop_confidence': self.early_stop_confidence}
+        scheduler = self.pair_scheduler
+        if self.incremental_options is not None:
+            # Newcomers play one image at a time against each subgroup's leader, so always in pairs
+            scheduler = 'incremental'
+            session_options.update(self.incremental_options)
+        elif self.screen_mode == 'grid' or scheduler == 'grid':
+            scheduler = 'grid'
+            session_options['grid_size'] = self.grid_size
+            self.root.bind("<Key>", self.on_grid_key)
+        if self.live_mode.get():
+            from live_ingest import LiveIngest
+            # Nothing counts as ready until the first check has seen the files settle
+            self.session = make_session(self.folders, self.alignment, scheduler, subgroup_limit=0, **session_options)
+            self.live_ingest = LiveIngest(self.folder_index, self.folders, self.alignment_key_pattern)
+            self.poll_live_folders(self.live_ingest)
+            self.root.bind("<Return>", lambda e: self.finish_live_session())
+        else:
+            self.session = make_session(self.folders, self.alignment, scheduler, **session_options)
+            # Live folders keep changing, so only these sessions record what their folders held
+            self.session.fingerprints = self.session_fingerprints
         
         self.root.bind("<BackSpace>", self.skip_current_selection)
         
-        self.load_next_subgroup()
+        self.show_next_screen(self.session.load_next_subgroup())
+
+    def show_next_screen(self, has_pair):
+        """Show the session's current pair, or wrap up when it has run out of subgroups"""
+        if has_pair:
+            self.current_screen_images = list(self.session.current_pair)
+            print(f"Comparing {' vs '.join(folder for folder, _ in self.current_screen_images)}")
+            self.display_current_screen()
+        elif self.live_ingest is not None:
+            self.wait_for_images()
+        else:
+            self.show_results()
 
-    def calculate_total_comparisons(self):
-        total = 0
-        for i in range(max(len(images) for images in self.folder_images.values())):
-            num_images_in_group = sum(1 for folder in self.folders if i < len(self.folder_images[folder]))
-            if num_images_in_group > 1:
-                total += num_images_in_group - 1  # Each group will have (n-1) comparisons
-        return total
+    def poll_live_folders(self, live_ingest):
+        """Look for finished images on a worker thread, so slow folders never hold up voting"""
+        results = queue.Queue()
+        
+        def check_folders():
+            try:
+                results.put(live_ingest.poll())
+            except Exception as e:
+                print(f"Warning: Live folder check failed: {e}")
+                results.put((None, None))
+        
+        threading.Thread(target=check_folders, daemon=True).start()
+        self.root.after(FOLDER_CHECK_POLL_MS, self.apply_live_poll, live_ingest, results)
+
+    def apply_live_poll(self, live_ingest, results):
+        try:
+            ready_count, alignment = results.get_nowait()
+        except queue.Empty:
+            self.root.after(FOLDER_CHECK_POLL_MS, self.apply_live_poll, live_ingest, results)
+            return
+        # The session has ended or another one has started
+        if live_ingest is not self.live_ingest:
+            return
+        
+        if ready_count is not None and ready_count > self.session.subgroup_limit:
+            print(f"Live mode: {ready_count - self.session.subgroup_limit} new subgroups ready ({ready_count} total)")
+            # Subgroups that were already ready keep their index in the new alignment
+            self.alignment = alignment
+            self.session.set_alignment(alignment, ready_count)
+            if self.waiting_for_images:
+                self.waiting_for_images = False
+                self.canvas.delete("waiting")
+                self.show_next_screen(self.session.load_next_subgroup())
+            else:
+                # The next subgroup may not have existed when the current screen was prefetched
+                self.prefetch_upcoming_images((self.canvas.winfo_width(), self.canvas.winfo_height()))
+                self.update_title()
+        
+        self.root.after(LIVE_POLL_MS, self.poll_live_folders, live_ingest)
+
+    def wait_for_images(self):
+        """Every ready subgroup has been compared; show a notice until the next one is written"""
+        self.waiting_for_images = True
+        self.current_screen_images = []
+        self.screen_token += 1
+        self.screen_jobs = []
+        self.screen_image_quality = []
+        for i in range(len(self.image_items)):
+            self.set_image_item(i, None)
+        self.show_waiting_message()
+        self.update_title()
+
+    def show_waiting_message(self):
+        self.canvas.delete("waiting")
+        self.canvas.create_text(
+            self.canvas.winfo_width() / 2, self.canvas.winfo_height() / 2,
+            text="Waiting for new images...\nPress Enter to finish and see the results",
+            fill="#FFFFFF", justify=tk.CENTER, font=('Helvetica', self.get_font_size(1.2), 'bold'), tags="waiting"
+        )
+
+    def finish_live_session(self):
+        if self.live_ingest is not None and self.image_frame.winfo_viewable():
+            self.show_results()
 
     def update_title(self):
-        if self.image_frame.winfo_viewable():
-            self.root.title(f"Image Batch Compare • Subgroup {self.current_subgroup_index + 1} • {self.current_comparison + 1}/{self.total_comparisons}")
+        session = self.session
+        if session is not None and self.waiting_for_images:
+            self.root.title(f"Image Batch Compare • Waiting for new images • {session.current_comparison}/{session.total_comparisons} done")
+        elif session is not None and self.image_frame.winfo_viewable() and session.scheduler == 'ranking':
+            # Insertion may finish a subgroup early, so its count jumps to the end of the subgroup's share then
+            self.root.title(f"Image Batch Compare • Subgroup {session.current_subgroup_index + 1} • "
+                            f"Placing {session.current_pair_index + 1}/{len(session.current_subgroup)} • "
+                            f"{session.current_comparison + 1}/{session.total_comparisons}")
+        elif session is not None and self.image_frame.winfo_viewable():
+            self.root.title(f"Image Batch Compare • Subgroup {session.current_subgroup_index + 1} • {session.current_comparison + 1}/{session.total_comparisons}")
         else:
             self.root.title("Image Batch Compare")
 
@@ -415,109 +873,186 @@ class ImageBatchCompare:
         
         self.image_frame.grid_remove()
         self.main_frame.grid()
+        for i in range(len(self.image_items)):
+            self.set_image_item(i, None)
+        self.left_image = None
+        self.right_image = None
+        self.print_cache_stats()
+        self.live_ingest = None
+        self.waiting_for_images = False
+        self.canvas.delete("waiting", "grid_rank")
+        self.grid_order = []
         self.reset_comparison_state()
         self.root.title("Image Batch Compare")
         
         self.root.unbind("<BackSpace>")
+        self.root.unbind("<Return>")
+        self.root.unbind("<Key>")
 
-    def skip_current_selection(self, event):
-        # The current formula is incorrect - it's calculating too many remaining comparisons
-        # remaining_in_subgroup = (len(self.folders) * (len(self.folders) - 1)) // 2 - self.comparisons_within_subgroup
-        
-        # The correct formula should be based on how many comparisons are left in this subgroup
-        # For a tournament style comparison, we need (n-1) comparisons for n items
-        total_in_subgroup = len(self.current_subgroup) - 1
-        remaining_in_subgroup = total_in_subgroup - self.comparisons_within_subgroup
-        
-        # Add the remaining comparisons to the counter
-        self.current_comparison += remaining_in_subgroup
-        
-        # Move to the next subgroup
-        self.current_subgroup_index += 1
-        self.load_next_subgroup()
-
-    def load_next_subgroup(self):
-        print(f"Loading next subgroup. Current subgroup index: {self.current_subgroup_index}")
-        if self.current_subgroup_index >= max(len(images) for images in self.folder_images.values()):
-            self.show_results()
+    def print_cache_stats(self):
+        if self.display_cache is None:
             return
+        stats = self.display_cache.stats()
+        print(f"Display cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.0%} hit rate), {stats['evictions']} evictions, "
+              f"{stats['entries']} entries using {stats['bytes'] / (1024 * 1024):.1f}/{stats['max_bytes'] / (1024 * 1024):.0f} MB")
+        if self.disk_cache is not None:
+            stats = self.disk_cache.stats()
+            print(f"Disk cache: {stats['hits']} hits, {stats['misses']} misses, "
+                  f"{stats['entries']} entries using {stats['bytes'] / (1024 * 1024):.1f}/{stats['max_bytes'] / (1024 * 1024):.0f} MB")
+
+    def describe_disk_cache(self):
+        stats = self.disk_cache.stats()
+        return (f"Location: {os.path.abspath(self.disk_cache.directory)}\n"
+                f"Cached images: {stats['entries']}\n"
+                f"Size: {stats['bytes'] / (1024 * 1024):.1f} of {stats['max_bytes'] / (1024 * 1024):.0f} MB")
+
+    def verify_disk_cache(self):
+        self.ensure_image_pipeline()
+        if self.disk_cache is None:
+            messagebox.showinfo("Display Cache", "The display cache is disabled (disk_cache_mb is 0 in ibc-settings.json).")
+            return
+        checked, removed = self.disk_cache.verify()
+        messagebox.showinfo("Display Cache", f"Checked {checked} cached images and removed {removed} damaged files.\n\n{self.describe_disk_cache()}")
 
-        self.current_subgroup = []
-        for folder in self.folders:
-            if self.current_subgroup_index < len(self.folder_images[folder]):
-                image_name = self.folder_images[folder][self.current_subgroup_index]
-                image_path = os.path.join(folder, image_name)
-                self.current_subgroup.append((folder, image_path))
+    def clear_disk_cache(self):
+        self.ensure_image_pipeline()
+        if self.disk_cache is None:
+            messagebox.showinfo("Display Cache", "The display cache is disabled (disk_cache_mb is 0 in ibc-settings.json).")
+            return
+        if messagebox.askyesno("Display Cache", f"Delete all cached images?\n\n{self.describe_disk_cache()}"):
+            self.disk_cache.clear()
+            self.display_cache.clear()
 
-        print(f"New subgroup size: {len(self.current_subgroup)}")
+    def skip_current_selection(self, event):
+        if self.session is None or self.waiting_for_images:
+            return
+        self.show_next_screen(self.session.skip_subgroup())
 
-        # Shuffle the current subgroup
-        random.shuffle(self.current_subgroup)
+    def display_current_screen(self):
+        self.current_images = []
 
-        self.subgroup_winner = None
-        self.current_pair_index = 0
-        self.comparisons_within_subgroup = 0
+        window_width = self.canvas.winfo_width()
+        window_height = self.canvas.winfo_height()
         
-        if len(self.current_subgroup) > 1:
-            self.load_next_screen()
+        # The image items are kept for the whole session, and the overlays only change with the canvas or font size
+        # (or, on grid screens, with the number of tiles)
+        tile_count = len(self.current_screen_images) if self.is_grid_screen() else 0
+        layout_key = (window_width, window_height, self.get_font_size(1.2), tile_count)
+        if layout_key != self.overlay_layout_key:
+            self.overlay_layout_key = layout_key
+            if tile_count:
+                self.build_grid_overlays(window_width, window_height, tile_count)
+            else:
+                self.grid_tiles = []
+                self.build_overlays(window_width, window_height)
+        self.ensure_image_items(len(self.current_screen_images))
+        self.grid_order = []
+        self.canvas.delete("grid_rank")
+        
+        # Queue every image of the screen first so they are decoded in parallel, then queue what comes next
+        if self.grid_tiles:
+            x0, y0, x1, y1 = self.grid_tiles[0]
+            target_size = (x1 - x0, y1 - y0)
         else:
-            self.current_subgroup_index += 1
-            self.load_next_subgroup()
-
-    def load_next_screen(self):
-        if self.subgroup_winner is None:
-            # First comparison in the subgroup
-            self.current_pair = self.current_subgroup[:2]
-            print(f"First comparison in subgroup: {self.current_pair[0][0]} vs {self.current_pair[1][0]}")
-        elif self.current_pair_index < len(self.current_subgroup) - 1:
-            # Compare the winner with the next image
-            next_image = self.current_subgroup[self.current_pair_index + 1]
-            self.current_pair = [self.subgroup_winner, next_image]
-            print(f"Next comparison: {self.subgroup_winner[0]} vs {next_image[0]}")
+            target_size = (window_width, window_height)
+        self.screen_token += 1
+        self.screen_jobs = []
+        self.screen_image_quality = []
+        for image_data in self.current_screen_images:
+            self.screen_jobs.append(self.prefetcher.request(image_data[1], target_size) if image_data is not None else None)
+            self.screen_image_quality.append(None)
+        self.prefetch_upcoming_images(target_size)
+        
+        # Show whatever is ready right now (a preview if the final image isn't), and refine it later
+        # After a resize the old rendition of the same image stays up until the new one is ready
+        self.left_image = None
+        self.right_image = None
+        for i in range(len(self.image_items)):
+            image_data = self.current_screen_images[i] if i < len(self.current_screen_images) else None
+            if image_data is None or image_data[1] != self.image_item_paths[i]:
+                self.set_image_item(i, None)
+        self.update_screen_images()
+        if not self.screen_images_final():
+            self.root.after(REFINE_POLL_MS, self.poll_screen_images, self.screen_token)
+        
+        # Highlight the side under the mouse
+        mouse_x = self.root.winfo_pointerx() - self.root.winfo_rootx()
+        mouse_y = self.root.winfo_pointery() - self.root.winfo_rooty()
+        self.render_pointer_state(mouse_x, mouse_y)
+        
+        self.update_title()
+        self.root.update_idletasks()
+
+    def update_screen_images(self):
+        """Turn newly finished previews or final images into PhotoImages. Returns True if anything changed."""
+        # A grid only goes up once every tile has something to show, so it appears all at once
+        if self.grid_tiles and not all(job is None or quality is not None or job.preview.done() or job.final.done()
+                                       for job, quality in zip(self.screen_jobs, self.screen_image_quality)):
+            return False
+        changed = False
+        for i, job in enumerate(self.screen_jobs):
+            if job is None or self.screen_image_quality[i] in ('final', 'error'):
+                continue
             
-            # Place the winner on the opposite side of the last chosen side
-            if self.last_chosen_side == 'left':
-                self.current_pair = self.current_pair[::-1]  # Reverse the pair
-                print(f"Reversed pair due to last choice being left: {self.current_pair[0][0]} vs {self.current_pair[1][0]}")
-        else:
-            # We've compared all images in this subgroup
-            self.votes[self.subgroup_winner[0]] += 1
-            print(f"Added vote for subgroup winner: {self.subgroup_winner[0]}")
-            self.current_subgroup_index += 1
-            self.load_next_subgroup()
+            if job.final.done():
+                future, quality = job.final, 'final'
+            elif job.preview.done() and self.screen_image_quality[i] is None:
+                future, quality = job.preview, 'preview'
+            else:
+                continue
+            
+            folder, image_path = self.current_screen_images[i]
+            try:
+                # Only the PhotoImage handoff happens on the Tk thread
+                photo_img = self.photo_transfer.make_photo(future.result())
+            except Exception as e:
+                print(f"Error loading image: {e}")
+                self.screen_image_quality[i] = 'error'
+                continue
+            
+            # Store the folder and path info
+            if i == 0:
+                self.left_image = (photo_img, folder, image_path)
+            elif i == 1:
+                self.right_image = (photo_img, folder, image_path)
+            self.set_image_item(i, photo_img, image_path)
+            self.screen_image_quality[i] = quality
+            changed = True
+        return changed
+
+    def screen_images_final(self):
+        return all(job is None or quality in ('final', 'error') for job, quality in zip(self.screen_jobs, self.screen_image_quality))
+
+    def poll_screen_images(self, screen_token):
+        """Swap in previews and refined images as the workers finish them"""
+        # A vote or a resize has already moved on to another screen
+        if screen_token != self.screen_token:
             return
+        # The canvas items are updated in place, so there is nothing else to redraw
+        self.update_screen_images()
+        if not self.screen_images_final():
+            self.root.after(REFINE_POLL_MS, self.poll_screen_images, screen_token)
 
-        self.current_screen_images = self.current_pair
-        self.display_current_screen()
-        self.update_title()
-
-    def display_current_screen(self):
-        self.canvas.delete("all")
-        self.current_images = []
+    def prefetch_upcoming_images(self, target_size):
+        if not self.current_screen_images:
+            return
+        
+        current_paths = [image_data[1] for image_data in self.current_screen_images if image_data is not None]
+        upcoming_paths = [image_path for _, image_path in self.session.get_upcoming_images()]
+        
+        # Anything that isn't on screen or coming up next is no longer worth keeping around
+        self.prefetcher.retain(current_paths + upcoming_paths)
+        self.prefetcher.prefetch(upcoming_paths, target_size)
 
-        window_width = self.canvas.winfo_width()
-        window_height = self.canvas.winfo_height()
+    def build_overlays(self, window_width, window_height):
+        """Lay out the choice labels and the divider for the current canvas size"""
+        self.canvas.delete("overlay", "divider")
         
-        # Create temporary text objects to measure their width
         font = ('Helvetica', self.get_font_size(1.2), 'bold')
         left_label = "Choose Image A"
         right_label = "Choose Image B"
-        
-        # Create temporary text objects to measure their width
-        temp_left = self.canvas.create_text(0, 0, text=left_label, font=font)
-        temp_right = self.canvas.create_text(0, 0, text=right_label, font=font)
-        
-        # Get the width of each text object
-        left_bbox = self.canvas.bbox(temp_left)
-        right_bbox = self.canvas.bbox(temp_right)
-        left_width = left_bbox[2] - left_bbox[0]
-        right_width = right_bbox[2] - right_bbox[0]
-        left_height = left_bbox[3] - left_bbox[1]
-        right_height = right_bbox[3] - right_bbox[1]
-        
-        # Delete temporary text objects
-        self.canvas.delete(temp_left)
-        self.canvas.delete(temp_right)
+        (left_width, left_height), (right_width, right_height) = self.get_label_metrics(font, left_label, right_label)
         
         # Calculate minimum spacing needed between text centers
         min_spacing = left_width/2 + right_width/2 + 20  # Add 20px extra padding
@@ -550,7 +1085,7 @@ class ImageBatchCompare:
             fill="#000000",  # Pure black
             outline="",
             stipple="gray75",  # This creates 75% opacity (darker)
-            tags="text_bg"
+            tags=("text_bg", "overlay")
         )
         
         self.right_bg = self.canvas.create_rectangle(
@@ -561,155 +1096,196 @@ class ImageBatchCompare:
             fill="#000000",  # Pure black
             outline="",
             stipple="gray75",  # This creates 75% opacity (darker)
-            tags="text_bg"
+            tags=("text_bg", "overlay")
         )
         
         # Create the choice text labels
         self.left_text = self.canvas.create_text(
             left_x, left_y,
             text=left_label, 
-            fill="#FFFFFF", font=font
+            fill="#FFFFFF", font=font, tags="overlay"
         )
-        
         self.right_text = self.canvas.create_text(
             right_x, right_y,
             text=right_label, 
-            fill="#FFFFFF", font=font
+            fill="#FFFFFF", font=font, tags="overlay"
         )
         
-        # Load both images as PIL images
-        for i, image_data in enumerate(self.current_screen_images):
-            if image_data is not None:
-                folder, image_path = image_data
-                
-                try:
-                    with Image.open(image_path) as pil_img:
-                        if pil_img.mode != 'RGB':
-                            pil_img = pil_img.convert('RGB')
-                        
-                        img_width, img_height = pil_img.size
-                        aspect_ratio = img_width / img_height
-
-                        if aspect_ratio > window_width / window_height:
-                            new_width = window_width
-                            new_height = max(1, int(window_width / aspect_ratio))
-                        else:
-                            # Use full window height now instead of reserving space
-                            new_height = window_height
-                            new_width = max(1, int(window_height * aspect_ratio))
-
-                        resized_img = pil_img.resize((new_width, new_height), Image.LANCZOS)
-                        photo_img = ImageTk.PhotoImage(resized_img)
-                        
-                        # Store the folder and path info
-                        if i == 0:
-                            self.left_image = (photo_img, folder, image_path)
-                        else:
-                            self.right_image = (photo_img, folder, image_path)
-                        
-                except Exception as e:
-                    print(f"Error loading image: {e}")
-        
-        # We'll draw the dividing line in on_mouse_move based on mouse position
-        # Get current mouse position
-        mouse_x = self.root.winfo_pointerx() - self.root.winfo_rootx()
+        # The divider is drawn once and only shown while the mouse is close to the center
+        self.divider = self.canvas.create_line(
+            window_width // 2, 0, window_width // 2, window_height,
+            fill="#555555", width=2, state='hidden', tags="divider"
+        )
         
-        # Initially display based on mouse position
-        if mouse_x < window_width // 2:
-            self.display_image(self.left_image)
-            self.canvas.itemconfig(self.left_text, fill="#FFFFFF")
-            self.canvas.itemconfig(self.right_text, fill="#444444")  # Darker inactive text
-            self.canvas.itemconfig(self.left_bg, stipple="gray75")   # 25% opaque black background
-            self.canvas.itemconfig(self.right_bg, stipple="gray75")  # 25% opaque black background
-        else:
-            self.display_image(self.right_image)
-            self.canvas.itemconfig(self.left_text, fill="#444444")   # Darker inactive text
-            self.canvas.itemconfig(self.right_text, fill="#FFFFFF")
-            self.canvas.itemconfig(self.left_bg, stipple="gray75")   # 25% opaque black background
-            self.canvas.itemconfig(self.right_bg, stipple="gray75")  # 25% opaque black background
+        # Nothing of the new overlay has been highlighted or shown yet
+        self.label_side = None
+        self.divider_visible = None
+
+    def is_grid_screen(self):
+        return self.session is not None and self.session.scheduler == 'grid'
+
+    def build_grid_overlays(self, window_width, window_height, tile_count):
+        """Split the canvas into tiles for a grid screen, each labelled only with its number key"""
+        self.canvas.delete("overlay", "divider")
         
-        # Check if mouse is close to center and draw dividing line if needed
-        self.check_and_draw_divider(mouse_x)
+        columns = math.ceil(math.sqrt(tile_count))
+        rows = math.ceil(tile_count / columns)
+        gap = 4
+        tile_width = (window_width - gap * (columns - 1)) // columns
+        tile_height = (window_height - gap * (rows - 1)) // rows
+        self.grid_tiles = []
+        for i in range(tile_count):
+            x0 = (i % columns) * (tile_width + gap)
+            y0 = (i // columns) * (tile_height + gap)
+            self.grid_tiles.append((x0, y0, x0 + tile_width, y0 + tile_height))
         
-        self.update_title()
-        self.root.update_idletasks()
-
-    def check_and_draw_divider(self, mouse_x):
-        """Draw the dividing line only if mouse is close to center"""
-        window_width = self.canvas.winfo_width()
-        window_height = self.canvas.winfo_height()
+        font = ('Helvetica', self.get_font_size(1.2), 'bold')
+        padding = 10
+        for i, (x0, y0, x1, y1) in enumerate(self.grid_tiles):
+            label = str(i + 1)
+            (label_width, label_height), = self.get_label_metrics(font, label)
+            self.canvas.create_rectangle(
+                x0 + padding, y0 + padding,
+                x0 + label_width + 3 * padding, y0 + label_height + 3 * padding,
+                fill="#000000", outline="", stipple="gray75", tags=("text_bg", "overlay")
+            )
+            self.canvas.create_text(
+                x0 + 2 * padding + label_width / 2, y0 + 2 * padding + label_height / 2,
+                text=label, fill="#FFFFFF", font=font, tags="overlay"
+            )
         
-        # Define the "close to center" threshold (pixels from center)
-        center_threshold = window_width * 0.025  # 2.5% of window width
+        # One outline that moves to the tile under the mouse
+        self.grid_highlight = self.canvas.create_rectangle(
+            0, 0, 0, 0, outline="#FFFFFF", width=3, state='hidden', tags="overlay"
+        )
+        self.hovered_tile = None
+        # The number of tiles may have changed, so which items are shown has to be worked out again
+        self.visible_side = None
+
+    def tile_at(self, x, y):
+        for i, (x0, y0, x1, y1) in enumerate(self.grid_tiles):
+            if x0 <= x < x1 and y0 <= y < y1:
+                return i
+        return None
+
+    def get_label_metrics(self, font, *labels):
+        """(width, height) of each label in the given font, measured once per font size"""
+        key = (font,) + labels
+        if key not in self.label_metrics:
+            metrics = []
+            for label in labels:
+                # Measure with a temporary text item so the size matches what the canvas draws
+                temp_text = self.canvas.create_text(0, 0, text=label, font=font)
+                bbox = self.canvas.bbox(temp_text)
+                self.canvas.delete(temp_text)
+                metrics.append((bbox[2] - bbox[0], bbox[3] - bbox[1]))
+            self.label_metrics[key] = metrics
+        return self.label_metrics[key]
+
+    def render_pointer_state(self, mouse_x, mouse_y):
+        """Bring the canvas in line with the mouse position, only calling Tk for what actually changed"""
+        if self.grid_tiles:
+            self.show_side('grid')
+            tile = self.tile_at(mouse_x, mouse_y)
+            if tile != self.hovered_tile:
+                self.hovered_tile = tile
+                if tile is None:
+                    self.canvas.itemconfig(self.grid_highlight, state='hidden')
+                else:
+                    self.canvas.coords(self.grid_highlight, *self.grid_tiles[tile])
+                    self.canvas.itemconfig(self.grid_highlight, state='normal')
+            return
         
-        # Calculate distance from center
-        center_x = window_width / 2
-        distance_from_center = abs(mouse_x - center_x)
+        window_width = self.overlay_layout_key[0]
+        side = 'left' if mouse_x < window_width // 2 else 'right'
+        self.current_side = side
+        self.show_side(side)
+        
+        if side != self.label_side:
+            self.label_side = side
+            # Darker text on the inactive side
+            self.canvas.itemconfig(self.left_text, fill="#FFFFFF" if side == 'left' else "#444444")
+            self.canvas.itemconfig(self.right_text, fill="#FFFFFF" if side == 'right' else "#444444")
+        
+        # Only show the divider if the mouse is close to the center (2.5% of window width)
+        divider_visible = abs(mouse_x - window_width / 2) < window_width * 0.025
+        if divider_visible != self.divider_visible:
+            self.divider_visible = divider_visible
+            self.canvas.itemconfig(self.divider, state='normal' if divider_visible else 'hidden')
+
+    def create_image_items(self):
+        """Both images of a screen get a persistent canvas item, so a flip only toggles which one is visible"""
+        self.image_items = []
+        # Keep references to the PhotoImages, Tk drops the image data when they are garbage collected
+        self.image_item_photos = []
+        self.image_item_paths = []
+        self.ensure_image_items(2)
+        self.visible_side = None
+
+    def ensure_image_items(self, count):
+        """Grid screens need an item per tile; items are only ever added"""
+        while len(self.image_items) < count:
+            self.image_items.append(self.canvas.create_image(0, 0, anchor=tk.NW, state='hidden', tags="image"))
+            self.image_item_photos.append(None)
+            self.image_item_paths.append(None)
+        self.canvas.tag_lower("image")
+
+    def set_image_item(self, index, photo_img, image_path=None):
+        """Point an existing image item at new image data, centred in the canvas"""
+        item = self.image_items[index]
+        self.image_item_photos[index] = photo_img
+        self.image_item_paths[index] = image_path
+        if photo_img is None:
+            self.canvas.itemconfig(item, image='')
+            return
+        if index < len(self.grid_tiles):
+            x0, y0, x1, y1 = self.grid_tiles[index]
+        else:
+            x0, y0, x1, y1 = 0, 0, self.canvas.winfo_width(), self.canvas.winfo_height()
         
-        # Delete any existing divider
-        self.canvas.delete("divider")
+        x = x0 + (x1 - x0 - photo_img.width()) // 2
+        y = y0 + (y1 - y0 - photo_img.height()) // 2
         
-        # Only draw the divider if mouse is close to center
-        if distance_from_center < center_threshold:
-            self.canvas.create_line(
-                window_width // 2, 0, window_width // 2, window_height,
-                fill="#555555", width=2, tags="divider"
-            )
+        self.canvas.coords(item, x, y)
+        self.canvas.itemconfig(item, image=photo_img)
 
-    def display_image(self, image_data):
-        if image_data:
-            img, folder, image_path = image_data
-            window_width = self.canvas.winfo_width()
-            window_height = self.canvas.winfo_height()
-            
-            x = (window_width - img.width()) // 2
-            y = (window_height - img.height()) // 2
-            
-            self.canvas.delete("image")
-            self.current_image = self.canvas.create_image(x, y, anchor=tk.NW, image=img, tags="image")
-            
-            # Make sure the text and backgrounds remain visible
-            self.canvas.tag_raise("text_bg")
-            self.canvas.tag_raise(self.left_text)
-            self.canvas.tag_raise(self.right_text)
-            
-            # Note: We don't redraw the dividing line here anymore
-            # It's handled by check_and_draw_divider in on_mouse_move
+    def show_side(self, side):
+        """Show the left or right image, or with 'grid' every tile of the screen"""
+        if side == self.visible_side:
+            return
+        self.visible_side = side
+        if side == 'grid':
+            for i, item in enumerate(self.image_items):
+                self.canvas.itemconfig(item, state='normal' if i < len(self.grid_tiles) else 'hidden')
+            return
+        for i, item in enumerate(self.image_items):
+            self.canvas.itemconfig(item, state='normal' if (i, side) in ((0, 'left'), (1, 'right')) else 'hidden')
 
     def on_mouse_move(self, event):
-        """Update the displayed image based on mouse position"""
-        window_width = self.canvas.winfo_width()
-        
-        if event.x < window_width // 2:
-            # When mouse is on the left side, show left image and highlight left text
-            if self.current_image != self.left_image:
-                self.display_image(self.left_image)
-            self.canvas.itemconfig(self.left_text, fill="#FFFFFF")
-            self.canvas.itemconfig(self.right_text, fill="#444444")  # Darker inactive text
-            # For active side: less stippling = more opaque black background
-            self.canvas.itemconfig(self.left_bg, stipple="gray75")   # 75% opaque black
-            self.canvas.itemconfig(self.right_bg, stipple="gray75")  # 75% opaque black
-            self.current_side = 'left'
-        else:
-            # When mouse is on the right side, show right image and highlight right text
-            if self.current_image != self.right_image:
-                self.display_image(self.right_image)
-            self.canvas.itemconfig(self.left_text, fill="#444444")   # Darker inactive text
-            self.canvas.itemconfig(self.right_text, fill="#FFFFFF")
-            # For active side: less stippling = more opaque black background
-            self.canvas.itemconfig(self.left_bg, stipple="gray75")   # 75% opaque black
-            self.canvas.itemconfig(self.right_bg, stipple="gray75")  # 75% opaque black
-            self.current_side = 'right'
-        
-        # Check if mouse is close to center and draw dividing line if needed
-        self.check_and_draw_divider(event.x)
+        """Update the displayed image based on mouse position, at most once per display frame"""
+        if self.overlay_layout_key is None:
+            return
+        self.pending_mouse = (event.x, event.y)
+        if self.motion_timer is None:
+            # Apply the first event straight away so a flip never waits for the next frame
+            self.render_pointer_state(event.x, event.y)
+            self.rendered_mouse = self.pending_mouse
+            self.motion_timer = self.root.after(MOTION_FRAME_MS, self.flush_mouse_move)
+
+    def flush_mouse_move(self):
+        self.motion_timer = None
+        if self.pending_mouse != self.rendered_mouse:
+            self.render_pointer_state(*self.pending_mouse)
+            self.rendered_mouse = self.pending_mouse
+            self.motion_timer = self.root.after(MOTION_FRAME_MS, self.flush_mouse_move)
 
     def on_mouse_press(self, event):
         self.click_start_x = event.x
         self.click_start_y = event.y
 
     def on_mouse_release(self, event):
-        if self.click_disabled:
+        # Nothing to vote on while a live session waits for images
+        if self.click_disabled or len(self.current_screen_images) < 2:
             return
         
         if self.click_start_x is not None and self.click_start_y is not None:
@@ -721,22 +1297,25 @@ class ImageBatchCompare:
                 
                 window_width = self.canvas.winfo_width()
                 
-                if event.x < window_width / 2:
+                if self.grid_tiles:
+                    # On a grid screen the click picks the best image outright
+                    chosen_index = self.tile_at(event.x, event.y)
+                    if chosen_index is not None and chosen_index < len(self.current_screen_images):
+                        print(f"User chose tile {chosen_index + 1}: {self.current_screen_images[chosen_index][0]}")
+                    else:
+                        chosen_index = None
+                elif event.x < window_width / 2:
                     # User clicked on the left side of the screen
-                    self.last_chosen_side = 'left'
                     chosen_index = 0  # First image in current_screen_images (left image)
                     print(f"User chose left side, selecting left image: {self.current_screen_images[chosen_index][0]}")
                 else:
                     # User clicked on the right side of the screen
-                    self.last_chosen_side = 'right'
                     chosen_index = 1  # Second image in current_screen_images (right image)
                     print(f"User chose right side, selecting right image: {self.current_screen_images[chosen_index][0]}")
                 
-                # Get the chosen image data directly from current_screen_images
-                chosen_folder, chosen_path = self.current_screen_images[chosen_index]
-                
                 # Process the vote without unbinding mouse motion
-                self.vote(chosen_folder, chosen_path)
+                if chosen_index is not None:
+                    self.vote(chosen_index)
         
         # Reset the click start coordinates
         self.click_start_x = None
@@ -744,16 +1323,9 @@ class ImageBatchCompare:
 
     def handle_click(self, event):
         window_width = self.canvas.winfo_width()
-        if event.x < window_width // 2:
-            chosen_image = self.left_image
-            self.last_chosen_side = 'left'
-        else:
-            chosen_image = self.right_image
-            self.last_chosen_side = 'right'
-        
-        if chosen_image:
-            _, folder, image_path = chosen_image
-            self.vote(folder, image_path)
+        chosen_index = 0 if event.x < window_width // 2 else 1
+        if (self.left_image, self.right_image)[chosen_index]:
+            self.vote(chosen_index)
 
     def create_checkmark_animation(self, x, y):
         """Create a simple checkmark that displays for one frame"""
@@ -777,17 +1349,43 @@ class ImageBatchCompare:
         self.canvas.tag_raise("top")
         
         # Make sure our UI elements stay on top too
-        self.canvas.tag_raise("text_bg")
-        self.canvas.tag_raise(self.left_text)
-        self.canvas.tag_raise(self.right_text)
+        self.canvas.tag_raise("overlay")
         
         # Delete the checkmark after a single frame
         self.root.after(16, lambda: self.canvas.delete("feedback_checkmark"))
 
-    def vote(self, chosen_folder, chosen_image_path):
+    def on_grid_key(self, event):
+        """Rank the tiles of a grid screen with the number keys, best first; 0 starts the order over"""
+        if not self.grid_tiles or self.waiting_for_images or self.click_disabled:
+            return
+        if event.char == '0':
+            self.grid_order = []
+            self.canvas.delete("grid_rank")
+            return
+        if not event.char.isdigit():
+            return
+        tile = int(event.char) - 1
+        if tile >= len(self.current_screen_images) or tile in self.grid_order:
+            return
+        self.grid_order.append(tile)
+        
+        # Mark the place in the middle of the tile
+        x0, y0, x1, y1 = self.grid_tiles[tile]
+        self.canvas.create_text(
+            (x0 + x1) / 2, (y0 + y1) / 2, text=f"#{len(self.grid_order)}",
+            fill='#4CD964', font=('Helvetica', self.get_font_size(4), 'bold'), tags="grid_rank"
+        )
+        
+        # The last image's place follows from the others
+        if len(self.grid_order) >= len(self.current_screen_images) - 1:
+            self.vote(self.grid_order[0], self.grid_order)
+
+    def vote(self, chosen_index, order=None):
+        """Choose current_screen_images[chosen_index], or on a grid screen a whole order of tiles (best first)"""
+        chosen_folder, chosen_image_path = self.current_screen_images[chosen_index]
         print(f"Vote called for folder: {chosen_folder}")
         print(f"Image path: {chosen_image_path}")
-        print(f"Before vote - Current votes: {self.votes}")
+        print(f"Before vote - Current votes: {self.session.votes}")
         
         # Create checkmark animation FIRST
         mouse_x = self.root.winfo_pointerx() - self.root.winfo_rootx()
@@ -797,63 +1395,85 @@ class ImageBatchCompare:
         # Force an immediate update of the canvas
         self.canvas.update_idletasks()
         
-        # Now handle the rest of the vote logic
-        self.subgroup_winner = (chosen_folder, chosen_image_path)
-        self.current_comparison += 1
-        self.current_pair_index += 1
-        self.comparisons_within_subgroup += 1
-
-        # Check if we've completed all comparisons in this subgroup
-        if self.comparisons_within_subgroup >= len(self.current_subgroup) - 1:
-            # This was the last comparison in the subgroup
-            # Add a vote for the winning folder
-            self.votes[chosen_folder] += 1
-            print(f"Added vote for subgroup winner: {chosen_folder}")
-            
-            # Move to the next subgroup
-            self.current_subgroup_index += 1
-            self.load_next_subgroup()
+        # The session decides what comes next: another pair of this subgroup, the next subgroup, or the end
+        session = self.session
+        has_pair = session.rank(order) if order else session.vote(chosen_index)
+        if has_pair and self.should_stop_early():
+            self.show_results()
         else:
-            # Continue with the next comparison in this subgroup
-            self.load_next_screen()
+            self.show_next_screen(has_pair)
 
-        print(f"After vote - Current votes: {self.votes}")
+        print(f"After vote - Current votes: {session.votes}")
         print("--------------------")
 
+    def should_stop_early(self):
+        """Check the session's stopping rule after a vote, asking the user first unless early_stop is 'auto'"""
+        session = self.session
+        if self.early_stop not in ('ask', 'auto') or self.early_stop_declined or not session.is_settled():
+            return False
+        confidence = session.ranking_confidence()
+        print(f"Ranking settled with {confidence:.1%} confidence after {session.current_comparison}/{session.total_comparisons} comparisons")
+        if self.early_stop == 'auto':
+            return True
+        top = "winner" if session.stop_top_k == 1 else f"order of the top {session.stop_top_k}"
+        if messagebox.askyesno("Ranking Settled",
+                               f"The {top} is known with {confidence:.1%} confidence after "
+                               f"{session.current_comparison} of {session.total_comparisons} comparisons.\n\n"
+                               "End the comparison now and save the results?"):
+            return True
+        # Don't ask again for the rest of this session
+        self.early_stop_declined = True
+        return False
+
     def refresh_current_image(self):
+        if self.grid_tiles:
+            self.show_side('grid')
+            return
         mouse_x = self.root.winfo_pointerx() - self.root.winfo_rootx()
         window_width = self.canvas.winfo_width()
         if mouse_x < window_width // 2:
-            self.display_image(self.left_image)
+            self.show_side('left')
         else:
-            self.display_image(self.right_image)
+            self.show_side('right')
 
     def on_window_configure(self, event):
-        # Cancel any existing timers
+        # <Configure> is bound on root, so it also fires for every child widget; only the window itself matters
+        if event.widget is not self.root:
+            return
+        
+        # Moving the window also sends <Configure>, but nothing needs to be redrawn for that
+        window_size = (event.width, event.height)
+        if window_size == self.last_window_size:
+            return
+        self.last_window_size = window_size
+        
+        # Cancel any existing timers so a burst of resize events ends in a single redraw
         if self.resize_timer is not None:
             self.root.after_cancel(self.resize_timer)
         if self.click_disable_timer is not None:
             self.root.after_cancel(self.click_disable_timer)
         
-        # Recalculate base font size based on screen resolution
+        # Recalculate base font size based on screen resolution, and only restyle if it changed
         screen_width = self.root.winfo_screenwidth()
         screen_height = self.root.winfo_screenheight()
-        self.base_font_size = self.calculate_base_font_size(screen_width, screen_height)
-        
-        # Update UI elements with new font size
-        self.update_ui_font_sizes()
+        base_font_size = self.calculate_base_font_size(screen_width, screen_height)
+        if base_font_size != self.base_font_size:
+            self.base_font_size = base_font_size
+            self.update_ui_font_sizes()
 
         # Disable clicks
         self.click_disabled = True
         
         # Set timers
-        self.resize_timer = self.root.after(200, self.display_current_screen)
+        self.resize_timer = self.root.after(200, self.refresh_display)
         self.click_disable_timer = self.root.after(100, self.enable_clicks)
 
     def update_ui_font_sizes(self):
         # Update button style
         button_style = ttk.Style()
         button_style.configure('Small.TButton', padding=(self.get_font_size(0.5), self.get_font_size(0.5)), font=('Helvetica', self.get_font_size(0.8)))
+        button_style.configure('Small.TMenubutton', padding=(self.get_font_size(0.5), self.get_font_size(0.5)), font=('Helvetica', self.get_font_size(0.8)))
+        button_style.configure('Small.TCheckbutton', font=('Helvetica', self.get_font_size(0.8)))
 
         # Update Treeview style
         style = ttk.Style()
@@ -868,69 +1488,21 @@ class ImageBatchCompare:
     def enable_clicks(self):
         self.click_disabled = False
 
-    def save_results_to_file(self):
-        """Save the comparison results to a timestamped text file in the Results folder."""
-        # Create the Results directory only when needed
-        if not os.path.exists(self.results_dir):
-            os.makedirs(self.results_dir)
-            
-        # Create a timestamp for the filename
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        result_file_name = f"comparison_results_{timestamp}.txt"
-        result_file_path = os.path.join(self.results_dir, result_file_name)
-        
-        # Prepare the results content
-        result_content = f"Image Batch Compare Results - {timestamp}\n"
-        result_content += "=" * 50 + "\n\n"
-        
-        # Add the comparison details
-        result_content += f"Total comparisons: {self.total_comparisons}\n"
-        result_content += f"Folders compared: {len(self.folders)}\n\n"
-        
-        # Add the voting results first (moved to the top)
-        result_content += "Results by folder (sorted by votes):\n"
-        result_content += "-" * 30 + "\n"
-        
-        # Sort folders by vote count (descending)
-        sorted_folders = sorted(self.votes.items(), key=lambda x: x[1], reverse=True)
-        
-        for i, (folder, votes) in enumerate(sorted_folders, 1):
-            folder_name = os.path.basename(folder)
-            result_content += f"{i}. {folder_name}: {votes} votes\n"
-        
-        result_content += "\n"
-        
-        # Add detailed folder information after the results
-        result_content += "Folders included in comparison:\n"
-        result_content += "-" * 30 + "\n"
-        for i, folder in enumerate(self.folders, 1):
-            folder_name = os.path.basename(folder)
-            result_content += f"{i}. {folder_name}\n"
-            result_content += f"   Full path: {folder}\n"
-            result_content += f"   Image count: {len(self.folder_images.get(folder, []))}\n\n"
-        
-        # Add timestamp at the end
-        result_content += "-" * 50 + "\n"
-        result_content += f"Comparison completed at: {timestamp}\n"
-        
-        # Write the results to the file
-        with open(result_file_path, "w") as f:
-            f.write(result_content)
-        
-        # Removed: Save a copy of the configuration file
-        
-        return result_file_path
+    def save_results_to_file(self, ratings=None):
+        """Save the comparison results to a timestamped text file in the Results folder, with the session for replaying."""
+        from comparison_engine import save_results
+        return save_results(self.session, self.folder_index, self.results_dir, ratings)
 
     def show_results(self):
-        # Save results to file
-        result_file_path = self.save_results_to_file()
+        from comparison_engine import format_rating
+        # Fit the ratings once for both the file and the dialog
+        ratings = self.session.fit_ratings()
+        result_file_path = self.save_results_to_file(ratings)
         
-        # Create a message with the sorted results
-        result_message = "Results:\n"
+        # Create a message with the results, highest rating first
+        result_message = "Results (rating from all comparisons, Elo scale):\n"
         result_message += "-" * 30 + "\n"
-        
-        # Sort folders by vote count (descending)
-        sorted_folders = sorted(self.votes.items(), key=lambda x: x[1], reverse=True)
+        votes = self.session.votes
         
         # Function to get ordinal suffix
         def get_ordinal(n):
@@ -940,9 +1512,9 @@ class ImageBatchCompare:
                 suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')
             return f"{n}{suffix}"
         
-        for i, (folder, votes) in enumerate(sorted_folders, 1):
+        for i, (folder, rating, lower, upper) in enumerate(ratings.ranked(), 1):
             folder_name = os.path.basename(folder)
-            result_message += f"{get_ordinal(i)}. {folder_name}: {votes} votes\n"
+            result_message += f"{get_ordinal(i)}. {folder_name}: {format_rating(rating, lower, upper)}, {votes[folder]} {self.session.vote_unit}\n"
         
         # Add file path information
         result_message += f"\nResults have been saved to:\n{result_file_path}"
@@ -955,6 +1527,7 @@ class ImageBatchCompare:
 
     def open_file(self, file_path):
         """Open the specified file with the default application."""
+        import subprocess
         try:
             if sys.platform == 'win32':
                 os.startfile(file_path)
@@ -969,15 +1542,17 @@ class ImageBatchCompare:
 
     def reset_comparison_state(self):
         """Reset the state of the comparison process."""
-        self.current_comparison = 0
-        self.current_subgroup_index = 0
-        self.subgroup_winner = None
+        self.session = None
+        self.early_stop_declined = False
         self.current_screen_images = []
         self.screen_winner = None
         self.current_index = 0
         self.winner_position = None
-        self.comparisons_within_subgroup = 0
-        self.votes = {folder: 0 for folder in self.folders}
+        self.screen_token += 1
+        self.screen_jobs = []
+        self.screen_image_quality = []
+        if self.prefetcher is not None:
+            self.prefetcher.clear()
         print("Comparison state has been reset.")
 
     def run(self):
@@ -1001,133 +1576,65 @@ class ImageBatchCompare:
         if item:
             folder = self.folder_tree.item(item)['values'][1]  # Get path from second column
             if folder in self.folders:
-                # Check if this is a temp directory and delete it
-                if os.path.dirname(folder) == os.environ.get('TEMP', '/tmp') and 'image_batch_' in os.path.basename(folder):
-                    try:
-                        print(f"Removing temp directory: {folder}")
-                        shutil.rmtree(folder)
-                    except Exception as e:
-                        print(f"Error removing temp directory: {e}")
-                
+                self.remove_drop_batch(folder)
                 self.folders.remove(folder)
-                self.votes.pop(folder, None)
-                self.folder_images.pop(folder, None)
+                self.folder_index.forget(folder)
                 self.folder_tree.delete(item)
                 self.save_config()
 
+    def remove_drop_batch(self, folder):
+        """Delete the manifest behind a batch of dropped files; the images themselves are never touched"""
+        from drop_batch import is_drop_batch
+        if is_drop_batch(folder):
+            try:
+                print(f"Removing batch manifest: {folder}")
+                os.remove(folder)
+            except OSError as e:
+                print(f"Error removing batch manifest: {e}")
+
     def handle_drop(self, event):
-        print("Drop event detected!")
+        """Parse a drop and register it on a worker thread.
+
+        Dropped folders are added as they are. Dropped image files are
+        referenced from a batch manifest instead of being copied.
+        """
+        from drop_batch import create_batch_manifest, parse_drop_data, resolve_dropped_paths
         
-        # Get the raw data and clean it up
+        print("Drop event detected!")
         raw_data = event.data
-        print(f"Raw data: {raw_data}")
-        
-        # Handle paths with spaces by properly parsing the curly braces
-        paths = []
-        current_path = ""
-        in_braces = False
-        
-        for char in raw_data:
-            if char == '{':
-                in_braces = True
-            elif char == '}':
-                in_braces = False
-                if current_path:
-                    paths.append(current_path.strip())
-                    current_path = ""
-            elif char == ' ' and not in_braces:
-                if current_path:
-                    paths.append(current_path.strip())
-                    current_path = ""
-            else:
-                current_path += char
-        
-        if current_path:
-            paths.append(current_path.strip())
-        
-        print(f"Parsed paths: {paths}")
-        
-        # Clean up paths (remove any remaining curly braces)
-        paths = [path.strip('{}').strip('"') for path in paths]
-        print(f"Cleaned paths: {paths}")
-        
-        # Reconstruct full file paths if needed
-        full_paths = []
-        current_dir = None
-        
-        for path in paths:
-            if os.path.isdir(path):
-                current_dir = path
-            elif current_dir and os.path.isfile(os.path.join(current_dir, path)):
-                full_paths.append(os.path.join(current_dir, path))
-            elif os.path.isfile(path):
-                full_paths.append(path)
-        
-        print(f"Full paths: {full_paths}")
+        results = queue.Queue()
         
-        # Filter for image files
-        image_files = [
-            path for path in full_paths 
-            if path.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp'))
-        ]
-        print(f"Found image files: {image_files}")
-        
-        if image_files:
-            # Find the next available batch number
-            existing_batches = []
-            for folder in self.folders:
-                if os.path.dirname(folder) == os.environ.get('TEMP', '/tmp'):
-                    try:
-                        batch_name = os.path.basename(folder)
-                        if batch_name.startswith('image_batch_'):
-                            batch_num = int(batch_name.replace('image_batch_', ''))
-                            existing_batches.append(batch_num)
-                    except ValueError:
-                        continue
-            
-            next_batch = 1
-            if existing_batches:
-                next_batch = max(existing_batches) + 1
-            
-            # Create a temp directory with the next batch number
-            temp_dir = os.path.join(os.environ.get('TEMP', '/tmp'), f'image_batch_{next_batch}')
-            print(f"Creating temp directory: {temp_dir}")
-            
-            # Create directory if it doesn't exist, or clean it if it does
-            if os.path.exists(temp_dir):
-                for file in os.listdir(temp_dir):
-                    file_path = os.path.join(temp_dir, file)
-                    try:
-                        if os.path.isfile(file_path):
-                            os.unlink(file_path)
-                    except Exception as e:
-                        print(f"Error deleting file {file_path}: {e}")
-            else:
-                os.makedirs(temp_dir, exist_ok=True)
-            
-            # Copy images to temp directory
-            for image_path in image_files:
-                filename = os.path.basename(image_path)
-                dest_path = os.path.join(temp_dir, filename)
-                print(f"Copying {image_path} to {dest_path}")
-                shutil.copy2(image_path, dest_path)
-            
-            # Add the temp directory as a folder
-            if temp_dir not in self.folders:
-                print(f"Adding temp directory to folders: {temp_dir}")
-                self.folders.append(temp_dir)
-                self.votes[temp_dir] = 0
-                self.folder_tree.insert("", "end", values=("📂", temp_dir))
-                self.save_config()
-        
-        # Handle directories as before
-        for path in paths:
-            if os.path.isdir(path) and path not in self.folders:
-                print(f"Adding directory: {path}")
-                self.folders.append(path)
-                self.votes[path] = 0
-                self.folder_tree.insert("", "end", values=("📂", path))
+        def register_drop():
+            try:
+                directories, image_files = resolve_dropped_paths(parse_drop_data(raw_data))
+                print(f"Dropped {len(directories)} folders and {len(image_files)} image files")
+                if image_files:
+                    manifest_path = create_batch_manifest(image_files)
+                    print(f"Created batch manifest: {manifest_path}")
+                    directories.append(manifest_path)
+                results.put((directories, None))
+            except Exception as e:
+                results.put((None, e))
+        
+        threading.Thread(target=register_drop, daemon=True).start()
+        self.root.after(FOLDER_CHECK_POLL_MS, self.poll_drop, results)
+
+    def poll_drop(self, results):
+        try:
+            new_folders, error = results.get_nowait()
+        except queue.Empty:
+            self.root.after(FOLDER_CHECK_POLL_MS, self.poll_drop, results)
+            return
+        if error is not None:
+            print(f"Error handling drop: {error}")
+            return
         
+        new_folders = [folder for folder in new_folders if folder not in self.folders]
+        for folder in new_folders:
+            print(f"Adding: {folder}")
+            self.folders.append(folder)
+            self.folder_tree.insert("", "end", values=("📂", folder, "…"))
+        self.validate_folders_in_background(new_folders)
         self.save_config()
 
     def update_folder_icons(self):
@@ -1143,6 +1650,7 @@ class ImageBatchCompare:
             column = self.folder_tree.identify_column(event.x)
             if column == '#1':  # Button column (first column)
                 folder_path = self.folder_tree.item(item)['values'][1]  # Get path from second column
+                import subprocess
                 try:
                     if sys.platform == 'win32':
                         os.startfile(folder_path)
@@ -1180,8 +1688,11 @@ class ImageBatchCompare:
 
     def refresh_display(self):
         """Refresh the display after resize"""
+        self.resize_timer = None
         if self.image_frame.winfo_viewable() and hasattr(self, 'current_screen_images'):
             self.display_current_screen()
+            if self.waiting_for_images:
+                self.show_waiting_message()
 
     def select_all_folders(self, event):
         """Select all folders in the folder tree when Ctrl+A is pressed"""
@@ -0,0 +1,297 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from PIL import Image
+from archive_source import open_source, stat_source
+
+# Default memory budget for decoded, display-sized images
+DEFAULT_CACHE_MB = 512
+
+
+def fit_size(image_size, target_size):
+    """Return the largest size with the image's aspect ratio that fits inside target_size"""
+    img_width, img_height = image_size
+    window_width, window_height = target_size
+    aspect_ratio = img_width / img_height
+
+    if aspect_ratio > window_width / window_height:
+        return window_width, max(1, int(window_width / aspect_ratio))
+    else:
+        return max(1, int(window_height * aspect_ratio)), window_height
+
+
+# Modes that resample correctly as they are, so conversion to RGB can wait until after downscaling
+RESAMPLE_BEFORE_CONVERT_MODES = ('RGB', 'RGBA', 'L', 'LA')
+
+
+def load_display_image(image_path, target_size, preview_callback=None):
+    """Decode an image file and resize it to fit the display area.
+
+    Takes the cheapest route to the target size: JPEGs are decoded at a reduced
+    scale, large images are shrunk with an integer box reduction before the
+    final LANCZOS pass, and conversion to RGB happens on the small image.
+
+    If preview_callback is given, it is first called with a quick BILINEAR
+    rendition. Returning False from it skips the LANCZOS pass and makes this
+    function return None.
+    """
+    with open_source(image_path) as source, Image.open(source) as pil_img:
+        display_size = fit_size(pil_img.size, target_size)
+        if pil_img.format == 'JPEG':
+            # DCT scaling: decode directly at 1/2, 1/4 or 1/8 size, never smaller than requested
+            pil_img.draft('RGB', display_size)
+        pil_img = reduce_for_display(pil_img, display_size)
+
+        if preview_callback is not None:
+            if not preview_callback(to_rgb(pil_img.resize(display_size, Image.BILINEAR))):
+                return None
+        return to_rgb(pil_img.resize(display_size, Image.LANCZOS))
+
+
+def reduce_for_display(pil_img, display_size):
+    if pil_img.mode not in RESAMPLE_BEFORE_CONVERT_MODES:
+        # Palette and high bit depth images have to be converted before they can be resampled well
+        pil_img = pil_img.convert('RGBA' if 'transparency' in pil_img.info else 'RGB')
+
+    # Keep at least twice the display size for LANCZOS so the reduction doesn't cost quality
+    reduce_factor = min(pil_img.width // (display_size[0] * 2), pil_img.height // (display_size[1] * 2))
+    if reduce_factor >= 2:
+        pil_img = pil_img.reduce(reduce_factor)
+    return pil_img
+
+
+def to_rgb(pil_img):
+    return pil_img if pil_img.mode == 'RGB' else pil_img.convert('RGB')
+
+
+def image_nbytes(image):
+    return image.width * image.height * len(image.getbands())
+
+
+class DisplayImageCache:
+    """Thread-safe LRU cache of display-sized images, bounded by a byte budget.
+
+    Entries are keyed by path, modification time and target size, so an edited
+    file or a different window size never returns a stale image.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_key(image_path, target_size):
+        return (image_path, stat_source(image_path).st_mtime_ns, tuple(target_size))
+
+    def get(self, key):
+        with self.lock:
+            image = self.entries.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key, image):
+        size = image_nbytes(image)
+        with self.lock:
+            if key in self.entries:
+                self.current_bytes -= image_nbytes(self.entries.pop(key))
+            # Images larger than the whole budget are never cached
+            if size > self.max_bytes:
+                return
+            self.entries[key] = image
+            self.current_bytes += size
+            self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits its budget (lock must be held)"""
+        while self.current_bytes > self.max_bytes and self.entries:
+            _, image = self.entries.popitem(last=False)
+            self.current_bytes -= image_nbytes(image)
+            self.evictions += 1
+
+    def find_master(self, image_path, mtime_ns, target_size):
+        """Return the largest cached rendition of an image that can be shrunk to fit target_size, or None"""
+        master = None
+        with self.lock:
+            for (path, mtime, _), image in self.entries.items():
+                if path != image_path or mtime != mtime_ns:
+                    continue
+                display_size = fit_size(image.size, target_size)
+                if image.width < display_size[0] or image.height < display_size[1]:
+                    continue
+                if master is None or image.width > master.width:
+                    master = image
+        return master
+
+    def set_max_bytes(self, max_bytes):
+        with self.lock:
+            self.max_bytes = max_bytes
+            self.evict()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+class LoadJob:
+    """A queued image load, with a quick preview and the final high quality image as separate futures"""
+
+    def __init__(self):
+        self.preview = Future()
+        self.final = Future()
+        self.cancelled = False
+
+    def cancel(self):
+        """Skip the job, or at least its refinement pass if it is already running"""
+        self.cancelled = True
+        self.preview.cancel()
+        self.final.cancel()
+
+    def set_preview(self, image):
+        try:
+            self.preview.set_result(image)
+        except InvalidStateError:
+            pass
+        return not self.cancelled
+
+    def set_final(self, image):
+        self.set_preview(image)
+        try:
+            self.final.set_result(image)
+        except InvalidStateError:
+            pass
+
+    def set_exception(self, exception):
+        for future in (self.preview, self.final):
+            try:
+                future.set_exception(exception)
+            except InvalidStateError:
+                pass
+
+
+class ImagePrefetcher:
+    """Decodes and resizes images on a worker pool before they are needed on screen.
+
+    Only PIL work happens on the workers. Turning the result into a PhotoImage
+    must still be done on the Tk thread.
+    """
+
+    def __init__(self, max_workers=None, cache=None, disk_cache=None):
+        if max_workers is None:
+            max_workers = min(4, os.cpu_count() or 1)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ibc-prefetch")
+        self.cache = cache
+        self.disk_cache = disk_cache
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def request(self, image_path, target_size):
+        """Queue an image for loading (if it isn't already) and return its LoadJob"""
+        key = (image_path, tuple(target_size))
+        with self.lock:
+            job = self.pending.get(key)
+            if job is None or job.cancelled:
+                job = LoadJob()
+                image = self.lookup_cache(image_path, key[1])
+                if image is not None:
+                    job.set_final(image)
+                else:
+                    self.executor.submit(self.run, job, image_path, key[1])
+                self.pending[key] = job
+        return job
+
+    def lookup_cache(self, image_path, target_size):
+        if self.cache is None:
+            return None
+        try:
+            return self.cache.get(self.cache.make_key(image_path, target_size))
+        except OSError:
+            return None
+
+    def run(self, job, image_path, target_size):
+        if job.cancelled:
+            return
+        try:
+            image = self.load(image_path, target_size, job.set_preview)
+        except Exception as e:
+            job.set_exception(e)
+            return
+        if image is not None:
+            job.set_final(image)
+
+    def load(self, image_path, target_size, preview_callback=None):
+        """Rescale a rendition already in memory if possible, then try the disk cache, then decode the original file"""
+        image = self.rescale_from_master(image_path, target_size)
+        if image is not None:
+            return image
+        if self.disk_cache is not None:
+            disk_key = self.disk_cache.make_key(image_path, target_size)
+            image = self.disk_cache.get(disk_key)
+        if image is None:
+            image = load_display_image(image_path, target_size, preview_callback)
+            if image is None:
+                # Refinement was cancelled after the preview
+                return None
+            if self.disk_cache is not None:
+                self.disk_cache.put(disk_key, image)
+        if self.cache is not None:
+            self.cache.put(self.cache.make_key(image_path, target_size), image)
+        return image
+
+    def rescale_from_master(self, image_path, target_size):
+        """After a window resize, shrink an existing in-memory rendition instead of re-reading the file"""
+        if self.cache is None:
+            return None
+        cache_key = self.cache.make_key(image_path, target_size)
+        master = self.cache.find_master(image_path, cache_key[1], target_size)
+        if master is None:
+            return None
+        image = master.resize(fit_size(master.size, target_size), Image.LANCZOS)
+        self.cache.put(cache_key, image)
+        return image
+
+    def prefetch(self, image_paths, target_size):
+        for image_path in image_paths:
+            self.request(image_path, target_size)
+
+    def get(self, image_path, target_size):
+        """Return the final display-sized PIL image, waiting for the worker if it is still busy"""
+        return self.request(image_path, target_size).final.result()
+
+    def retain(self, image_paths):
+        """Forget loaded or queued images that aren't in image_paths anymore"""
+        keep = set(image_paths)
+        with self.lock:
+            for key in list(self.pending):
+                if key[0] not in keep:
+                    self.pending.pop(key).cancel()
+
+    def clear(self):
+        self.retain([])
+
+    def shutdown(self):
+        self.clear()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,71 @@
+import time
+from archive_source import stat_source
+from subgroup_alignment import make_alignment
+
+# A file counts as finished once it hasn't been written to for this long
+DEFAULT_SETTLE_SECONDS = 2.0
+# With alignment keys, a subgroup whose other images are this old is played without the ones still missing
+DEFAULT_MISSING_SECONDS = 60.0
+
+
+class LiveIngest:
+    """Counts the subgroups that are ready while folders are still being filled.
+
+    A subgroup is ready once every folder has its image and none of those files
+    has been modified for settle_seconds, so partially written files are never
+    shown. The count only ever grows, which assumes new images sort after the
+    existing ones (e.g. zero-padded seeds, or increasing alignment keys).
+
+    Paired by key, a subgroup may go without some folders' images: once every
+    folder has a finished image of a later subgroup, or once its own images
+    are missing_seconds old, the missing ones aren't expected any more.
+    """
+
+    def __init__(self, folder_index, folders, key_pattern=None, settle_seconds=DEFAULT_SETTLE_SECONDS,
+                 missing_seconds=DEFAULT_MISSING_SECONDS):
+        self.folder_index = folder_index
+        self.folders = list(folders)
+        self.key_pattern = key_pattern
+        self.settle_seconds = settle_seconds
+        self.missing_seconds = missing_seconds
+        self.ready_count = 0
+
+    def poll(self):
+        """Rescan folders that changed and return (ready subgroups, alignment). Meant for a worker thread."""
+        # An unreachable folder only delays new subgroups; it keeps its last listing
+        self.folder_index.refresh_all(self.folders)
+        alignment = make_alignment(self.folder_index, self.folders, self.key_pattern)
+        now = time.time()
+        while self.ready_count < alignment.subgroup_count():
+            image_paths = [alignment.image_path(folder, self.ready_count) for folder in self.folders]
+            image_paths = [image_path for image_path in image_paths if image_path is not None]
+            if not all(self.is_settled(image_path, now) for image_path in image_paths):
+                break
+            # Other folders may still be about to write their image for this subgroup
+            if len(image_paths) < len(self.folders) and not self.is_abandoned(alignment, image_paths, now):
+                break
+            self.ready_count += 1
+        return self.ready_count, alignment
+
+    def is_abandoned(self, alignment, image_paths, now):
+        """Whether the folders without an image in the subgroup at ready_count have stopped waiting for one.
+
+        Only alignment keys can leave a subgroup short; by position the
+        next image a folder writes is the one that's missing.
+        """
+        if not self.key_pattern:
+            return False
+        for later in range(self.ready_count + 1, alignment.subgroup_count()):
+            if alignment.subgroup_sizes[later] == len(self.folders):
+                # Every folder has moved past this key once it has finished a later one
+                if all(self.is_settled(alignment.image_path(folder, later), now) for folder in self.folders):
+                    return True
+                break
+        return all(self.is_settled(image_path, now, self.missing_seconds) for image_path in image_paths)
+
+    def is_settled(self, image_path, now, seconds=None):
+        try:
+            stat = stat_source(image_path)
+        except OSError:
+            return False
+        return stat.st_size > 0 and now - stat.st_mtime >= (self.settle_seconds if seconds is None else seconds)
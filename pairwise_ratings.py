@@ -0,0 +1,255 @@
+import numpy as np
+
+DEFAULT_BOOTSTRAP_SAMPLES = 1000
+INTERVAL_LEVEL = 0.95
+
+# Every folder also gets this many wins and losses against an average opponent,
+# so folders that never won (or never lost) still get a finite rating
+PRIOR_GAMES = 0.5
+
+# Ratings are reported on the Elo scale: 400 points is 10:1 odds
+ELO_SCALE = 400 / np.log(10)
+
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-6
+# Percentiles of a thousand samples are only good to a few points anyway
+BOOTSTRAP_TOLERANCE = 0.5 / ELO_SCALE
+# Pairs with up to this many games are redrawn game by game (see draw_wins)
+FEW_GAMES = 8
+# Relative size of the rounding errors in a single precision log-likelihood
+ROUNDING = 1e-6
+# Bootstrap samples refitted together; small enough that their arrays stay in cache
+BOOTSTRAP_CHUNK = 100
+
+
+def expit(x):
+    # In place on one new array, since the bootstrap calls this on large ones
+    result = np.multiply(x, 0.5)
+    np.tanh(result, out=result)
+    result += 1
+    result *= 0.5
+    return result
+
+
+def log_likelihood(theta, incidence, wins, games):
+    margins = incidence @ theta
+    prior = PRIOR_GAMES * (np.logaddexp(0, -theta) + np.logaddexp(0, theta)).sum()
+    return (wins * margins - games * np.logaddexp(0, margins)).sum() - prior
+
+
+def gradient(theta, incidence, wins, games):
+    """Gradient of the log-likelihood for every row of theta and wins (one row per data set)"""
+    margins = theta @ incidence.T
+    return (wins - games * expit(margins)) @ incidence + PRIOR_GAMES * (1 - 2 * expit(theta))
+
+
+def hessian(theta, incidence, games):
+    margins = incidence @ theta
+    weights = games * expit(margins) * expit(-margins)
+    prior = 2 * PRIOR_GAMES * expit(theta) * expit(-theta)
+    return -(incidence.T * weights) @ incidence - np.diag(prior)
+
+
+def fit_log_strengths(incidence, wins, games):
+    """Maximum likelihood Bradley-Terry log-strengths by Newton's method with step halving"""
+    theta = np.zeros(incidence.shape[1])
+    current = log_likelihood(theta, incidence, wins, games)
+    for _ in range(MAX_ITERATIONS):
+        step = np.linalg.solve(hessian(theta, incidence, games), -gradient(theta, incidence, wins, games))
+        # The log-likelihood is concave, so a short enough step along the Newton direction always helps
+        while True:
+            candidate = theta + step
+            value = log_likelihood(candidate, incidence, wins, games)
+            if value >= current or np.max(np.abs(step)) < TOLERANCE:
+                break
+            step /= 2
+        theta, current = candidate, value
+        if np.max(np.abs(step)) < TOLERANCE:
+            break
+    return theta
+
+
+def to_elo(theta):
+    """Elo-scale ratings centred on the mean folder"""
+    ratings = ELO_SCALE * theta
+    return ratings - ratings.mean(axis=-1, keepdims=True)
+
+
+def draw_wins(rng, games, probabilities, samples):
+    """samples rows of binomial(games, probabilities) draws, one column per pair.
+
+    numpy's binomial takes far longer than a uniform draw, so pairs with a
+    few games add up one uniform draw per game instead.
+    """
+    wins = np.zeros((samples, len(games)))
+    many = games > FEW_GAMES
+    wins[:, many] = rng.binomial(games[many], probabilities[many], size=(samples, many.sum()))
+    thresholds = probabilities.astype(np.float32)
+    for game_count in range(1, FEW_GAMES + 1):
+        pairs = np.flatnonzero(games == game_count)
+        if len(pairs):
+            draws = rng.random((samples, len(pairs), game_count), dtype=np.float32)
+            wins[:, pairs] = (draws < thresholds[pairs, None]).sum(axis=2)
+    return wins
+
+
+def sample_log_likelihoods(theta, margins, probabilities, sample_wins, games):
+    """log_likelihood of every row of theta, given its margins (theta @ incidence.T) and their expit"""
+    # log(1 + e^m) = -log(1 - p); the margins of a fit stay far from where 1 - p runs out of precision
+    losses = np.negative(probabilities)
+    # A step far past a sample's optimum can reach p = 1, which makes the log-likelihood -inf and the step get halved
+    with np.errstate(divide='ignore'):
+        np.log1p(losses, out=losses)
+    prior = PRIOR_GAMES * (np.logaddexp(0, -theta) + np.logaddexp(0, theta)).sum(axis=1, dtype=float)
+    # Summed in double precision, so the comparison of two steps isn't decided by rounding
+    return (np.einsum('ij,ij->i', sample_wins, margins, dtype=float) + np.einsum('ij,j->i', losses, games, dtype=float)
+            - prior)
+
+
+def refit_samples(theta, incidence, sample_wins, games, chunk_size=BOOTSTRAP_CHUNK):
+    """Log-strengths for many sets of wins over the same pairs, starting from the fit theta.
+
+    Runs preconditioned nonlinear conjugate gradients on chunk_size samples
+    at a time: the Hessian at theta is the preconditioner, and each
+    sample's step length comes from its own curvature along the search
+    direction. That step is halved until it doesn't lower the sample's
+    log-likelihood, as in fit_log_strengths, and the search restarts along
+    the gradient after a halving or when the conjugate direction doesn't
+    point uphill. A sample stops once both its last step and the next
+    preconditioned gradient step are below BOOTSTRAP_TOLERANCE.
+    """
+    step_matrix = np.linalg.inv(-hessian(theta, incidence, games))
+    # Single precision is plenty for half an Elo point, and halves the memory traffic that limits this
+    step_matrix, incidence, games = (values.astype(np.float32) for values in (step_matrix, incidence, games))
+    sample_theta = np.repeat(theta[None, :], len(sample_wins), axis=0)
+    for start in range(0, len(sample_wins), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        sample_theta[chunk] = refit_chunk(sample_theta[chunk].astype(np.float32), incidence,
+                                          sample_wins[chunk].astype(np.float32), games, step_matrix)
+    return sample_theta
+
+
+def refit_chunk(sample_theta, incidence, sample_wins, games, step_matrix):
+    """refit_samples for one chunk. The working arrays only keep the samples that haven't settled."""
+    sample_theta = sample_theta.copy()
+    rows = np.arange(len(sample_wins))
+    current, wins = sample_theta, sample_wins
+    # Every sample starts from the same point, so its margins and probabilities are shared until the first step
+    shared_margins = current[0] @ incidence.T
+    values = wins @ shared_margins + sample_log_likelihoods(current[:1], shared_margins[None, :], expit(shared_margins)[None, :],
+                                                             np.zeros((1, len(games)), dtype=wins.dtype), games)
+    margins = np.broadcast_to(shared_margins, wins.shape)
+    probabilities = np.broadcast_to(expit(shared_margins), wins.shape)
+    step_sizes = np.full(len(rows), np.inf)
+    last_grad = last_preconditioned = last_direction = None
+    for _ in range(MAX_ITERATIONS):
+        residuals = probabilities * games
+        np.subtract(wins, residuals, out=residuals)
+        grad = residuals @ incidence + PRIOR_GAMES * (1 - 2 * expit(current))
+        preconditioned = grad @ step_matrix
+
+        # A sample has settled once its last step and the step the preconditioner suggests next are both short
+        moving = (step_sizes >= BOOTSTRAP_TOLERANCE) | (np.max(np.abs(preconditioned), axis=1) >= BOOTSTRAP_TOLERANCE)
+        if not moving.any():
+            break
+        if not moving.all():
+            rows, wins, current, margins, probabilities, values, grad, preconditioned = (
+                array[moving] for array in (rows, wins, current, margins, probabilities, values, grad, preconditioned))
+            if last_grad is not None:
+                last_grad, last_preconditioned, last_direction = last_grad[moving], last_preconditioned[moving], last_direction[moving]
+
+        direction = preconditioned
+        if last_grad is not None:
+            # Polak-Ribiere, restarting along the preconditioned gradient whenever it goes negative
+            beta = np.zeros(len(rows), dtype=np.float32)
+            np.divide(np.einsum('ij,ij->i', preconditioned, grad - last_grad), np.einsum('ij,ij->i', last_preconditioned, last_grad),
+                      out=beta, where=np.any(last_direction != 0, axis=1))
+            direction = preconditioned + np.maximum(beta, 0)[:, None] * last_direction
+            # or whenever the result doesn't point uphill
+            downhill = np.einsum('ij,ij->i', grad, direction) <= 0
+            direction[downhill] = preconditioned[downhill]
+
+        pair_steps = direction @ incidence.T
+        weights = np.subtract(1, probabilities)
+        weights *= probabilities
+        weights *= games
+        weights *= pair_steps
+        prior_weights = 2 * PRIOR_GAMES * expit(current) * expit(-current)
+        curvature = np.einsum('ij,ij->i', weights, pair_steps) + np.einsum('ij,ij->i', prior_weights * direction, direction)
+        # Near a sample's optimum the curvature underflows; the plain preconditioned step is tiny there anyway
+        lengths = np.ones(len(rows), dtype=np.float32)
+        np.divide(np.einsum('ij,ij->i', grad, direction), curvature, out=lengths, where=curvature > 1e-24)
+        direction_sizes = np.max(np.abs(direction), axis=1)
+
+        # The curvature is that of the current point, so a long step can overshoot.
+        # Like fit_log_strengths, halve it until the log-likelihood doesn't drop.
+        new_theta = current + lengths[:, None] * direction
+        new_margins = lengths[:, None] * pair_steps
+        new_margins += margins
+        new_probabilities = expit(new_margins)
+        new_values = sample_log_likelihoods(new_theta, new_margins, new_probabilities, wins, games)
+        halved = np.zeros(len(rows), dtype=bool)
+        while True:
+            # Drops within single precision rounding of the log-likelihood don't count; an overshoot loses far more
+            rejected = np.flatnonzero((new_values < values - ROUNDING * np.abs(values)) & (np.abs(lengths) * direction_sizes >= TOLERANCE))
+            if not len(rejected):
+                break
+            halved[rejected] = True
+            lengths[rejected] /= 2
+            new_theta[rejected] = current[rejected] + lengths[rejected, None] * direction[rejected]
+            new_margins[rejected] = margins[rejected] + lengths[rejected, None] * pair_steps[rejected]
+            new_probabilities[rejected] = expit(new_margins[rejected])
+            new_values[rejected] = sample_log_likelihoods(new_theta[rejected], new_margins[rejected],
+                                                          new_probabilities[rejected], wins[rejected], games)
+        sample_theta[rows] = new_theta
+        # A halved step means the search direction was poor, so the next one starts over from the gradient
+        direction[halved] = 0
+
+        step_sizes = np.abs(lengths) * direction_sizes
+        step_sizes[halved] = np.inf
+        current, margins, probabilities, values = new_theta, new_margins, new_probabilities, new_values
+        last_grad, last_preconditioned, last_direction = grad, preconditioned, direction
+    return sample_theta
+
+
+class RatingFit:
+    """Bradley-Terry ratings of every folder from a win matrix, with bootstrap intervals.
+
+    The bootstrap keeps the pairs that were shown, since the scheduler chose
+    those, and redraws who won each comparison from the win probability the
+    fit gives its pair, which is never exactly 0 or 1. All samples are
+    refitted together (see refit_samples).
+    """
+
+    def __init__(self, folders, win_matrix, samples=DEFAULT_BOOTSTRAP_SAMPLES, seed=None):
+        self.folders = list(folders)
+        folder_count = len(self.folders)
+        win_matrix = np.asarray(win_matrix, dtype=float).reshape(folder_count, folder_count)
+        # One entry per pair of folders that met: wins of the first, and comparisons between them
+        games_matrix = win_matrix + win_matrix.T
+        firsts, seconds = np.nonzero(np.triu(games_matrix, 1))
+        wins = win_matrix[firsts, seconds]
+        games = games_matrix[firsts, seconds]
+        self.comparisons = int(games.sum())
+
+        # Row p is +1 at the first and -1 at the second folder of pair p
+        incidence = np.zeros((len(firsts), folder_count))
+        incidence[np.arange(len(firsts)), firsts] = 1
+        incidence[np.arange(len(seconds)), seconds] = -1
+
+        theta = fit_log_strengths(incidence, wins, games)
+        self.ratings = to_elo(theta)
+        if self.comparisons and samples:
+            rng = np.random.default_rng(seed)
+            win_probabilities = expit(incidence @ theta)
+            sample_wins = draw_wins(rng, games.astype(np.int64), win_probabilities, samples)
+            sample_theta = refit_samples(theta, incidence, sample_wins, games)
+            tail = (1 - INTERVAL_LEVEL) / 2 * 100
+            self.lower, self.upper = np.percentile(to_elo(sample_theta), [tail, 100 - tail], axis=0)
+        else:
+            self.lower = self.upper = self.ratings
+
+    def ranked(self):
+        """(folder, rating, lower, upper) tuples, highest rating first"""
+        order = np.argsort(-self.ratings, kind='stable')
+        return [(self.folders[i], float(self.ratings[i]), float(self.lower[i]), float(self.upper[i])) for i in order]
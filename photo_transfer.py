@@ -0,0 +1,66 @@
+import time
+import tkinter as tk
+from PIL import Image, ImageTk
+
+
+def imagetk_photo(pil_img, master=None):
+    """Pillow's own transfer, which copies the pixels into Tk one block at a time"""
+    return ImageTk.PhotoImage(pil_img, master=master)
+
+
+def ppm_photo(pil_img, master=None):
+    """Hand Tk the pixels as a single binary PPM blob, which its built-in PPM reader copies in one pass"""
+    if pil_img.mode != 'RGB':
+        pil_img = pil_img.convert('RGB')
+    header = f"P6\n{pil_img.width} {pil_img.height}\n255\n".encode('ascii')
+    return tk.PhotoImage(master=master, width=pil_img.width, height=pil_img.height,
+                         data=header + pil_img.tobytes(), format='PPM')
+
+
+# Fallback first: it is what the application has always used
+TRANSFER_METHODS = {
+    'imagetk': imagetk_photo,
+    'ppm': ppm_photo,
+}
+
+
+class PhotoTransfer:
+    """Turns display-sized PIL images into Tk photo images with the fastest method that works here.
+
+    The first call times every method on a small test image and keeps the
+    quickest. If the chosen method ever fails, it falls back to ImageTk.
+    Must only be used from the Tk thread.
+    """
+
+    def __init__(self, master, method='auto'):
+        self.master = master
+        self.method = None if method == 'auto' else method
+
+    def calibrate(self, size=(640, 360), rounds=3):
+        """Time every transfer method and return the name of the fastest one"""
+        test_image = Image.effect_noise(size, 64).convert('RGB')
+        timings = {}
+        for name, transfer in TRANSFER_METHODS.items():
+            try:
+                start = time.perf_counter()
+                for _ in range(rounds):
+                    transfer(test_image, self.master)
+                timings[name] = time.perf_counter() - start
+            except Exception as e:
+                print(f"Warning: Photo transfer method '{name}' is unavailable: {e}")
+        if not timings:
+            return 'imagetk'
+        return min(timings, key=timings.get)
+
+    def make_photo(self, pil_img):
+        if self.method is None:
+            self.method = self.calibrate()
+            print(f"Using '{self.method}' photo transfer")
+        try:
+            return TRANSFER_METHODS[self.method](pil_img, self.master)
+        except Exception as e:
+            if self.method == 'imagetk':
+                raise
+            print(f"Warning: Photo transfer method '{self.method}' failed, falling back to ImageTk: {e}")
+            self.method = 'imagetk'
+            return imagetk_photo(pil_img, self.master)
@@ -0,0 +1,120 @@
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from archive_source import open_source
+
+# Header reads are mostly waiting on the disk (or network), so use more threads than cores
+DEFAULT_PREFLIGHT_WORKERS = 32
+
+# Keep dialogs readable when thousands of files have problems
+MAX_LISTED_PROBLEMS = 20
+
+
+def read_image_header(image_path):
+    """Read size, mode and format of an image without decoding any pixels.
+
+    Returns a dict with either those fields or an 'error'.
+    """
+    try:
+        # Image.open only parses the header; the pixel data is never read here
+        with open_source(image_path) as source, Image.open(source) as img:
+            return {
+                'size': img.size,
+                'mode': img.mode,
+                'format': img.format,
+                'alpha': 'A' in img.getbands() or 'transparency' in img.info,
+            }
+    except Exception as e:
+        return {'error': str(e) or type(e).__name__}
+
+
+class PreflightReport:
+    """Header information of every image in a comparison, summarised per folder and per subgroup"""
+
+    def __init__(self, folders, headers, subgroups):
+        self.folders = folders
+        # headers: {folder: [(image_name, header dict), ...]} in listing order
+        self.headers = headers
+        # subgroups: one list of header dicts per subgroup, for the folders that have an image in it
+        self.subgroups = subgroups
+        self.folder_summaries = {folder: self.summarize_folder(headers[folder]) for folder in folders}
+        self.subgroup_problems = self.find_subgroup_problems()
+
+    @staticmethod
+    def summarize_folder(entries):
+        summary = {'count': len(entries), 'errors': [], 'sizes': Counter(), 'modes': Counter(), 'formats': Counter(), 'alpha': 0}
+        for image_name, header in entries:
+            if 'error' in header:
+                summary['errors'].append((image_name, header['error']))
+                continue
+            summary['sizes'][header['size']] += 1
+            summary['modes'][header['mode']] += 1
+            summary['formats'][header['format']] += 1
+            summary['alpha'] += header['alpha']
+        return summary
+
+    def find_subgroup_problems(self):
+        """List (subgroup index, description) for subgroups whose images differ in resolution or alpha"""
+        problems = []
+        for index, subgroup_headers in enumerate(self.subgroups):
+            headers = [header for header in subgroup_headers if 'error' not in header]
+            sizes = {header['size'] for header in headers}
+            if len(sizes) > 1:
+                size_list = ", ".join(f"{w}x{h}" for w, h in sorted(sizes))
+                problems.append((index, f"different resolutions ({size_list})"))
+            if len({header['alpha'] for header in headers}) > 1:
+                problems.append((index, "some images have an alpha channel and some don't"))
+        return problems
+
+    @property
+    def error_count(self):
+        return sum(len(summary['errors']) for summary in self.folder_summaries.values())
+
+    @property
+    def has_problems(self):
+        return bool(self.error_count or self.subgroup_problems)
+
+    def format_text(self, max_listed=MAX_LISTED_PROBLEMS):
+        lines = []
+        for folder in self.folders:
+            summary = self.folder_summaries[folder]
+            sizes = ", ".join(f"{w}x{h} ({count})" for (w, h), count in summary['sizes'].most_common(3))
+            modes = ", ".join(f"{mode} ({count})" for mode, count in summary['modes'].most_common())
+            lines.append(f"{os.path.basename(folder)}: {summary['count']} images, {sizes or 'no readable images'}; {modes}")
+            if summary['alpha']:
+                lines.append(f"   {summary['alpha']} with alpha channel")
+            for image_name, error in summary['errors'][:max_listed]:
+                lines.append(f"   Unreadable: {image_name}: {error}")
+            if len(summary['errors']) > max_listed:
+                lines.append(f"   ... and {len(summary['errors']) - max_listed} more unreadable files")
+
+        if self.subgroup_problems:
+            lines.append("")
+            lines.append("Subgroups with mismatched images:")
+            for index, description in self.subgroup_problems[:max_listed]:
+                lines.append(f"   Subgroup {index + 1}: {description}")
+            if len(self.subgroup_problems) > max_listed:
+                lines.append(f"   ... and {len(self.subgroup_problems) - max_listed} more subgroups")
+        return "\n".join(lines)
+
+
+def run_preflight(folders, folder_index, alignment, max_workers=DEFAULT_PREFLIGHT_WORKERS):
+    """Read the header of every image in the alignment's subgroups in parallel and return a PreflightReport.
+
+    alignment decides which images form each subgroup (see subgroup_alignment).
+    Images it leaves out, such as those outside a subgroup sample, aren't read.
+    """
+    subgroup_paths = [[alignment.image_path(folder, index) for folder in folders]
+                      for index in range(alignment.subgroup_count())]
+    jobs = [(folder, paths[i]) for i, folder in enumerate(folders) for paths in subgroup_paths if paths[i] is not None]
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ibc-preflight") as executor:
+        results = executor.map(lambda job: read_image_header(job[1]), jobs)
+        headers = {folder: [] for folder in folders}
+        headers_by_path = {}
+        for (folder, image_path), header in zip(jobs, results):
+            headers[folder].append((os.path.basename(image_path), header))
+            headers_by_path[image_path] = header
+
+    subgroups = [[headers_by_path[image_path] for image_path in paths if image_path is not None] for paths in subgroup_paths]
+    return PreflightReport(folders, headers, subgroups)
@@ -0,0 +1,200 @@
+import math
+import os
+import random
+import re
+from collections import defaultdict
+
+# Used to turn a time budget into a number of subgroups
+DEFAULT_SECONDS_PER_COMPARISON = 3.0
+
+# Two-sided 95% normal quantile, for the expected precision
+Z_95 = 1.96
+
+
+class SampledAlignment:
+    """A subset of another alignment's subgroups, renumbered from 0.
+
+    Sessions, the preflight and the prefetcher only ever see the sampled
+    subgroups through it, so nothing outside the sample is read.
+    """
+
+    def __init__(self, base, indices):
+        self.base = base
+        self.indices = sorted(indices)
+        self.folder_index = base.folder_index
+        self.folders = base.folders
+        self.key_pattern = base.key_pattern
+        self.unmatched = base.unmatched
+        self.subgroup_sizes = [base.subgroup_sizes[i] for i in self.indices]
+
+    def subgroup_count(self):
+        return len(self.indices)
+
+    def image_path(self, folder, subgroup_index):
+        return self.base.image_path(folder, self.indices[subgroup_index])
+
+    def eligible_count(self):
+        """Subgroups of the base alignment the sample was drawn from, those with two or more images"""
+        return sum(1 for size in self.base.subgroup_sizes if size > 1)
+
+    def margin_of_error(self):
+        """Half-width of a 95% interval on a folder's share of subgroup wins, at its widest (a 50% share).
+
+        Uses the finite population correction, since the sample is drawn
+        without replacement from the subgroups there are. Proportional
+        stratification can only narrow it.
+        """
+        n, population = self.subgroup_count(), self.eligible_count()
+        if n == 0:
+            return 1.0
+        correction = (population - n) / (population - 1) if population > 1 else 0.0
+        return Z_95 * math.sqrt(0.25 / n * correction)
+
+
+def folder_fingerprints(folder_index, folders):
+    """{folder: content fingerprint}, None for a folder that can't be read; None never matches a later fingerprint"""
+    fingerprints = {}
+    for folder in folders:
+        try:
+            fingerprints[folder] = folder_index.fingerprint(folder)
+        except OSError:
+            fingerprints[folder] = None
+    return fingerprints
+
+
+def subgroup_bucket(alignment, subgroup_index, pattern):
+    """The bucket of a subgroup: what pattern matches in the file name of its first image, or '' without a match"""
+    for folder in alignment.folders:
+        image_path = alignment.image_path(folder, subgroup_index)
+        if image_path is not None:
+            match = pattern.search(os.path.basename(image_path.replace('\\', '/')))
+            if match is None:
+                return ''
+            return match.group(1) if pattern.groups else match.group(0)
+    return ''
+
+
+def allocate(bucket_sizes, sample_size):
+    """Split sample_size over buckets in proportion to their size (largest remainder).
+
+    When there is room, every bucket gets at least one subgroup, so small
+    buckets aren't left out entirely.
+    """
+    allocation = {bucket: 0 for bucket in bucket_sizes}
+    if sample_size >= len(bucket_sizes):
+        allocation = {bucket: 1 for bucket in bucket_sizes}
+        sample_size -= len(bucket_sizes)
+    capacity = {bucket: size - allocation[bucket] for bucket, size in bucket_sizes.items()}
+    total = sum(capacity.values())
+    # No bucket can give more subgroups than it has
+    sample_size = min(sample_size, total)
+    if total == 0 or sample_size == 0:
+        return allocation
+    shares = {bucket: sample_size * size / total for bucket, size in capacity.items()}
+    for bucket, share in shares.items():
+        allocation[bucket] += int(share)
+    leftover = sample_size - sum(int(share) for share in shares.values())
+    for bucket in sorted(shares, key=lambda b: shares[b] - int(shares[b]), reverse=True)[:leftover]:
+        allocation[bucket] += 1
+    return allocation
+
+
+class SamplePlan:
+    """Which subgroups a session will use, and what that sample is expected to tell apart"""
+
+    def __init__(self, alignment, indices, buckets, comparisons_per_subgroup):
+        self.alignment = SampledAlignment(alignment, indices)
+        self.buckets = buckets  # bucket -> (sampled, available)
+        self.comparisons_per_subgroup = comparisons_per_subgroup
+
+    @property
+    def sample_size(self):
+        return self.alignment.subgroup_count()
+
+    def margin_of_error(self):
+        return self.alignment.margin_of_error()
+
+    def expected_seconds(self, seconds_per_comparison=DEFAULT_SECONDS_PER_COMPARISON):
+        return self.sample_size * self.comparisons_per_subgroup * seconds_per_comparison
+
+    def describe(self):
+        text = (f"Sampled {self.sample_size} of {self.alignment.eligible_count()} subgroups, "
+                f"about {self.expected_seconds() / 60:.0f} minutes of comparisons. "
+                f"Each folder's share of subgroup wins is expected within ±{self.margin_of_error():.1%} (95%).")
+        if len(self.buckets) > 1:
+            text += "\nBuckets: " + ", ".join(f"{bucket or '(no match)'} {sampled}/{available}"
+                                              for bucket, (sampled, available) in sorted(self.buckets.items()))
+        return text
+
+
+def plan_sample(alignment, sample_size=None, minutes=None, bucket_pattern=None, seed=None,
+                seconds_per_comparison=DEFAULT_SECONDS_PER_COMPARISON):
+    """Pick the subgroups for a session of sample_size subgroups, or as many as fit in minutes.
+
+    With a bucket_pattern (a regex matched against file names, like
+    alignment_key_pattern) the sample is stratified: every bucket gets its
+    share, so e.g. each prompt is represented. Without one it is a simple
+    random sample. Only subgroups with two or more images count.
+    """
+    pattern = re.compile(bucket_pattern) if bucket_pattern else None
+    eligible = [i for i, size in enumerate(alignment.subgroup_sizes) if size > 1]
+    # Comparisons per subgroup for the winner-stays tournament, which the other schedulers budget alike or close
+    comparisons_per_subgroup = (sum(alignment.subgroup_sizes[i] - 1 for i in eligible) / len(eligible)) if eligible else 0
+
+    if minutes is not None and comparisons_per_subgroup:
+        time_size = int(minutes * 60 / (seconds_per_comparison * comparisons_per_subgroup))
+        sample_size = time_size if sample_size is None else min(sample_size, time_size)
+    if sample_size is None or sample_size >= len(eligible):
+        sample_size = len(eligible)
+
+    by_bucket = defaultdict(list)
+    for subgroup_index in eligible:
+        by_bucket[subgroup_bucket(alignment, subgroup_index, pattern) if pattern else ''].append(subgroup_index)
+
+    rng = random.Random(seed)
+    allocation = allocate({bucket: len(indices) for bucket, indices in by_bucket.items()}, sample_size)
+    indices = []
+    buckets = {}
+    for bucket in sorted(by_bucket):
+        chosen = rng.sample(by_bucket[bucket], allocation[bucket])
+        indices.extend(chosen)
+        buckets[bucket] = (len(chosen), len(by_bucket[bucket]))
+    return SamplePlan(alignment, indices, buckets, comparisons_per_subgroup)
+
+
+def unchanged_folders(record, folders, fingerprints):
+    """Folders of a saved session that are in folders and have the fingerprint it recorded for them"""
+    recorded = record.get('fingerprints', {})
+    return [folder for folder in record['folders']
+            if folder in folders and fingerprints.get(folder) is not None and recorded.get(folder) == fingerprints[folder]]
+
+
+def plan_incremental(record, alignment, fingerprints):
+    """What an IncrementalSession needs to add the new and changed folders of alignment to a saved session.
+
+    Returns (alignment, options, unchanged folders). The results of folders
+    that have changed or are no longer compared are dropped. A sampled
+    session only goes on in the subgroups it sampled.
+    """
+    folders = alignment.folders
+    kept = unchanged_folders(record, folders, fingerprints)
+    record_ids = {folder: i for i, folder in enumerate(record['folders'])}
+    win_matrix = record.get('win_matrix')
+    prior_wins = [[win_matrix[record_ids[winner]][record_ids[loser]] if win_matrix and winner in kept and loser in kept else 0
+                   for loser in folders] for winner in folders]
+
+    # The image that won each subgroup; adaptive and ranking sessions don't play subgroups to a single winner
+    leaders = dict(record.get('leaders', {}))
+    if record.get('scheduler') != 'adaptive':
+        for entry in record['vote_log']:
+            if entry.get('completes_subgroup') and 'ranking' not in entry:
+                leaders.pop(entry.get('previous_leader'), None)
+                leaders[entry['winner']] = entry['winner_folder']
+    leaders = {image_path: folder for image_path, folder in leaders.items() if folder in kept}
+
+    if 'subgroup_sample' in record:
+        led = [i for i in range(alignment.subgroup_count())
+               if any(alignment.image_path(folder, i) in leaders for folder in kept)]
+        alignment = SampledAlignment(alignment, led)
+    options = {'newcomers': [folder for folder in folders if folder not in kept], 'leaders': leaders, 'prior_wins': prior_wins}
+    return alignment, options, kept
@@ -0,0 +1,97 @@
+import os
+import re
+from collections import Counter
+
+
+def natural_key(key):
+    """Sort numeric keys by value (seed 9 before seed 10), anything else alphabetically after them"""
+    return (0, int(key), '') if key.isdigit() else (1, 0, key)
+
+
+class PositionAlignment:
+    """Subgroup i is the i-th image of every folder in sorted order"""
+
+    def __init__(self, folder_index, folders):
+        self.folder_index = folder_index
+        self.folders = list(folders)
+        self.key_pattern = None
+        image_counts = [folder_index.image_count(folder) for folder in self.folders]
+        # Folders drop out of the subgroups once their images run out
+        folders_ending_at = Counter(image_counts)
+        size = len(image_counts)
+        self.subgroup_sizes = []
+        for i in range(max(image_counts, default=0)):
+            size -= folders_ending_at[i]
+            self.subgroup_sizes.append(size)
+        self.unmatched = {folder: 0 for folder in self.folders}
+
+    def subgroup_count(self):
+        return len(self.subgroup_sizes)
+
+    def image_path(self, folder, subgroup_index):
+        return self.folder_index.image_path(folder, subgroup_index)
+
+
+class KeyAlignment:
+    """Subgroups made by joining the folders on a key taken from each file name.
+
+    The key is the first group of key_pattern (or the whole match if it has
+    no groups), found anywhere in the file name. Only keys present in at
+    least two folders become subgroups, so a missing or extra file never
+    shifts the pairing of the others. Building is a single pass over every
+    listing plus one sort of the shared keys.
+
+    Each key keeps the name of its image rather than a listing index, so a
+    subgroup still points at the same files after the shared folder index
+    rescans a folder that has gained images.
+    """
+
+    def __init__(self, folder_index, folders, key_pattern):
+        self.folder_index = folder_index
+        self.folders = list(folders)
+        self.key_pattern = key_pattern
+        self.pattern = re.compile(key_pattern)
+        self.image_names = {}  # folder -> {key: image name}
+        self.duplicates = {}  # folder -> number of files whose key was already taken
+        key_folder_counts = Counter()
+        for folder in self.folders:
+            image_names = {}
+            duplicates = 0
+            for image_name in folder_index.images(folder):
+                key = self.extract_key(image_name)
+                if key is None:
+                    continue
+                if key in image_names:
+                    duplicates += 1
+                else:
+                    image_names[key] = image_name
+            self.image_names[folder] = image_names
+            self.duplicates[folder] = duplicates
+            key_folder_counts.update(image_names.keys())
+
+        self.keys = sorted((key for key, count in key_folder_counts.items() if count >= 2), key=natural_key)
+        self.subgroup_sizes = [key_folder_counts[key] for key in self.keys]
+        self.unmatched = {folder: sum(1 for key in image_names if key_folder_counts[key] < 2)
+                          for folder, image_names in self.image_names.items()}
+
+    def extract_key(self, image_name):
+        # Archive members and batch entries carry a path; only the file name is matched
+        file_name = image_name.replace('\\', '/').rsplit('/', 1)[-1]
+        match = self.pattern.search(file_name)
+        if match is None:
+            return None
+        return match.group(1) if self.pattern.groups else match.group(0)
+
+    def subgroup_count(self):
+        return len(self.keys)
+
+    def image_path(self, folder, subgroup_index):
+        image_name = self.image_names[folder].get(self.keys[subgroup_index])
+        return os.path.join(folder, image_name) if image_name is not None else None
+
+
+def make_alignment(folder_index, folders, key_pattern=None):
+    """Pair by key when a key pattern is configured, otherwise by position"""
+    if key_pattern:
+        return KeyAlignment(folder_index, folders, key_pattern)
+    return PositionAlignment(folder_index, folders)
@@ -0,0 +1,40 @@
+import os
+import sys
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import archive_source
+from folder_index import FolderIndex
+
+
+def write_zip(archive_path, names, mtime):
+    with zipfile.ZipFile(archive_path, 'w') as zip_file:
+        for name in names:
+            zip_file.writestr(name, b'png')
+    os.utime(archive_path, (mtime, mtime))
+
+
+def test_a_replaced_archive_closes_its_old_reader(tmp_path):
+    archive_path = str(tmp_path / 'images.zip')
+    write_zip(archive_path, ['1.png'], 1000000000)
+    old_reader = archive_source.get_reader(archive_path)
+    write_zip(archive_path, ['1.png', '2.png'], 1000000100)
+    new_reader = archive_source.get_reader(archive_path)
+    assert old_reader.file.closed and not new_reader.file.closed
+    assert new_reader.names() == ['1.png', '2.png']
+    archive_source.close_reader(archive_path)
+
+
+def test_forgetting_an_archive_closes_its_reader(tmp_path):
+    archive_path = str(tmp_path / 'images.zip')
+    write_zip(archive_path, ['1.png', '2.png'], 1000000000)
+    folder_index = FolderIndex()
+    folder_index.refresh(archive_path)
+    reader = archive_source.get_reader(archive_path)
+    folder_index.forget(archive_path)
+    assert reader.file.closed
+    assert archive_path not in archive_source.readers
+    # A later read opens it again
+    assert archive_source.list_archive(archive_path) == ['1.png', '2.png']
+    archive_source.close_reader(archive_path)
@@ -0,0 +1,215 @@
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import comparison_engine
+from folder_index import FolderIndex
+from subgroup_alignment import make_alignment
+
+
+class EqualSizeAlignment:
+    """subgroup_count subgroups with an image of every folder"""
+
+    def __init__(self, folders, subgroup_count):
+        self.folder_index = None
+        self.folders = folders
+        self.key_pattern = None
+        self.subgroup_sizes = [len(folders)] * subgroup_count
+        self.unmatched = {folder: 0 for folder in folders}
+
+    def subgroup_count(self):
+        return len(self.subgroup_sizes)
+
+    def image_path(self, folder, subgroup_index):
+        return f"{folder}/{subgroup_index}.png"
+
+
+def image_folders(tmp_path, folder_count, image_count):
+    """Folders of empty .png files, and an alignment of them by position"""
+    folders = [str(tmp_path / f"folder{i}") for i in range(folder_count)]
+    for folder in folders:
+        os.mkdir(folder)
+        for i in range(image_count):
+            open(os.path.join(folder, f"{i:03d}.png"), 'w').close()
+    folder_index = FolderIndex()
+    folder_index.refresh_all(folders)
+    return folders, make_alignment(folder_index, folders)
+
+
+def play(session, choose):
+    """Vote with choose(session) until the session runs out of pairs; choose may also return None to skip"""
+    has_pair = session.load_next_subgroup()
+    while has_pair:
+        choice = choose(session)
+        if choice is None:
+            has_pair = session.skip_subgroup()
+        elif isinstance(choice, list):
+            has_pair = session.rank(choice)
+        else:
+            has_pair = session.vote(choice)
+    return session
+
+
+def false_stop_rate(scheduler, folder_count, subgroup_count, trials):
+    """Share of sessions between equally good folders that is_settled() would end early"""
+    folders = [f"folder{i}" for i in range(folder_count)]
+    stops = 0
+    for seed in range(trials):
+        choices = random.Random(f"votes-{seed}")
+        session = comparison_engine.make_session(folders, EqualSizeAlignment(folders, subgroup_count), scheduler, seed=seed)
+        has_pair = session.load_next_subgroup()
+        while has_pair:
+            has_pair = session.vote(choices.randrange(2))
+            if has_pair and session.is_settled():
+                stops += 1
+                break
+    return stops / trials
+
+
+def early_stops(scheduler, favourite_share, trials):
+    """Sessions of five folders that is_settled() ends early when folder0 wins favourite_share of its comparisons"""
+    folders = [f"folder{i}" for i in range(5)]
+    stops = 0
+    for seed in range(trials):
+        choices = random.Random(f"votes-{seed}")
+        session = comparison_engine.make_session(folders, EqualSizeAlignment(folders, 40), scheduler, seed=seed)
+        has_pair = session.load_next_subgroup()
+        while has_pair:
+            shown = [folder for folder, _ in session.current_pair]
+            if 'folder0' in shown:
+                favourite = shown.index('folder0')
+                has_pair = session.vote(favourite if choices.random() < favourite_share else 1 - favourite)
+            else:
+                has_pair = session.vote(choices.randrange(2))
+            if has_pair and session.is_settled():
+                stops += 1
+                break
+    return stops
+
+
+def test_order_error():
+    assert comparison_engine.order_error(0, 0) == 1.0
+    assert comparison_engine.order_error(7, 0) < comparison_engine.order_error(6, 1) < 1
+    assert comparison_engine.order_error(10, 10) == 1.0
+
+
+def test_checking_after_every_vote_keeps_false_stops_rare():
+    allowed = 1 - comparison_engine.DEFAULT_STOP_CONFIDENCE
+    assert false_stop_rate('tournament', 2, 200, 200) <= allowed
+    assert false_stop_rate('tournament', 3, 20, 200) <= allowed
+    assert false_stop_rate('adaptive', 3, 40, 200) <= allowed
+
+
+def test_a_clear_winner_ends_the_session_early():
+    for scheduler in ('tournament', 'adaptive', 'ranking'):
+        assert early_stops(scheduler, 0.9, 20) >= 10, scheduler
+
+
+def test_order_error_of_long_records_is_quick():
+    assert comparison_engine.order_error(3000, 2000) < 1e-40
+    assert comparison_engine.order_error(50000, 49000) > 0.5
+
+
+def test_incremental_ratings_start_from_a_fit_of_the_earlier_wins():
+    folders = ['a', 'b', 'c', 'd', 'new']
+    # Replayed game by game in row order, d's wins came last and put it ahead of a
+    prior_wins = [[0, 10, 10, 4, 0], [0, 0, 5, 4, 0], [0, 5, 0, 4, 0], [6, 6, 6, 0, 0], [0, 0, 0, 0, 0]]
+    session = comparison_engine.make_session(folders, EqualSizeAlignment(folders, 10), 'incremental', seed=1,
+                                             newcomers=['new'], prior_wins=prior_wins)
+    assert [folders[i] for i in session.ranking()][:2] == ['a', 'd']
+    assert session.prior_rank['a'] == 0
+    assert session.var[folders.index('new')] == 1.0
+    assert session.wins == prior_wins
+
+
+def test_winner_stays_and_moves_to_the_other_side():
+    folders = [f"folder{i}" for i in range(4)]
+    session = comparison_engine.make_session(folders, EqualSizeAlignment(folders, 2), seed=3)
+    assert session.load_next_subgroup()
+    subgroup = list(session.current_subgroup)
+    assert session.current_pair == subgroup[:2]
+
+    # Chosen on the left, the winner is shown on the right next to the next challenger
+    session.vote(0)
+    assert session.current_pair == [subgroup[2], subgroup[0]]
+    # and chosen on the right, it moves back to the left
+    session.vote(1)
+    assert session.current_pair == [subgroup[0], subgroup[3]]
+
+    session.vote(1)
+    assert session.votes[subgroup[3][0]] == 1 and sum(session.votes.values()) == 1
+    assert session.current_subgroup_index == 1
+    assert session.current_comparison == 3
+
+
+def test_skipping_counts_the_rest_of_the_subgroup():
+    folders = [f"folder{i}" for i in range(4)]
+    session = comparison_engine.make_session(folders, EqualSizeAlignment(folders, 3), seed=3)
+    assert session.total_comparisons == 9
+    session.load_next_subgroup()
+    session.vote(0)
+    assert session.skip_subgroup()
+    assert (session.current_comparison, session.current_subgroup_index) == (3, 1)
+    assert session.skip_subgroup()
+    assert session.current_comparison == 6
+    assert session.vote(0) and session.vote(0)
+    assert not session.vote(0)
+    assert session.current_comparison == session.total_comparisons
+    assert sum(session.votes.values()) == 1
+    assert [entry.get('skipped', False) for entry in session.vote_log] == [False, True, True, False, False, False]
+
+
+def test_replay_and_tally_agree_with_the_session(tmp_path):
+    folders, alignment = image_folders(tmp_path, 4, 6)
+    choices = random.Random(5)
+
+    def choose(session):
+        if choices.random() < 0.1:
+            return None
+        if session.scheduler == 'grid' and choices.random() < 0.5:
+            return choices.sample(range(len(session.current_pair)), 2)
+        return choices.randrange(len(session.current_pair))
+
+    for scheduler in ('tournament', 'adaptive', 'ranking', 'grid'):
+        options = {'grid_size': 3} if scheduler == 'grid' else {}
+        session = play(comparison_engine.make_session(folders, alignment, scheduler, seed=7, **options), choose)
+        record = json.loads(json.dumps(session.to_dict()))
+        assert comparison_engine.tally_votes(record) == session.votes, scheduler
+
+        replayed = comparison_engine.replay_session(record, FolderIndex())
+        assert replayed.votes == session.votes, scheduler
+        assert replayed.wins == session.wins, scheduler
+        assert replayed.vote_log == session.vote_log, scheduler
+
+
+def test_ranking_places_every_image_with_borda_points():
+    folders = [f"folder{i}" for i in range(5)]
+    session = comparison_engine.make_session(folders, EqualSizeAlignment(folders, 1), 'ranking', seed=2)
+    # Lower numbered folders are always preferred
+    play(session, lambda session: min(range(2), key=lambda i: session.current_pair[i][0]))
+
+    assert session.vote_log[-1]['ranking'] == folders
+    assert session.votes == {folder: 4 - place for place, folder in enumerate(folders)}
+    assert len(session.vote_log) <= comparison_engine.insertion_comparisons(5)
+    assert session.current_comparison == session.total_comparisons
+
+
+def test_grid_rank_records_every_placed_image_as_a_win():
+    folders = [f"folder{i}" for i in range(5)]
+    session = comparison_engine.make_session(folders, EqualSizeAlignment(folders, 1), 'grid', seed=4, grid_size=3)
+    assert session.total_comparisons == 2
+    session.load_next_subgroup()
+    first, second, third = [session.folder_ids[folder] for folder, _ in session.current_pair]
+    assert session.rank([2, 0])
+    # The third image beat the first, and both beat the image left unplaced
+    assert session.wins[third][first] == session.wins[third][second] == session.wins[first][second] == 1
+    assert sum(map(sum, session.wins)) == 3
+
+    # The winner stays for the last two challengers
+    winner = session.subgroup_winner
+    assert winner in session.current_pair and len(session.current_pair) == 3
+    assert not session.rank([session.current_pair.index(winner)])
+    assert session.votes[winner[0]] == 1
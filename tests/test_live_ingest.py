@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from folder_index import FolderIndex
+from live_ingest import LiveIngest
+
+
+def write_image(folder, seed, age):
+    image_path = os.path.join(folder, f'img_seed_{seed}.png')
+    with open(image_path, 'wb') as f:
+        f.write(b'png')
+    modified = time.time() - age
+    os.utime(image_path, (modified, modified))
+
+
+def make_folders(tmp_path, seeds, missing_seed, age):
+    folders = [str(tmp_path / name) for name in ('a', 'b', 'c')]
+    for folder in folders:
+        os.mkdir(folder)
+        for seed in seeds:
+            if not (folder == folders[2] and seed == missing_seed):
+                write_image(folder, seed, age)
+    return folders
+
+
+def test_a_key_missing_from_one_folder_is_skipped_once_later_keys_are_done(tmp_path):
+    folders = make_folders(tmp_path, range(20), 3, age=10)
+    live_ingest = LiveIngest(FolderIndex(), folders, r'seed_(\d+)', settle_seconds=2, missing_seconds=60)
+    ready_count, alignment = live_ingest.poll()
+    assert ready_count == alignment.subgroup_count() == 20
+
+
+def test_the_last_key_waits_for_missing_images_until_the_timeout(tmp_path):
+    folders = make_folders(tmp_path, range(5), 4, age=10)
+    ready_count, _ = LiveIngest(FolderIndex(), folders, r'seed_(\d+)', settle_seconds=2, missing_seconds=60).poll()
+    assert ready_count == 4
+    ready_count, _ = LiveIngest(FolderIndex(), folders, r'seed_(\d+)', settle_seconds=2, missing_seconds=5).poll()
+    assert ready_count == 5
+
+
+def test_positions_wait_for_every_folder(tmp_path):
+    # Without keys the third folder's fourth image fills position 3, and only the last position is short
+    folders = make_folders(tmp_path, range(5), 3, age=10)
+    ready_count, _ = LiveIngest(FolderIndex(), folders, settle_seconds=2, missing_seconds=5).poll()
+    assert ready_count == 4
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pairwise_ratings
+
+
+def pair_arrays(win_matrix):
+    """incidence, wins and games of fit_log_strengths for a win matrix"""
+    games = win_matrix + win_matrix.T
+    first, second = np.nonzero(np.triu(games, 1))
+    incidence = np.zeros((len(first), len(win_matrix)))
+    incidence[np.arange(len(first)), first] = 1
+    incidence[np.arange(len(first)), second] = -1
+    return incidence, win_matrix[first, second].astype(float), games[first, second].astype(float)
+
+
+def test_perfect_record_gives_a_finite_interval():
+    # Resamples of an 8-0 record are mostly 8-0 or 7-1, and used to send the refit off to ±1e18
+    fit = pairwise_ratings.RatingFit(['a', 'b'], np.array([[0, 8], [0, 0]]), seed=1)
+    assert np.all(np.isfinite(fit.lower)) and np.all(np.isfinite(fit.upper))
+    assert fit.lower[0] > 0 > fit.upper[1]
+    assert np.max(np.abs([fit.lower, fit.upper])) < 1000
+
+
+def test_refit_matches_fitting_each_sample():
+    rng = np.random.default_rng(5)
+    for case in range(20):
+        size = rng.integers(2, 8)
+        win_matrix = rng.integers(0, 4, (size, size)) * (rng.random((size, size)) < 0.5)
+        np.fill_diagonal(win_matrix, 0)
+        incidence, wins, games = pair_arrays(win_matrix)
+        if not len(games):
+            continue
+        theta = pairwise_ratings.fit_log_strengths(incidence, wins, games)
+        probabilities = pairwise_ratings.expit(incidence @ theta)
+        sample_wins = pairwise_ratings.draw_wins(np.random.default_rng(case), games.astype(np.int64), probabilities, 50)
+        refits = pairwise_ratings.refit_samples(theta, incidence, sample_wins, games)
+        exact = np.array([pairwise_ratings.fit_log_strengths(incidence, wins, games) for wins in sample_wins])
+        assert np.max(np.abs(pairwise_ratings.to_elo(refits) - pairwise_ratings.to_elo(exact))) < 2
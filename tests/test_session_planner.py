@@ -0,0 +1,85 @@
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import comparison_engine
+from folder_index import FolderIndex
+from session_planner import allocate, folder_fingerprints, plan_incremental, plan_sample
+from subgroup_alignment import make_alignment
+
+
+def make_folders(tmp_path, names, file_names):
+    """Folders holding an empty file of every name, with their index"""
+    folders = [str(tmp_path / name) for name in names]
+    for folder in folders:
+        os.mkdir(folder)
+        for file_name in file_names:
+            open(os.path.join(folder, file_name), 'w').close()
+    folder_index = FolderIndex()
+    folder_index.refresh_all(folders)
+    return folders, folder_index
+
+
+def test_allocate_is_proportional_and_leaves_no_bucket_out():
+    # Every bucket gets one first, and the rest goes by what the buckets have left
+    assert allocate({'a': 60, 'b': 30, 'c': 10}, 10) == {'a': 5, 'b': 3, 'c': 2}
+    assert allocate({'a': 98, 'b': 1, 'c': 1}, 10) == {'a': 8, 'b': 1, 'c': 1}
+    assert sum(allocate({'a': 7, 'b': 5, 'c': 3}, 8).values()) == 8
+    # Too small a sample for every bucket
+    assert sum(allocate({'a': 5, 'b': 5, 'c': 5}, 2).values()) == 2
+    assert allocate({'a': 2, 'b': 1}, 10) == {'a': 2, 'b': 1}
+
+
+def test_plan_sample_stratifies_by_bucket(tmp_path):
+    file_names = [f"{prompt}_seed_{seed}.png" for prompt in ('cat', 'dog') for seed in range(30)]
+    file_names += [f"owl_seed_{seed}.png" for seed in range(6)]
+    folders, folder_index = make_folders(tmp_path, ['a', 'b'], file_names)
+    alignment = make_alignment(folder_index, folders)
+
+    plan = plan_sample(alignment, 11, bucket_pattern=r'^([a-z]+)_', seed=1)
+    assert plan.sample_size == 11
+    assert plan.buckets == {'cat': (5, 30), 'dog': (5, 30), 'owl': (1, 6)}
+    assert plan.alignment.indices == plan_sample(alignment, 11, bucket_pattern=r'^([a-z]+)_', seed=1).alignment.indices
+    assert 0 < plan.margin_of_error() < 1
+
+    # A minute of one comparison per subgroup at three seconds each is twenty subgroups
+    assert plan_sample(alignment, minutes=1, seed=1).sample_size == 20
+    assert plan_sample(alignment, 1000).sample_size == 66
+
+
+def test_incremental_session_adds_a_folder_to_an_earlier_one(tmp_path):
+    folders, folder_index = make_folders(tmp_path, ['a', 'b', 'c'], [f"{i:03d}.png" for i in range(5)])
+    earlier = comparison_engine.make_session(folders[:2], make_alignment(folder_index, folders[:2]), seed=3)
+    earlier.fingerprints = folder_fingerprints(folder_index, folders[:2])
+    has_pair = earlier.load_next_subgroup()
+    while has_pair:
+        # a wins every subgroup but the last
+        has_pair = earlier.vote([folder for folder, _ in earlier.current_pair].index(
+            folders[0] if earlier.current_subgroup_index < 4 else folders[1]))
+    record = json.loads(json.dumps(earlier.to_dict()))
+
+    alignment, options, kept = plan_incremental(record, make_alignment(folder_index, folders),
+                                                folder_fingerprints(folder_index, folders))
+    assert kept == folders[:2]
+    assert options['newcomers'] == [folders[2]]
+    assert options['prior_wins'] == [[0, 4, 0], [1, 0, 0], [0, 0, 0]]
+    assert sorted(options['leaders'].values()) == [folders[0]] * 4 + [folders[1]]
+
+    session = comparison_engine.make_session(folders, alignment, 'incremental', seed=5, **options)
+    assert session.total_comparisons == 5
+    assert session.votes == {folders[0]: 4, folders[1]: 1, folders[2]: 0}
+    choices = random.Random(2)
+    has_pair = session.load_next_subgroup()
+    while has_pair:
+        # Every screen is the subgroup's earlier winner against the newcomer
+        assert {folder for folder, _ in session.current_pair} in ({folders[0], folders[2]}, {folders[1], folders[2]})
+        assert options['leaders'].get(session.current_pair[0][1]) or options['leaders'].get(session.current_pair[1][1])
+        has_pair = session.vote(choices.randrange(2))
+    assert sum(session.votes.values()) == 5
+
+    record = json.loads(json.dumps(session.to_dict()))
+    assert comparison_engine.tally_votes(record) == session.votes
+    assert comparison_engine.replay_session(record, FolderIndex()).votes == session.votes
@@ -0,0 +1,26 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from folder_index import FolderIndex
+from subgroup_alignment import KeyAlignment
+
+
+def test_key_alignment_survives_a_rescan(tmp_path):
+    folders = [str(tmp_path / name) for name in ('a', 'b')]
+    for folder in folders:
+        os.mkdir(folder)
+        for seed in (11, 12):
+            open(os.path.join(folder, f'img_seed_{seed}.png'), 'w').close()
+    folder_index = FolderIndex()
+    folder_index.refresh_all(folders)
+    alignment = KeyAlignment(folder_index, folders, r'seed_(\d+)')
+
+    # A new image that sorts first shifts the listing of the folder it lands in
+    open(os.path.join(folders[0], 'img_seed_10.png'), 'w').close()
+    folder_index.forget(folders[0])
+    folder_index.refresh(folders[0])
+
+    assert alignment.image_path(folders[0], 0) == os.path.join(folders[0], 'img_seed_11.png')
+    assert alignment.image_path(folders[0], 1) == os.path.join(folders[0], 'img_seed_12.png')